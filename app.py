@@ -3,6 +3,10 @@
 以新北市防災型都更為例
 """
 
+import io
+import os
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -15,6 +19,14 @@ from modules.allocation_calculator import AllocationCalculator
 from modules.sensitivity_analyzer import SensitivityAnalyzer
 from modules.visualizer import Visualizer
 from modules.batch_comparator import BatchComparator
+from modules.report_exporter import ReportExporter
+from modules.job_manager import JobManager, batch_compare_job, sensitivity_job, sobol_job
+from modules.parallel_executor import ParallelExecutor
+from modules.result_cache import ResultCache
+from modules.result_store import ResultStore
+from modules.pipeline import IncrementalPipeline
+from modules.instrumentation import metrics
+from modules import __version__ as MODEL_VERSION
 
 # 頁面配置
 st.set_page_config(
@@ -24,20 +36,75 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def get_result_cache(model_version: str) -> ResultCache:
+    """同一伺服器程序內所有 session 共用的結果快取，模型版本變更即建立新快取"""
+    return ResultCache(max_entries=256, model_version=model_version)
+
+@st.cache_resource
+def get_result_store(model_version: str):
+    """
+    跨程序重啟保留的持久化結果：僅於設定 URBAN_RENEWAL_RESULT_STORE（檔案路徑）時啟用，
+    未設定時不寫入任何檔案
+    """
+    path = os.environ.get('URBAN_RENEWAL_RESULT_STORE')
+    return ResultStore(path, model_version=model_version) if path else None
+
+@st.cache_resource
+def get_calculators() -> dict:
+    """計算器皆無狀態，所有 session 共用同一組實例"""
+    return {'volume': VolumeCalculator(), 'cost': CostCalculator(), 'alloc': AllocationCalculator()}
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """背景工作與 session 脫鉤，瀏覽器重新連線或重新整理後仍可依工作編號取回"""
+    return JobManager(max_workers=2)
+
+@st.cache_resource
+def get_executor() -> ParallelExecutor:
+    """背景批次工作共用的行程池"""
+    return ParallelExecutor(chunk_size=10_000)
+
+@st.cache_resource
+def get_pipeline(model_version: str) -> IncrementalPipeline:
+    """共用的增量計算管線：僅重算參數變動影響到的階段"""
+    return IncrementalPipeline.from_calculators(
+        get_calculators(),
+        cache=ResultCache(max_entries=256, model_version=model_version)
+    )
+
 class UrbanRenewalApp:
     """都市更新權利變換試算應用程式主類別"""
     
     def __init__(self):
+        calculators = get_calculators()
         self.input_handler = InputHandler()
-        self.volume_calculator = VolumeCalculator()
-        self.cost_calculator = CostCalculator()
-        self.allocation_calculator = AllocationCalculator()
+        self.volume_calculator = calculators['volume']
+        self.cost_calculator = calculators['cost']
+        self.allocation_calculator = calculators['alloc']
         self.sensitivity_analyzer = SensitivityAnalyzer()
         self.visualizer = Visualizer()
         self.batch_comparator = BatchComparator()
+        self.report_exporter = ReportExporter()
+        self.result_cache = get_result_cache(MODEL_VERSION)
+        self.pipeline = get_pipeline(MODEL_VERSION)
+        self.result_store = get_result_store(MODEL_VERSION)
+        self.job_manager = get_job_manager()
+        self.preview_rows = 10_000  # 批次比對工作畫面保留的最新列數
+        metrics.register('result_cache', self.result_cache)
+        metrics.register('pipeline', self.pipeline)
+        metrics.register('jobs', self.job_manager)
+        if self.result_store is not None:
+            metrics.register('result_store', self.result_store)
         
     def run(self):
         """運行主應用程式"""
+        with metrics.timer('app.run'):
+            self._run()
+        if metrics.enabled:
+            self.show_metrics()
+    
+    def _run(self):
         # 標題
         st.markdown("""
         <div style="text-align: center;">
@@ -55,20 +122,37 @@ class UrbanRenewalApp:
             st.error(f"⚠️ 輸入參數錯誤：{message}")
             return
         
+        case_tab, jobs_tab = st.tabs(["📊 單案試算", "📂 批次比對與敏感度分析"])
+        
         # 執行計算
-        try:
-            volume_results = self.volume_calculator.calculate_volume(params)
-            cost_results = self.cost_calculator.calculate_total_costs(params, volume_results)
-            allocation_results = self.allocation_calculator.calculate_allocation(
-                params, volume_results, cost_results
-            )
-            
-            # 顯示結果
-            self.show_main_results(volume_results, cost_results, allocation_results)
-            
-        except Exception as e:
-            st.error(f"❌ 計算過程發生錯誤：{str(e)}")
-            st.info("請檢查輸入參數是否正確，或聯繫系統管理員")
+        with case_tab:
+            try:
+                volume_results, cost_results, allocation_results = self.result_cache.get_or_compute(
+                    params, lambda: self.compute(params)
+                )
+                
+                # 顯示結果
+                with metrics.timer('app.show_main_results'):
+                    self.show_main_results(volume_results, cost_results, allocation_results)
+                self.show_export(params, volume_results, cost_results, allocation_results)
+                
+            except Exception as e:
+                st.error(f"❌ 計算過程發生錯誤：{str(e)}")
+                st.info("請檢查輸入參數是否正確，或聯繫系統管理員")
+        
+        # 背景工作（計算於背景執行緒進行，不阻塞頁面操作）
+        with jobs_tab:
+            self.show_jobs_page(params)
+    
+    def compute(self, params):
+        """執行容積 → 成本 → 分配計算（先查持久化結果；未受參數變動影響的階段沿用先前結果）"""
+        if self.result_store is not None:
+            return self.result_store.get_or_compute(params, lambda: self._compute(params))
+        return self._compute(params)
+    
+    def _compute(self, params):
+        results = self.pipeline.run(params)
+        return results['volume'], results['cost'], results['alloc']
     
     def show_main_results(self, volume_results, cost_results, allocation_results):
         """顯示主要計算結果"""
@@ -88,7 +172,7 @@ class UrbanRenewalApp:
             st.metric(
                 "可售建坪", 
                 f"{volume_results['saleable_volume_ping']:.1f} 坪",
-                delta=f"可售率{volume_results['saleable_ratio']:.1%}"
+                delta=f"可售率{volume_results['saleable_volume_ping'] / volume_results['max_volume_ping']:.1%}"
             )
         
         with kpi_cols[2]:
@@ -128,19 +212,214 @@ class UrbanRenewalApp:
                     delta_color="normal"
                 )
         
-        # 圖表展示
+        # 圖表展示（同一 session 的圖表只建立一次，之後以新資料就地更新）
+        figures = st.session_state.setdefault('figures', {})
+        pie_chart = figures['cost_pie'] = self.visualizer.cost_pie(cost_results, figures.get('cost_pie'))
+        bar_chart = figures['allocation_bar'] = self.visualizer.allocation_bar(
+            allocation_results, figures.get('allocation_bar'))
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("💰 共同負擔費用結構")
-            pie_chart = self.visualizer.cost_pie(cost_results)
             st.plotly_chart(pie_chart, use_container_width=True)
             
         with col2:
             st.subheader("📈 價值分配結構")
-            bar_chart = self.visualizer.allocation_bar(allocation_results)
             st.plotly_chart(bar_chart, use_container_width=True)
 
+    def show_export(self, params, volume_results, cost_results, allocation_results):
+        """單案 Excel 報表下載（同一組參數只產生一次）"""
+        key = self.result_cache.make_key(params, namespace='report')
+        cached = st.session_state.get('report')
+        if cached is None or cached[0] != key:
+            buffer = io.BytesIO()
+            self.report_exporter.export_case(buffer, params, volume_results, cost_results,
+                                             allocation_results, get_calculators())
+            cached = st.session_state['report'] = (key, buffer.getvalue())
+        st.download_button(
+            "📥 下載 Excel 報表", cached[1], file_name="權利變換試算報表.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    def show_jobs_page(self, params):
+        """批次比對與敏感度分析頁：提交背景工作並顯示各工作進度"""
+        # 工作編號記錄於網址參數，重新整理或重新連線後仍可取回
+        if 'jobs' not in st.session_state:
+            ids = st.query_params.get('jobs', '')
+            st.session_state['jobs'] = [i for i in ids.split(',') if self.job_manager.get(i)]
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("📂 批次比對")
+            upload = st.file_uploader("上傳案例 CSV（缺少的參數欄位以側邊欄設定補齊）", type='csv')
+            chunk_size = st.number_input("每批列數", 1_000, 200_000, 20_000, step=1_000)
+            excel = st.checkbox("完成後產生 Excel 報表")
+            if st.button("開始批次比對", disabled=upload is None):
+                data = upload.getvalue()
+                is_valid, message = self.batch_comparator.validate(pd.read_csv(io.BytesIO(data), nrows=0))
+                if is_valid:
+                    job = self.job_manager.submit(
+                        batch_compare_job, data, int(chunk_size), defaults=params,
+                        executor=get_executor(), excel=excel, preview_rows=self.preview_rows,
+                        kind='batch', label=f"批次比對：{upload.name}"
+                    )
+                    self._add_job(job.id)
+                else:
+                    st.error(f"⚠️ {message}")
+        with col2:
+            st.subheader("🎯 敏感度分析")
+            method = st.radio("分析方法", ["單因子", "全域（Sobol）"], horizontal=True)
+            span = st.slider("變動幅度（±%）", 5, 50, 10) / 100
+            if method == "單因子":
+                names = dict((name, key) for key, name in self.sensitivity_analyzer.factors)
+                selected = st.multiselect("分析參數", list(names), default=list(names))
+                n_levels = st.number_input("變動點數", 3, 201, 21, step=2)
+                if st.button("開始敏感度分析", disabled=not selected):
+                    job = self.job_manager.submit(
+                        sensitivity_job, params, [(names[n], n) for n in selected],
+                        np.linspace(-span, span, int(n_levels)), store=self.result_store,
+                        kind='sensitivity', label=f"敏感度分析：±{span:.0%}，{int(n_levels)} 點"
+                    )
+                    self._add_job(job.id)
+            else:
+                n_samples = st.number_input("基本樣本數 N（共 N ×（參數數 + 2）次計算）",
+                                            1_000, 200_000, 2 ** 14, step=1_000)
+                if st.button("開始全域敏感度分析"):
+                    job = self.job_manager.submit(
+                        sobol_job, params, span=span, n_samples=int(n_samples), executor=get_executor(),
+                        store=self.result_store, kind='sobol',
+                        label=f"全域敏感度分析：±{span:.0%}，N = {int(n_samples):,}"
+                    )
+                    self._add_job(job.id)
+        
+        for job_id in reversed(st.session_state['jobs']):
+            job = self.job_manager.get(job_id)
+            if job is not None:
+                # 執行中的工作每秒只重繪該工作區塊
+                st.fragment(self.show_job, run_every=1.0 if job.active else None)(job)
+    
+    def show_job(self, job):
+        """單一背景工作的進度、部分結果與下載"""
+        snapshot = job.snapshot()
+        labels = {'pending': '⏳ 等候中', 'running': '🔄 執行中', 'done': '✅ 完成',
+                  'cancelled': '⛔ 已取消', 'error': '❌ 錯誤'}
+        with st.container(border=True):
+            head, button = st.columns([5, 1])
+            head.markdown(f"**{snapshot['label']}**　{labels[snapshot['status']]}　"
+                          f"（{snapshot['elapsed']:.0f} 秒）")
+            if job.active:
+                button.button("取消", key=f"cancel-{job.id}", on_click=job.cancel)
+            elif button.button("移除", key=f"remove-{job.id}"):
+                self._remove_job(job.id)
+                st.rerun()
+            st.progress(snapshot['progress'], text=snapshot['message'])
+            if snapshot['error']:
+                st.error(snapshot['error'])
+            
+            # 部分結果只串接新增的批次；批次比對只保留最新的預覽列，完整結果由工作寫入暫存檔
+            state = st.session_state.setdefault(f"job-{job.id}", {'parts': 0, 'frame': None})
+            new_parts = job.partials(state['parts'])
+            if new_parts:
+                frame = pd.concat(([state['frame']] if state['frame'] is not None else []) + new_parts,
+                                  ignore_index=True)
+                state['frame'] = frame.tail(self.preview_rows) if job.kind == 'batch' else frame
+                state['parts'] = snapshot['partials']
+            show = {'batch': self._show_batch_job, 'sensitivity': self._show_sensitivity_job,
+                    'sobol': self._show_sobol_job}[job.kind]
+            show(job, state)
+        
+        # 工作於定時重繪期間結束時，整頁重跑一次以停止定時重繪
+        finished = state.get('active') and not job.active
+        state['active'] = job.active
+        if finished:
+            st.rerun()
+    
+    def _show_batch_job(self, job, state):
+        frame = state['frame']
+        if frame is None:
+            return
+        figures = st.session_state.setdefault('figures', {})
+        scatter = figures[f"scatter-{job.id}"] = self.visualizer.predicted_vs_actual(
+            frame, fig=figures.get(f"scatter-{job.id}"))
+        histogram = figures[f"histogram-{job.id}"] = self.visualizer.error_histogram(
+            frame, fig=figures.get(f"histogram-{job.id}"))
+        col1, col2 = st.columns(2)
+        col1.plotly_chart(scatter, use_container_width=True, key=f"scatter-{job.id}")
+        col2.plotly_chart(histogram, use_container_width=True, key=f"histogram-{job.id}")
+        
+        st.caption(f"逐案結果：顯示最新 {len(frame):,} 筆")
+        st.dataframe(frame, use_container_width=True, key=f"table-{job.id}")
+        if job.status == 'done':
+            st.dataframe(pd.DataFrame([job.result['summary']]), use_container_width=True)
+            st.download_button("📥 下載比對結果 CSV", Path(job.result['csv']).read_bytes(),
+                               file_name="批次比對結果.csv", mime="text/csv", key=f"csv-{job.id}")
+            if job.result['excel'] is not None:
+                st.download_button(
+                    "📥 下載 Excel 報表", Path(job.result['excel']).read_bytes(), file_name="批次比對報表.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key=f"excel-{job.id}"
+                )
+    
+    def _show_sensitivity_job(self, job, state):
+        if job.status != 'done':
+            if state['frame'] is not None:
+                st.dataframe(state['frame'], use_container_width=True, key=f"table-{job.id}")
+            return
+        result = job.result
+        st.plotly_chart(self.visualizer.sensitivity_radar(result['radar_data'], result['levels']),
+                        use_container_width=True, key=f"radar-{job.id}")
+        st.dataframe(result['summary_df'], use_container_width=True, key=f"table-{job.id}")
+        st.dataframe(result['tornado_df'], use_container_width=True)
+        if 'excel' not in state:
+            buffer = io.BytesIO()
+            self.report_exporter.write(buffer, self.report_exporter.sensitivity_sheets(result))
+            state['excel'] = buffer.getvalue()
+        st.download_button(
+            "📥 下載 Excel 報表", state['excel'], file_name="敏感度分析報表.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"excel-{job.id}"
+        )
+    
+    def _show_sobol_job(self, job, state):
+        if job.status != 'done':
+            return
+        result = job.result
+        indices = result['indices_df']
+        metric = st.selectbox("指標", list(dict.fromkeys(indices['指標'])), key=f"metric-{job.id}")
+        st.plotly_chart(self.visualizer.sobol_bar(indices, metric), use_container_width=True,
+                        key=f"sobol-{job.id}")
+        st.caption(f"共 {result['n_evaluations']:,} 次計算；信賴水準 {result['confidence']:.0%}；"
+                   "交互作用 = 總效應指數 − 一階指數")
+        st.dataframe(indices[indices['指標'] == metric], use_container_width=True, key=f"table-{job.id}")
+        if 'excel' not in state:
+            buffer = io.BytesIO()
+            self.report_exporter.write(buffer, {'全域敏感度': indices})
+            state['excel'] = buffer.getvalue()
+        st.download_button(
+            "📥 下載 Excel 報表", state['excel'], file_name="全域敏感度分析報表.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key=f"excel-{job.id}"
+        )
+    
+    def _add_job(self, job_id):
+        st.session_state['jobs'].append(job_id)
+        st.query_params['jobs'] = ','.join(st.session_state['jobs'])
+    
+    def _remove_job(self, job_id):
+        st.session_state['jobs'].remove(job_id)
+        st.session_state.pop(f"job-{job_id}", None)
+        st.query_params['jobs'] = ','.join(st.session_state['jobs'])
+
+    def show_metrics(self):
+        """顯示效能量測統計，並依環境變數 URBAN_RENEWAL_METRICS_FILE 寫出 Prometheus 檔案"""
+        export_path = os.environ.get('URBAN_RENEWAL_METRICS_FILE')
+        if export_path:
+            metrics.to_prometheus(export_path)
+        with st.sidebar.expander("⏱️ 效能統計"):
+            stages = metrics.stats()['stages']
+            st.dataframe(pd.DataFrame.from_dict(stages, orient='index'), use_container_width=True)
+
 # 主程式入口
 if __name__ == "__main__":
     app = UrbanRenewalApp()
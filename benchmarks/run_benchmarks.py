@@ -0,0 +1,246 @@
+"""
+效能基準測試
+量測單案延遲、批次吞吐量、敏感度與模擬執行時間、記憶體峰值及 Streamlit 重新執行時間，
+結果輸出為 JSON，並可與既有基準檔比較以偵測效能退化
+
+用法：
+    python benchmarks/run_benchmarks.py -o bench.json
+    python benchmarks/run_benchmarks.py -o new.json --baseline bench.json --tolerance 0.15
+    python benchmarks/run_benchmarks.py --quick
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, Callable, List
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from modules import __version__
+from modules.volume_calculator import VolumeCalculator
+from modules.cost_calculator import CostCalculator
+from modules.allocation_calculator import AllocationCalculator
+from modules.vectorized_engine import VectorizedEngine
+from modules.batch_comparator import BatchComparator
+from modules.sensitivity_analyzer import SensitivityAnalyzer
+from modules.risk_simulator import RiskSimulator
+from modules.goal_seek import GoalSeeker
+
+# 基準案例（同 InputHandler 預設值）
+BASE_PARAMS = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.90, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def synthetic_cases(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """以 data/cases_batch.csv 重抽樣並加入隨機擾動，產生 n_rows 筆批次案例"""
+    cases = pd.read_csv(ROOT / 'data' / 'cases_batch.csv')
+    rng = np.random.default_rng(seed)
+    df = cases.iloc[rng.integers(0, len(cases), n_rows)].reset_index(drop=True)
+    jitter = lambda: rng.uniform(0.8, 1.2, n_rows)
+    df['total_land_area'] *= jitter()
+    df['personal_land_area'] *= jitter()
+    df['personal_building_area'] *= jitter()
+    df['market_price'] *= jitter()
+    df['legal_far'] = df['legal_far'] / 100  # CSV 以百分比表示
+    df['ownership_ratio'] = df['personal_land_area'] / df['total_land_area']
+    for key in ('demo_unit_cost', 'design_rate', 'finance_rate', 'management_rate', 'tax_rate',
+                'scenario_factor', 'efficiency_coef', 'sales_coef', 'num_floors', 'building_year'):
+        df[key] = BASE_PARAMS[key]
+    return df
+
+
+def timed(func: Callable[[], Any], repeat: int = 3) -> float:
+    """重複執行取最短秒數"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory_mb(func: Callable[[], Any]) -> float:
+    """以 tracemalloc 量測單次執行的記憶體峰值(MB)"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def bench_single_case(n: int) -> Dict[str, float]:
+    volume, cost, alloc = VolumeCalculator(), CostCalculator(), AllocationCalculator()
+    latencies = np.empty(n)
+    for i in range(n):
+        start = time.perf_counter()
+        v = volume.calculate_volume(BASE_PARAMS)
+        c = cost.calculate_total_costs(BASE_PARAMS, v)
+        alloc.calculate_allocation(BASE_PARAMS, v, c)
+        latencies[i] = time.perf_counter() - start
+    return {
+        'p50_us': float(np.percentile(latencies, 50) * 1e6),
+        'p99_us': float(np.percentile(latencies, 99) * 1e6),
+        'mean_us': float(latencies.mean() * 1e6)
+    }
+
+
+def bench_batch(n_rows: int) -> Dict[str, float]:
+    df = synthetic_cases(n_rows)
+    comparator = BatchComparator()
+    seconds = timed(lambda: comparator.compare(df), repeat=3 if n_rows <= 100_000 else 1)
+    return {
+        'seconds': seconds,
+        'rows_per_s': n_rows / seconds,
+        'peak_mb': peak_memory_mb(lambda: comparator.compare(df))
+    }
+
+
+def bench_sensitivity(n_levels: int) -> Dict[str, float]:
+    analyzer = SensitivityAnalyzer()
+    levels = np.linspace(-0.3, 0.3, n_levels)
+    # 每次使用新的分析器，避免增量快取讓量測失真
+    run = lambda: SensitivityAnalyzer().analyze(BASE_PARAMS, levels=levels)
+    return {
+        'seconds': timed(run),
+        'peak_mb': peak_memory_mb(lambda: analyzer.analyze(BASE_PARAMS, levels=levels))
+    }
+
+
+def bench_monte_carlo(n_draws: int) -> Dict[str, float]:
+    simulator = RiskSimulator()
+    run = lambda: simulator.simulate(BASE_PARAMS, n_draws=n_draws)
+    seconds = timed(run)
+    return {'seconds': seconds, 'draws_per_s': n_draws / seconds, 'peak_mb': peak_memory_mb(run)}
+
+
+def bench_goal_seek(n_rows: int) -> Dict[str, float]:
+    df = synthetic_cases(n_rows)
+    seeker = GoalSeeker()
+    return {
+        'closed_form_seconds': timed(lambda: seeker.solve(df, 'ownership_ratio')),
+        'bisection_seconds': timed(lambda: seeker.solve(df, 'legal_far', 'return_area_ping', 60.0))
+    }
+
+
+def bench_app_rerun(n: int) -> Dict[str, float]:
+    """
+    以 Streamlit AppTest 量測 app.py 的腳本重新執行時間（未安裝 Streamlit 時略過）
+
+    每次重新執行改變市場單價，量測增量重算（容積階段沿用、成本與分配重算）而非快取命中；
+    持久化結果檔寫入暫存目錄，不影響使用者 HOME 下的結果檔
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {'skipped': 1.0}
+    previous = os.environ.get('URBAN_RENEWAL_RESULT_STORE')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['URBAN_RENEWAL_RESULT_STORE'] = os.path.join(tmp, 'results.sqlite')
+        try:
+            app = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=60)
+            app.run()  # 首次執行含模組載入
+            price = next(w for w in app.sidebar.number_input if w.label.startswith('市場單價'))
+            durations = np.empty(n)
+            for i in range(n):
+                price.set_value(60.0 + 0.1 * (i + 1))
+                start = time.perf_counter()
+                app.run()
+                durations[i] = time.perf_counter() - start
+        finally:
+            if previous is None:
+                os.environ.pop('URBAN_RENEWAL_RESULT_STORE', None)
+            else:
+                os.environ['URBAN_RENEWAL_RESULT_STORE'] = previous
+    return {'p50_ms': float(np.percentile(durations, 50) * 1e3),
+            'mean_ms': float(durations.mean() * 1e3)}
+
+
+def run_all(quick: bool = False, sizes: List[int] = None) -> Dict[str, Any]:
+    sizes = sizes or ([1_000, 100_000] if quick else [1_000, 100_000, 1_000_000])
+    results = {'single_case': bench_single_case(2_000 if quick else 20_000)}
+    for n in sizes:
+        results[f'batch_{n}'] = bench_batch(n)
+    results['sensitivity_7x3'] = bench_sensitivity(3)
+    results['sensitivity_7x41'] = bench_sensitivity(41)
+    results['monte_carlo'] = bench_monte_carlo(200_000 if quick else 1_000_000)
+    results['goal_seek'] = bench_goal_seek(10_000 if quick else 100_000)
+    results['app_rerun'] = bench_app_rerun(5 if quick else 20)
+    return {
+        'meta': {
+            'model_version': __version__,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'quick': quick
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    與基準結果比較；*_per_s 越高越好，其餘時間/記憶體指標越低越好
+
+    Returns:
+        List: 每個共同指標的比較列，regression 表示超出容許退化幅度
+    """
+    rows = []
+    for bench, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            base = baseline.get('results', {}).get(bench, {}).get(metric)
+            if base is None or base == 0 or metric == 'skipped':
+                continue
+            change = value / base - 1
+            higher_is_better = metric.endswith('_per_s')
+            regression = -change > tolerance if higher_is_better else change > tolerance
+            rows.append({'benchmark': bench, 'metric': metric, 'baseline': base,
+                         'current': value, 'change_pct': change * 100, 'regression': regression})
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='都市更新試算模型效能基準測試')
+    parser.add_argument('-o', '--output', help='結果 JSON 輸出路徑')
+    parser.add_argument('--baseline', help='比較用的基準 JSON')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='容許退化比例（預設 10%%）')
+    parser.add_argument('--quick', action='store_true', help='縮小規模快速執行')
+    parser.add_argument('--sizes', type=int, nargs='+', help='批次列數，如 1000 100000 1000000')
+    args = parser.parse_args(argv)
+
+    report = run_all(args.quick, args.sizes)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text, encoding='utf-8')
+    print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        rows = compare(report, baseline, args.tolerance)
+        print(pd.DataFrame(rows).to_string(index=False) if rows else "無可比較的指標")
+        regressions = [r for r in rows if r['regression']]
+        if regressions:
+            print(f"效能退化 {len(regressions)} 項（容許 {args.tolerance:.0%}）", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,24 +2,51 @@
 都市更新權利變換試算模型 - 模組套件
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "都市更新權利變換研究團隊"
 
-# 匯入主要類別
-from .input_handler import InputHandler
-from .volume_calculator import VolumeCalculator
-from .cost_calculator import CostCalculator
-from .allocation_calculator import AllocationCalculator
-from .sensitivity_analyzer import SensitivityAnalyzer
-from .visualizer import Visualizer
-from .batch_comparator import BatchComparator
+# 主要類別採延遲匯入：僅需計算功能時不載入 Streamlit / Plotly
+_LAZY_IMPORTS = {
+    "InputHandler": ".input_handler",
+    "VolumeCalculator": ".volume_calculator",
+    "CostCalculator": ".cost_calculator",
+    "AllocationCalculator": ".allocation_calculator",
+    "SensitivityAnalyzer": ".sensitivity_analyzer",
+    "Visualizer": ".visualizer",
+    "BatchComparator": ".batch_comparator",
+    "VectorizedEngine": ".vectorized_engine",
+    "RiskSimulator": ".risk_simulator",
+    "ResultCache": ".result_cache",
+    "ResultStore": ".result_store",
+    "ReportExporter": ".report_exporter",
+    "JobManager": ".job_manager",
+    "ParallelExecutor": ".parallel_executor",
+    "VolumeResult": ".results",
+    "CostResult": ".results",
+    "AllocationResult": ".results",
+    "ApiServer": ".api_server",
+    "GoalSeeker": ".goal_seek",
+    "DesignOptimizer": ".design_optimizer",
+    "ModelCalibrator": ".calibrator",
+    "MultiOwnerAllocator": ".multi_owner_allocator",
+    "UnitAssigner": ".unit_assigner",
+    "CashFlowEngine": ".cash_flow",
+    "ParcelStore": ".parcel_store",
+    "ConstructionCostTable": ".parcel_store",
+    "Instrumentation": ".instrumentation",
+    "metrics": ".instrumentation"
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = [
-    "InputHandler",
-    "VolumeCalculator", 
-    "CostCalculator",
-    "AllocationCalculator",
-    "SensitivityAnalyzer",
-    "Visualizer",
-    "BatchComparator"
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
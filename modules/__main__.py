@@ -0,0 +1,10 @@
+"""
+命令列入口：python -m modules
+"""
+
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
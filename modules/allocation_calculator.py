@@ -6,15 +6,22 @@
 import pandas as pd
 from typing import Dict, Any
 
+from .results import AllocationResult
+from .instrumentation import instrumented
+
 class AllocationCalculator:
-    """分配計算類別"""
+    """分配計算類別（無狀態，可多執行緒共用）"""
     
     def __init__(self):
-        pass
+        # 本階段讀取的參數（另依賴容積與成本計算結果）
+        self.input_keys = (
+            'ownership_ratio', 'market_price', 'scenario_factor', 'personal_building_area'
+        )
         
+    @instrumented('calculate_allocation')
     def calculate_allocation(self, params: Dict[str, Any],
                            volume_results: Dict[str, Any],
-                           cost_results: Dict[str, Any]) -> Dict[str, Any]:
+                           cost_results: Dict[str, Any]) -> AllocationResult:
         """
         計算權利分配結果
         
@@ -24,7 +31,7 @@ class AllocationCalculator:
             cost_results: 成本計算結果
             
         Returns:
-            Dict: 分配計算結果
+            AllocationResult: 分配計算結果（可用字典方式取值）
         """
         # 基本參數
         ownership_ratio = params['ownership_ratio']
@@ -63,23 +70,23 @@ class AllocationCalculator:
         # 投資報酬分析
         roi_analysis = self._calculate_roi_analysis(params, personal_allocated_value, cost_results)
         
-        return {
-            'total_revenue': total_revenue,
-            'net_value': net_value,
-            'owner_total_share': owner_total_share,
-            'developer_share': developer_share,
-            'personal_allocated_value': personal_allocated_value,
-            'return_area_ping': return_area_ping,
-            'surplus': surplus,
-            'shortfall': shortfall,
-            'effective_price': effective_price,
-            'roi_analysis': roi_analysis,
-            'personal_cost_burden': cost_results['total_cost'] * ownership_ratio
-        }
+        return AllocationResult(
+            total_revenue=total_revenue,
+            net_value=net_value,
+            owner_total_share=owner_total_share,
+            developer_share=developer_share,
+            personal_allocated_value=personal_allocated_value,
+            return_area_ping=return_area_ping,
+            surplus=surplus,
+            shortfall=shortfall,
+            effective_price=effective_price,
+            personal_cost_burden=cost_results['total_cost'] * ownership_ratio,
+            **roi_analysis
+        )
     
     def _calculate_roi_analysis(self, params: Dict[str, Any],
                                allocated_value: float,
-                               cost_results: Dict[str, Any]) -> Dict[str, Any]:
+                               cost_results: Dict[str, Any]) -> Dict[str, float]:
         """計算投資報酬分析"""
         # 估算原建物價值（簡化估算）
         estimated_original_value = params['personal_building_area'] * params['market_price'] * 0.5
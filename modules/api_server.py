@@ -0,0 +1,315 @@
+"""
+JSON API 服務模組
+以 asyncio 提供單案、批次與敏感度分析端點（僅使用標準函式庫，完全本機執行）
+同時到達的單案請求於短時間窗內合併為一批，一次向量化計算
+
+端點：
+    POST /evaluate     單案試算（自動合併批次）
+    POST /batch        {"cases": [參數, ...]} 批次試算
+    POST /sensitivity  {"params": 參數, "factors": [...], "levels": [...]} 敏感度分析
+    GET  /health       服務與批次統計
+    GET  /metrics      效能量測統計（需啟用 instrumentation）
+"""
+
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from .vectorized_engine import VectorizedEngine
+from .sensitivity_analyzer import SensitivityAnalyzer
+from .instrumentation import metrics
+
+class MicroBatcher:
+    """單案請求合併批次計算類別"""
+
+    def __init__(self, engine: VectorizedEngine, max_batch: int = 256,
+                 max_wait_ms: float = 2.0, max_queue: int = 10_000):
+        """
+        Args:
+            engine: 向量化引擎
+            max_batch: 每批最多筆數
+            max_wait_ms: 收到第一筆後最多等待時間(毫秒)
+            max_queue: 等候佇列上限，滿載時拒絕新請求（背壓）
+        """
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.stats = Counter()
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def submit(self, params: Dict[str, Any]) -> 'asyncio.Future':
+        """加入佇列，回傳結果 future；佇列已滿時拋出 asyncio.QueueFull"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((params, future))
+        return future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(items) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # 已逾時取消的請求不再計算
+            items = [(p, f) for p, f in items if not f.done()]
+            if items:
+                # 計算移至執行緒，不阻塞事件迴圈接受新連線與請求
+                rows = await loop.run_in_executor(None, self._evaluate, [p for p, _ in items])
+                self.stats['batches'] += 1
+                self.stats['requests'] += len(items)
+                for (_, future), row in zip(items, rows):
+                    if future.done():
+                        continue
+                    if isinstance(row, Exception):
+                        future.set_exception(row)
+                    else:
+                        future.set_result(row)
+
+    def _evaluate(self, records: List[Dict[str, Any]]) -> List[Any]:
+        """整批計算；整批失敗時改為逐筆計算，單筆錯誤不影響同批其他請求"""
+        try:
+            return evaluate_records(self.engine, records)
+        except Exception as e:
+            if len(records) == 1:
+                return [e]
+        self.stats['batch_retries'] += 1
+        metrics.count('api.batch_retries')
+        return [self._evaluate([record])[0] for record in records]
+
+
+def evaluate_records(engine: VectorizedEngine, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """多筆參數字典一次計算，回傳各筆結果字典（非有限值轉為 None，即 JSON null）"""
+    results = engine.run(engine.records_to_columns(records))
+    n = len(records)
+    lists = {}
+    for key, value in results.items():
+        value = np.broadcast_to(value, (n,))
+        if value.dtype.kind == 'f' and not np.isfinite(value).all():
+            lists[key] = np.where(np.isfinite(value), value, None).tolist()
+        else:
+            lists[key] = value.tolist()
+    return [{k: values[i] for k, values in lists.items()} for i in range(n)]
+
+
+class ApiServer:
+    """非同步 JSON API 服務類別"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080,
+                 request_timeout: float = 1.0, **batch_options):
+        """
+        Args:
+            host: 監聽位址
+            port: 監聽埠
+            request_timeout: 單一請求逾時秒數，逾時回應 504
+            batch_options: 傳給 MicroBatcher 的 max_batch / max_wait_ms / max_queue
+        """
+        self.host = host
+        self.port = port
+        self.request_timeout = request_timeout
+        self.engine = VectorizedEngine()
+        self.analyzer = SensitivityAnalyzer(self.engine)
+        self._input_keys = self.engine.input_keys()
+        self.batch_options = batch_options
+        self.batcher = None
+        self.server = None
+        self.started_at = None
+
+    async def start(self) -> None:
+        self.batcher = MicroBatcher(self.engine, **self.batch_options)
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started_at = time.time()
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"都市更新試算 API 服務：http://{self.host}:{self.port}", flush=True)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """HTTP/1.1 連線處理（支援 keep-alive）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = await self._dispatch(method, path, body)
+                try:
+                    data = json.dumps(payload, ensure_ascii=False, allow_nan=False)
+                except ValueError:  # 含 NaN / Infinity（如敏感度表），轉為 null 以維持有效 JSON
+                    data = json.dumps(_json_safe(payload), ensure_ascii=False, allow_nan=False)
+                data = data.encode('utf-8')
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        status, payload = await self._route(method, path, body)
+        metrics.count('api.requests')
+        metrics.count(f'api.responses.{status}')
+        return status, payload
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        routes = {
+            ('POST', '/evaluate'): self._evaluate,
+            ('POST', '/batch'): self._batch,
+            ('POST', '/sensitivity'): self._sensitivity,
+            ('GET', '/health'): self._health,
+            ('GET', '/metrics'): self._metrics
+        }
+        handler = routes.get((method, path.split('?', 1)[0]))
+        if handler is None:
+            return 404, {'error': f"找不到端點: {method} {path}"}
+        try:
+            payload = json.loads(body) if body else {}
+        except json.JSONDecodeError:
+            return 400, {'error': "請求內容不是有效的 JSON"}
+        try:
+            return await handler(payload)
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {'error': f"參數錯誤：{e}"}
+
+    def _missing_keys(self, params: Any) -> List[str]:
+        if not isinstance(params, dict):
+            raise TypeError("參數必須為 JSON 物件")
+        return [k for k in self.engine.required_keys if params.get(k) is None]
+
+    def _coerce(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        計算參數轉為浮點數後才加入批次：無法轉換的值在此回應 400，
+        避免整批轉為欄位陣列時因單筆錯誤而略過該欄，使同批其他請求一併失敗
+        """
+        coerced = dict(params)
+        for key in self._input_keys:
+            value = params.get(key)
+            if value is None:
+                continue
+            try:
+                coerced[key] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"參數 {key} 必須為數值: {value!r}")
+        return coerced
+
+    async def _evaluate(self, params: Dict[str, Any]) -> Tuple[int, Any]:
+        missing = self._missing_keys(params)
+        if missing:
+            return 400, {'error': f"缺少參數: {missing}"}
+        params = self._coerce(params)
+        try:
+            future = self.batcher.submit(params)
+        except asyncio.QueueFull:
+            return 503, {'error': "服務忙碌中，請稍後再試"}
+        try:
+            return 200, await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            return 504, {'error': "計算逾時"}
+
+    async def _batch(self, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        cases = payload['cases']
+        for i, params in enumerate(cases):
+            missing = self._missing_keys(params)
+            if missing:
+                return 400, {'error': f"第 {i} 筆缺少參數: {missing}"}
+            try:
+                cases[i] = self._coerce(params)
+            except ValueError as e:
+                return 400, {'error': f"第 {i} 筆{e}"}
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(None, evaluate_records, self.engine, cases)
+        return 200, {'results': rows}
+
+    async def _sensitivity(self, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        params = payload['params']
+        missing = self._missing_keys(params)
+        if missing:
+            return 400, {'error': f"缺少參數: {missing}"}
+        params = self._coerce(params)
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, lambda: self.analyzer.analyze(params, factors=payload.get('factors'),
+                                                levels=payload.get('levels'))
+        )
+        return 200, {
+            'levels': result['levels'],
+            'summary': result['summary_df'].to_dict(orient='records'),
+            'tornado': result['tornado_df'].to_dict(orient='records')
+        }
+
+    async def _health(self, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        stats = self.batcher.stats
+        return 200, {
+            'status': 'ok',
+            'uptime_s': time.time() - self.started_at,
+            'queue_size': self.batcher.queue.qsize(),
+            'batches': stats['batches'],
+            'requests': stats['requests'],
+            'mean_batch_size': stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        }
+
+    async def _metrics(self, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        return 200, metrics.stats()
+
+
+def _json_safe(value: Any) -> Any:
+    """遞迴將非有限浮點數（NaN / Infinity）轉為 None"""
+    if isinstance(value, float):
+        return value if np.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            503: 'Service Unavailable', 504: 'Gateway Timeout'}
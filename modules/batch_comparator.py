@@ -3,41 +3,176 @@
 批次驗證多筆案例誤差
 """
 
+import os
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Union
+
+from .vectorized_engine import VectorizedEngine
+from .parallel_executor import ParallelExecutor
+from .instrumentation import instrumented
+
+class CompareSummary:
+    """批次比對誤差統計（可逐批累加）"""
+    
+    def __init__(self):
+        self.count = 0
+        self.sum_abs_error = 0.0
+        self.sum_sq_error = 0.0
+        self.sum_abs_rel_error = 0.0
+        self.level_counts = {'優': 0, '良': 0, '待': 0}
+    
+    def update(self, result: pd.DataFrame) -> None:
+        """累加一批 compare 結果"""
+        abs_e = result['絕對誤差'].to_numpy()
+        self.count += len(result)
+        self.sum_abs_error += float(np.abs(abs_e).sum())
+        self.sum_sq_error += float(np.square(abs_e).sum())
+        self.sum_abs_rel_error += float(result['相對誤差(%)'].abs().sum())
+        for level, n in result['精度'].value_counts().items():
+            self.level_counts[level] += int(n)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        n = self.count
+        return {
+            '案例數': n,
+            'MAE(坪)': self.sum_abs_error / n if n else 0.0,
+            'RMSE(坪)': (self.sum_sq_error / n) ** 0.5 if n else 0.0,
+            'MAPE(%)': self.sum_abs_rel_error / n if n else 0.0,
+            **{f'{level}級件數': c for level, c in self.level_counts.items()}
+        }
 
 class BatchComparator:
     """批次比對類別"""
     
+    def __init__(self):
+        self.engine = VectorizedEngine()
+    
     def validate(self, df: pd.DataFrame) -> (bool, str):
         required = {'case_name','total_land_area','personal_land_area','personal_building_area','actual_return_area'}
         if not required.issubset(df.columns):
             return False, f"缺少欄位: {required - set(df.columns)}"
+        invalid = self._non_numeric(df)
+        if invalid:
+            return False, f"欄位含非數值資料: {invalid}"
         return True, ""
     
-    def compare(self, df: pd.DataFrame, calculators: Dict[str, Any]) -> pd.DataFrame:
-        records = []
-        for _, row in df.iterrows():
-            p = row.to_dict()
-            # 轉型
-            p['total_land_area'] = float(p['total_land_area'])
-            p['personal_land_area'] = float(p['personal_land_area'])
-            p['personal_building_area'] = float(p['personal_building_area'])
-            # 執行
-            vol  = calculators['volume'].calculate_volume(p)
+    def _non_numeric(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """計算欄位中無法轉為數值的值（各欄第一個），引擎轉換時會略過整欄"""
+        invalid = {}
+        for key in self.engine.input_keys() + ['actual_return_area']:
+            if key in df.columns and df[key].dtype == object:
+                values = df[key]
+                bad = pd.to_numeric(values, errors='coerce').isna() & values.notna()
+                if bad.any():
+                    invalid[key] = values[bad].iloc[0]
+        return invalid
+    
+    @instrumented('batch_compare', rows=lambda self, df, *args, **kwargs: len(df))
+    def compare(self, df: pd.DataFrame, calculators: Dict[str, Any] = None,
+                executor: ParallelExecutor = None) -> pd.DataFrame:
+        """
+        批次比對預測與實際換回坪數
+        
+        引擎整批重算比逐列雜湊後查詢持久化結果更快，故批次比對不使用 ResultStore
+        
+        Args:
+            df: 案例資料，每列一案
+            calculators: {'engine': 向量化引擎} 指定引擎；或原本的逐筆計算器
+                         {'volume', 'cost', 'alloc'}，此時逐列計算（較慢，不支援 executor）；
+                         未提供時使用預設引擎
+            executor: 提供時以多行程分片計算
+            
+        Returns:
+            pd.DataFrame: 各案例誤差與精度等級
+        
+        Raises:
+            ValueError: calculators 含無法辨識的鍵，或計算欄位含非數值資料
+        """
+        calculators = calculators or {}
+        unknown = set(calculators) - {'engine', 'volume', 'cost', 'alloc'}
+        if unknown:
+            raise ValueError(f"無法辨識的計算器: {sorted(unknown)}，請提供 'engine' 或 'volume' / 'cost' / 'alloc'")
+        invalid = self._non_numeric(df)
+        if invalid:
+            raise ValueError(f"欄位含非數值資料: {invalid}")
+        if 'engine' not in calculators and calculators:
+            if executor is not None:
+                raise ValueError("逐筆計算器不支援 executor，請改用 'engine'")
+            results = {'return_area_ping': self._scalar_predict(df, calculators)}
+        else:
+            engine = calculators.get('engine', self.engine)
+            # 整批向量化執行
+            results = executor.run_engine(engine, df) if executor else engine.run(df)
+        pred = results['return_area_ping']
+        act  = df['actual_return_area'].to_numpy(dtype=float)
+        abs_e = pred - act
+        rel_e = np.zeros(len(df))
+        np.divide(abs_e, act, out=rel_e, where=act > 0)
+        rel_e *= 100
+        level = np.select([np.abs(rel_e) <= 10, np.abs(rel_e) <= 20], ['優', '良'], default='待')
+        return pd.DataFrame({
+            '案例': df['case_name'].to_numpy(),
+            '實際坪數': act,
+            '預測坪數': pred,
+            '絕對誤差': abs_e,
+            '相對誤差(%)': rel_e,
+            '精度': level
+        })
+    
+    @staticmethod
+    def _scalar_predict(df: pd.DataFrame, calculators: Dict[str, Any]) -> np.ndarray:
+        """以逐筆計算器逐列計算換回坪數（自訂的逐筆計算器沿用此路徑）"""
+        missing = {'volume', 'cost', 'alloc'} - set(calculators)
+        if missing:
+            raise ValueError(f"逐筆計算器需同時提供 volume、cost、alloc，缺少: {sorted(missing)}")
+        pred = np.empty(len(df))
+        for i, p in enumerate(df.to_dict(orient='records')):
+            vol = calculators['volume'].calculate_volume(p)
             cost = calculators['cost'].calculate_total_costs(p, vol)
-            alloc= calculators['alloc'].calculate_allocation(p, vol, cost)
-            pred = alloc['return_area_ping']
-            act  = float(p['actual_return_area'])
-            abs_e = pred - act
-            rel_e = abs_e / act * 100 if act>0 else 0
-            level = '優' if abs(rel_e)<=10 else '良' if abs(rel_e)<=20 else '待'
-            records.append({
-                '案例': p['case_name'],
-                '實際坪數': act,
-                '預測坪數': pred,
-                '絕對誤差': abs_e,
-                '相對誤差(%)': rel_e,
-                '精度': level
-            })
-        return pd.DataFrame(records)
+            pred[i] = calculators['alloc'].calculate_allocation(p, vol, cost)['return_area_ping']
+        return pred
+    
+    def iter_compare(self, source: Union[str, os.PathLike, Iterable[pd.DataFrame]],
+                     calculators: Dict[str, Any] = None, chunk_size: int = 100_000,
+                     summary: CompareSummary = None,
+                     executor: ParallelExecutor = None) -> Iterator[pd.DataFrame]:
+        """
+        串流批次比對：逐批讀取、計算並產出結果，記憶體用量與檔案大小無關
+        
+        Args:
+            source: CSV 檔案路徑，或逐批產出 DataFrame 的可迭代物件
+            calculators: 同 compare
+            chunk_size: 讀取 CSV 時每批列數
+            summary: 傳入 CompareSummary 時逐批累加誤差統計
+            executor: 提供時每批以多行程分片計算
+            
+        Yields:
+            pd.DataFrame: 每批的比對結果
+        """
+        if isinstance(source, (str, os.PathLike)):
+            source = pd.read_csv(source, chunksize=chunk_size)
+        for chunk in source:
+            result = self.compare(chunk, calculators, executor)
+            if summary is not None:
+                summary.update(result)
+            yield result
+    
+    def compare_to_csv(self, source: Union[str, os.PathLike, Iterable[pd.DataFrame]],
+                       output_path: Union[str, os.PathLike],
+                       calculators: Dict[str, Any] = None,
+                       chunk_size: int = 100_000,
+                       executor: ParallelExecutor = None) -> Dict[str, Any]:
+        """
+        串流比對並逐批寫入 CSV
+        
+        Returns:
+            Dict: 全部案例的誤差統計
+        """
+        summary = CompareSummary()
+        header = True
+        for result in self.iter_compare(source, calculators, chunk_size, summary, executor):
+            result.to_csv(output_path, mode='w' if header else 'a', header=header,
+                          index=False, encoding='utf-8-sig' if header else 'utf-8')
+            header = False
+        return summary.to_dict()
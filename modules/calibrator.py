@@ -0,0 +1,238 @@
+"""
+模型校準模組
+以歷史結案案例的實際換回坪數，用向量化最小平方法（Levenberg-Marquardt）校準模型係數，
+並提供 K 折交叉驗證
+"""
+
+import copy
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine, Columns
+from .batch_comparator import BatchComparator, CompareSummary
+
+class ModelCalibrator:
+    """模型係數校準類別"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+        self.comparator = BatchComparator()
+
+        # 可校準係數：(種類, 下限, 上限)
+        # 'engine' 為引擎屬性；'column' 為參數欄位（校準值取代各案例原值）；'scale_tier' 為規模係數級距
+        self.coefficients = {
+            'disaster_bonus_multiplier': ('engine', 1.0, 2.0),
+            'demolition_factor': ('engine', 0.0, 1.0),
+            'efficiency_coef': ('column', 0.80, 1.00),
+            'sales_coef': ('column', 1.20, 1.80)
+        }
+        for limit, _ in self.engine.scale_tiers:
+            self.coefficients[f'scale_factor_{limit}'] = ('scale_tier', 0.80, 1.50)
+
+        # 未提供欄位時的預設值（同 VectorizedEngine）
+        self.column_defaults = {'efficiency_coef': 0.90, 'sales_coef': 1.45}
+
+    def initial_values(self, names: List[str]) -> np.ndarray:
+        """目前引擎與預設參數下的係數值"""
+        limits = [limit for limit, _ in self.engine.scale_tiers]
+        values = []
+        for name in names:
+            kind = self.coefficients[name][0]
+            if kind == 'engine':
+                values.append(getattr(self.engine, name))
+            elif kind == 'column':
+                values.append(self.column_defaults[name])
+            else:
+                tier = limits.index(int(name.rsplit('_', 1)[1]))
+                values.append(self.engine.scale_tiers[tier][1])
+        return np.array(values, dtype=float)
+
+    def fit(self, df: pd.DataFrame, coefficients: List[str] = None,
+            base_params: Dict[str, Any] = None, loss: str = 'absolute',
+            bounds: Dict[str, Tuple[float, float]] = None,
+            max_iter: int = 50, tol: float = 1e-10) -> Dict[str, Any]:
+        """
+        校準係數使預測換回坪數最接近 actual_return_area
+
+        Args:
+            df: 案例資料（欄位同 BatchComparator.compare，需含 actual_return_area）
+            coefficients: 要校準的係數名稱，預設為 disaster_bonus_multiplier、sales_coef
+                （efficiency_coef 與 sales_coef 僅以比值影響換回坪數，不宜同時校準）
+            base_params: DataFrame 缺少的欄位以此純量參數補齊，如各項費率
+            loss: 'absolute'（坪數殘差）或 'relative'（相對殘差，避免大案主導）
+            bounds: 覆寫係數上下限
+            max_iter: 最多迭代次數
+            tol: 殘差平方和相對改善量低於此值時視為收斂
+
+        Returns:
+            Dict: coefficients（校準值）、initial（原值）、metrics_before、metrics_after、
+                  iterations、converged、engine（已套用引擎係數的新引擎）、overrides（欄位型係數）
+        """
+        names = coefficients or ['disaster_bonus_multiplier', 'sales_coef']
+        data = self._prepare(df, base_params)
+        cols = self.engine.to_columns(data)
+        actual = data['actual_return_area'].to_numpy(dtype=float)
+        weights = 1 / np.where(actual > 0, actual, np.nan) if loss == 'relative' else np.ones_like(actual)
+        valid = np.isfinite(actual) & np.isfinite(weights)
+        lo, hi = self._bounds(names, bounds)
+
+        residual = lambda thetas: self._residuals(cols, names, thetas, actual, weights, valid)
+        theta0 = np.clip(self.initial_values(names), lo, hi)
+        theta, iterations, converged = self._levenberg_marquardt(residual, theta0, lo, hi, max_iter, tol)
+
+        fitted = dict(zip(names, theta.tolist()))
+        engine, overrides = self.apply(fitted)
+        return {
+            'coefficients': fitted,
+            'initial': dict(zip(names, theta0.tolist())),
+            'metrics_before': self._metrics(data, self.engine, {}),
+            'metrics_after': self._metrics(data, engine, overrides),
+            'iterations': iterations,
+            'converged': converged,
+            'engine': engine,
+            'overrides': overrides
+        }
+
+    def cross_validate(self, df: pd.DataFrame, coefficients: List[str] = None,
+                       n_folds: int = 5, seed: int = 0, **fit_options) -> Dict[str, Any]:
+        """
+        K 折交叉驗證：每折以其餘案例校準，於該折評估
+
+        Args:
+            df: 案例資料
+            coefficients: 同 fit
+            n_folds: 折數（不超過案例數）
+            seed: 分折亂數種子
+            fit_options: 傳給 fit 的其他參數（base_params、loss、bounds 等）
+
+        Returns:
+            Dict: folds_df（各折校準值與訓練/測試誤差）、summary（測試誤差平均）
+        """
+        n_folds = min(n_folds, len(df))
+        if n_folds < 2:
+            raise ValueError("交叉驗證至少需要 2 個案例")
+        order = np.random.default_rng(seed).permutation(len(df))
+        rows = []
+        for k, test_index in enumerate(np.array_split(order, n_folds)):
+            train = df.drop(df.index[test_index])
+            test = df.iloc[test_index]
+            result = self.fit(train, coefficients, **fit_options)
+            test_metrics = self._metrics(self._prepare(test, fit_options.get('base_params')),
+                                         result['engine'], result['overrides'])
+            rows.append({
+                '折': k + 1,
+                '訓練案例數': len(train),
+                '測試案例數': len(test),
+                **result['coefficients'],
+                '訓練MAE(坪)': result['metrics_after']['MAE(坪)'],
+                **{f'測試{key}': value for key, value in test_metrics.items()
+                   if key in ('MAE(坪)', 'RMSE(坪)', 'MAPE(%)')}
+            })
+        folds_df = pd.DataFrame(rows)
+        test_columns = [c for c in folds_df.columns if c.startswith('測試') and c != '測試案例數']
+        return {'folds_df': folds_df, 'summary': folds_df[test_columns].mean().to_dict()}
+
+    def apply(self, fitted: Dict[str, float]) -> Tuple[VectorizedEngine, Dict[str, float]]:
+        """
+        套用校準值
+
+        Returns:
+            Tuple: (套用引擎屬性與規模係數的新引擎, 欄位型係數字典)，
+                   後者可合併至參數或 DataFrame 欄位後交由 BatchComparator.compare 計算
+        """
+        return self._engine_with(fitted), {k: v for k, v in fitted.items()
+                                           if self.coefficients[k][0] == 'column'}
+
+    def _prepare(self, df: pd.DataFrame, base_params: Dict[str, Any] = None) -> pd.DataFrame:
+        if 'actual_return_area' not in df.columns:
+            raise ValueError("缺少欄位: actual_return_area")
+        missing = {k: v for k, v in (base_params or {}).items()
+                   if k not in df.columns and v is not None}
+        data = df.assign(**missing) if missing else df
+        if 'case_name' not in data.columns:
+            data = data.assign(case_name=np.arange(len(data)).astype(str))
+        return data
+
+    def _bounds(self, names: List[str], bounds: Dict[str, Tuple[float, float]] = None):
+        bounds = bounds or {}
+        lo = np.array([bounds.get(n, self.coefficients[n][1:])[0] for n in names], dtype=float)
+        hi = np.array([bounds.get(n, self.coefficients[n][1:])[1] for n in names], dtype=float)
+        return lo, hi
+
+    def _engine_with(self, values: Dict[str, Any]) -> VectorizedEngine:
+        """複製引擎並覆寫係數（值可為陣列，逐列對應）"""
+        engine = copy.copy(self.engine)
+        tiers = list(engine.scale_tiers)
+        for name, value in values.items():
+            kind = self.coefficients[name][0]
+            if kind == 'engine':
+                setattr(engine, name, value)
+            elif kind == 'scale_tier':
+                limit = int(name.rsplit('_', 1)[1])
+                tiers = [(l, value if l == limit else f) for l, f in tiers]
+        engine.scale_tiers = tuple(tiers)
+        return engine
+
+    def _residuals(self, cols: Columns, names: List[str], thetas: np.ndarray,
+                   actual: np.ndarray, weights: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """
+        多組係數一次計算殘差：thetas 為 (M, P)，將 N 筆案例複製 M 份合併為單一批次
+
+        Returns:
+            np.ndarray: (M, 有效案例數) 加權殘差
+        """
+        m, n = len(thetas), len(actual)
+        tiled = {k: np.tile(np.broadcast_to(v, (n,)), m) for k, v in cols.items()}
+        per_row = {name: np.repeat(thetas[:, j], n) for j, name in enumerate(names)}
+        for name, values in per_row.items():
+            if self.coefficients[name][0] == 'column':
+                tiled[name] = values
+        engine = self._engine_with({k: v for k, v in per_row.items()
+                                    if self.coefficients[k][0] != 'column'})
+        pred = engine.run(tiled)['return_area_ping'].reshape(m, n)
+        return ((pred - actual) * weights)[:, valid]
+
+    @staticmethod
+    def _levenberg_marquardt(residual, theta: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                             max_iter: int, tol: float) -> Tuple[np.ndarray, int, bool]:
+        """投影式 Levenberg-Marquardt：Jacobian 以整批前向差分計算（一次引擎呼叫）"""
+        p = len(theta)
+        r = residual(theta[None, :])[0]
+        cost = float(r @ r)
+        damping = 1e-3
+        for iteration in range(1, max_iter + 1):
+            # 前向差分，超出上限的係數改用後向差分
+            h = 1e-6 * np.maximum(1.0, np.abs(theta))
+            h = np.where(theta + h > hi, -h, h)
+            probes = theta + np.diag(h)
+            jac = ((residual(probes) - r) / h[:, None]).T  # (N, P)
+            grad = jac.T @ r
+            hess = jac.T @ jac
+
+            improved = False
+            while damping < 1e10:
+                # 以梯度尺度正規化的阻尼，零曲率方向仍可求解
+                step = np.linalg.solve(hess + damping * (np.diag(np.diag(hess)) + 1e-12 * np.eye(p)), -grad)
+                candidate = np.clip(theta + step, lo, hi)
+                r_new = residual(candidate[None, :])[0]
+                cost_new = float(r_new @ r_new)
+                if cost_new < cost:
+                    improved = True
+                    break
+                damping *= 10
+            if not improved:
+                return theta, iteration, True
+            decrease = (cost - cost_new) / max(cost, 1e-300)
+            theta, r, cost = candidate, r_new, cost_new
+            damping = max(damping / 10, 1e-12)
+            if decrease < tol:
+                return theta, iteration, True
+        return theta, max_iter, False
+
+    def _metrics(self, data: pd.DataFrame, engine: VectorizedEngine,
+                 overrides: Dict[str, float]) -> Dict[str, Any]:
+        """以 BatchComparator.compare 相同定義計算誤差統計"""
+        summary = CompareSummary()
+        summary.update(self.comparator.compare(data.assign(**overrides), {'engine': engine}))
+        return summary.to_dict()
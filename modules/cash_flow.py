@@ -0,0 +1,183 @@
+"""
+逐月現金流量模組
+將各項成本與銷售收入依開發時程逐月攤提，依累計資金缺口逐月計息，
+並以向量化 Newton / 二分法一次求解大量情境的實施者與地主 NPV / IRR
+"""
+
+from typing import Dict, Any, Tuple, Union, Mapping
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine
+
+class CashFlowEngine:
+    """逐月現金流量類別（無狀態，可多執行緒共用）"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+
+        # 預設開發時程（月）：各項以 [起, 迄) 月份平均攤提
+        self.schedule = {
+            'months': 48,
+            'demolition': (0, 3),
+            'design': (0, 6),
+            'construction': (3, 39),
+            'management': (0, 42),
+            'tax_other': (36, 42),
+            'sales': (39, 48),  # 實施者分回部分的銷售收入（預售價金信託至完工後撥付）
+            'delivery': 42  # 交屋（地主取得分配單元）月份
+        }
+        self.cost_items = ('demolition', 'design', 'construction', 'management', 'tax_other')
+
+    def evaluate(self, data: Union[pd.DataFrame, Mapping[str, Any]], schedule: Dict[str, Any] = None,
+                 loan_rate: float = 0.03, discount_rate: float = 0.05,
+                 return_flows: bool = False) -> Dict[str, np.ndarray]:
+        """
+        計算各情境的逐月現金流量、利息與 NPV / IRR
+
+        Args:
+            data: 單案參數字典，或整批 DataFrame / 陣列字典（如敏感度掃描的各情境）
+            schedule: 覆寫部分時程設定，如 {'construction': (3, 30), 'months': 40}
+            loan_rate: 資金缺口融資年利率（按月複利計息，取代固定 finance_rate）
+            discount_rate: NPV 折現年利率
+            return_flows: 是否一併回傳 (情境數, 月數) 的逐月現金流量
+
+        Returns:
+            Dict: developer_npv、developer_irr、owner_npv、owner_irr（年化）、interest_cost、
+                  peak_debt、flat_finance_cost（原固定費率融資費用，供比較）；
+                  return_flows 時另含 developer_flows、owner_flows
+        """
+        schedule = {**self.schedule, **(schedule or {})}
+        months = schedule['months']
+        results = self.engine.run(data)
+        n = int(np.max([np.size(v) for v in results.values()]))
+        col = lambda key: np.broadcast_to(results[key], (n,)).astype(float)
+
+        # 1. 實施者：成本依時程攤提（融資改為逐月計息），分回價值依銷售期間入帳
+        costs = np.zeros((n, months))
+        for item in self.cost_items:
+            costs += col(f'{item}_cost')[:, None] * self._weights(schedule[item], months)[None, :]
+        developer_revenue = col('total_cost') + col('developer_share')
+        project = developer_revenue[:, None] * self._weights(schedule['sales'], months)[None, :] - costs
+        interest, peak_debt = self._interest(project, loan_rate / 12)
+        developer_flows = project - interest
+
+        # 2. 地主：期初投入原有價值，依時程分擔共同負擔，交屋時取得分配價值
+        #    不折現時合計等於 AllocationCalculator 的 net_benefit
+        owner_flows = -col('personal_cost')[:, None] * costs / np.where(
+            costs.sum(axis=1, keepdims=True) > 0, costs.sum(axis=1, keepdims=True), 1.0)
+        owner_flows[:, 0] -= col('estimated_original_value')
+        owner_flows[:, min(schedule['delivery'], months - 1)] += col('personal_allocated_value')
+
+        monthly_discount = (1 + discount_rate) ** (1 / 12) - 1
+        output = {
+            'developer_npv': npv(developer_flows, monthly_discount),
+            'developer_irr': _annualize(irr(developer_flows)),
+            'owner_npv': npv(owner_flows, monthly_discount),
+            'owner_irr': _annualize(irr(owner_flows)),
+            'interest_cost': interest.sum(axis=1),
+            'peak_debt': peak_debt,
+            'flat_finance_cost': col('finance_cost')
+        }
+        if return_flows:
+            output['developer_flows'] = developer_flows
+            output['owner_flows'] = owner_flows
+        return output
+
+    @staticmethod
+    def _weights(window: Tuple[int, int], months: int) -> np.ndarray:
+        """[起, 迄) 月份平均攤提權重"""
+        start, end = max(0, int(window[0])), min(months, int(window[1]))
+        if end <= start:
+            raise ValueError(f"時程區間無效: {window}")
+        weights = np.zeros(months)
+        weights[start:end] = 1 / (end - start)
+        return weights
+
+    @staticmethod
+    def _interest(flows: np.ndarray, monthly_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        依累計餘額逐月計息：餘額為負（資金缺口）時按月利率計息並併入餘額
+
+        Returns:
+            Tuple: (各月利息 (情境數, 月數), 最大資金缺口)
+        """
+        n, months = flows.shape
+        interest = np.zeros((n, months))
+        balance = np.zeros(n)
+        peak = np.zeros(n)
+        for t in range(months):
+            interest[:, t] = np.where(balance < 0, -balance * monthly_rate, 0.0)
+            balance = balance + flows[:, t] - interest[:, t]
+            peak = np.maximum(peak, -balance)
+        return interest, peak
+
+
+def npv(flows: np.ndarray, rate: Union[float, np.ndarray]) -> np.ndarray:
+    """各列現金流量以每期利率折現的淨現值（第 0 期不折現）"""
+    flows = np.atleast_2d(flows)
+    periods = np.arange(flows.shape[1])
+    rate = np.asarray(rate, dtype=float).reshape(-1, 1)
+    return (flows / (1 + rate) ** periods).sum(axis=1)
+
+
+def irr(flows: np.ndarray, bounds: Tuple[float, float] = (-0.99, 1.0),
+        max_iter: int = 100, tol: float = 1e-12) -> np.ndarray:
+    """
+    向量化每期 IRR：各列同步以 Newton 法求根，跳出有效區間或未縮小殘差時改以二分法
+
+    Args:
+        flows: (情境數, 期數) 現金流量
+        bounds: 每期報酬率搜尋區間
+        max_iter: 最多迭代次數
+        tol: 收斂門檻（相對於現金流量規模）
+
+    Returns:
+        np.ndarray: 每期 IRR；區間內無變號（如全為正或全為負的現金流量）時為 NaN
+    """
+    flows = np.atleast_2d(np.asarray(flows, dtype=float))
+    periods = np.arange(flows.shape[1])
+    scale = np.abs(flows).sum(axis=1)
+
+    def value_and_slope(r: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        discount = (1 + r[:, None]) ** -periods
+        value = (flows * discount).sum(axis=1)
+        slope = -(flows * periods * discount / (1 + r[:, None])).sum(axis=1)
+        return value, slope
+
+    lo = np.full(len(flows), bounds[0])
+    hi = np.full(len(flows), bounds[1])
+    f_lo, _ = value_and_slope(lo)
+    f_hi, _ = value_and_slope(hi)
+    bracketed = np.sign(f_lo) * np.sign(f_hi) <= 0
+
+    r = np.zeros(len(flows))
+    f, slope = value_and_slope(r)
+    for _ in range(max_iter):
+        # 以目前點更新有根區間
+        left = np.sign(f) == np.sign(f_lo)
+        lo = np.where(left, r, lo)
+        f_lo = np.where(left, f, f_lo)
+        hi = np.where(left, hi, r)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = r - f / slope
+        use_newton = np.isfinite(newton) & (newton > lo) & (newton < hi)
+        r_new = np.where(use_newton, newton, (lo + hi) / 2)
+        f_new, slope = value_and_slope(r_new)
+        # Newton 未使殘差減半時，下一步改以二分法保證收斂
+        slow = use_newton & (np.abs(f_new) > 0.5 * np.abs(f))
+        r_bisect = (lo + hi) / 2
+        if slow.any():
+            f_bisect, slope_bisect = value_and_slope(r_bisect)
+            r_new = np.where(slow, r_bisect, r_new)
+            f_new = np.where(slow, f_bisect, f_new)
+            slope = np.where(slow, slope_bisect, slope)
+        r, f = r_new, f_new
+        if np.all(~bracketed | (np.abs(f) <= tol * scale) | (hi - lo <= 1e-15)):
+            break
+    return np.where(bracketed, r, np.nan)
+
+
+def _annualize(monthly: np.ndarray) -> np.ndarray:
+    return (1 + monthly) ** 12 - 1
@@ -0,0 +1,325 @@
+"""
+命令列介面模組
+不需 Streamlit 即可執行單案試算、批次比對與敏感度分析
+
+用法：
+    python -m modules case params.json
+    python -m modules batch cases.csv -o results.csv --workers 8
+    python -m modules batch cases.csv --parcels parcels.parquet
+    python -m modules batch cases.csv --params defaults.json
+    python -m modules sensitivity params.json --levels -0.3 0.3 41
+    python -m modules sensitivity params.json --sobol 50000 --workers 4 -o sobol.csv
+    python -m modules risk params.json --draws 1000000 --corr market_price unit_cost 0.5
+    python -m modules calibrate cases.csv --params defaults.json --folds 5
+    python -m modules cashflow scenarios.csv --loan-rate 0.03 -o cashflow.csv
+    python -m modules sensitivity params.json --store results.sqlite
+    python -m modules batch cases.csv --excel report.xlsx
+    python -m modules store compact --path results.sqlite --max-mb 256
+    python -m modules serve --port 8080
+    python -m modules --metrics-prom metrics.prom batch cases.csv
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Mapping
+from typing import Dict, Any, List
+
+import numpy as np
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m modules', description='都市更新權利變換試算（命令列）')
+    parser.add_argument('--metrics-json', help='結束時寫入效能統計 JSON')
+    parser.add_argument('--metrics-prom', help='結束時寫入 Prometheus 文字格式統計')
+    parser.add_argument('--trace-memory', action='store_true', help='以 tracemalloc 量測記憶體峰值')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    case = sub.add_parser('case', help='單案試算，輸出 JSON')
+    case.add_argument('params', help='參數 JSON 檔（- 代表標準輸入）')
+
+    batch = sub.add_parser('batch', help='批次比對 CSV')
+    batch.add_argument('input', help='案例 CSV 檔')
+    batch.add_argument('-o', '--output', help='逐批寫入比對結果 CSV')
+    batch.add_argument('--chunk-size', type=int, default=100_000, help='每批讀取列數')
+    batch.add_argument('--workers', type=int, default=1, help='平行行程數')
+    batch.add_argument('--params', help='補齊 CSV 缺少欄位的參數 JSON 檔')
+    batch.add_argument('--parcels', help='地籍參照檔（CSV / Parquet），依 parcel_id 補齊缺少欄位')
+    batch.add_argument('--excel', help='逐批串流匯出 Excel 活頁簿（誤差統計、逐案結果、輸入參數）')
+    batch.add_argument('--no-inputs', action='store_true', help='Excel 不含輸入參數工作表')
+
+    sens = sub.add_parser('sensitivity', help='敏感度分析')
+    sens.add_argument('params', help='參數 JSON 檔（- 代表標準輸入）')
+    sens.add_argument('--factors', nargs='+', help='參數名稱，預設使用內建清單')
+    sens.add_argument('--levels', nargs=3, type=float, metavar=('MIN', 'MAX', 'N'),
+                      help='變動幅度網格，如 -0.3 0.3 41')
+    sens.add_argument('-o', '--output', help='寫入蛛網圖資料 CSV（--sobol 時為敏感度指數）')
+    sens.add_argument('--store', help='持久化結果檔（SQLite）')
+    sens.add_argument('--excel', help='匯出敏感度 Excel 活頁簿')
+    sens.add_argument('--sobol', type=int, metavar='N', help='改為全域 Sobol 分析，N 為基本樣本數（共 N × (參數數 + 2) 次計算）')
+    sens.add_argument('--span', type=float, help='全域分析的相對抽樣範圍，預設 0.1（±10%%）')
+    sens.add_argument('--bootstrap', type=int, default=100, help='全域分析信賴區間的 bootstrap 次數')
+    sens.add_argument('--seed', type=int, default=42, help='全域分析亂數種子')
+    sens.add_argument('--workers', type=int, default=1, help='平行行程數')
+
+    risk = sub.add_parser('risk', help='蒙地卡羅風險模擬（預設分佈見 RiskSimulator.distributions）')
+    risk.add_argument('params', help='參數 JSON 檔（- 代表標準輸入）')
+    risk.add_argument('--draws', type=int, default=1_000_000, help='抽樣次數')
+    risk.add_argument('--corr', nargs=3, action='append', metavar=('A', 'B', 'RHO'),
+                      help='參數間相關係數，可重複指定，如 --corr market_price unit_cost 0.5')
+    risk.add_argument('--seed', type=int, default=42, help='亂數種子')
+    risk.add_argument('--chunk-size', type=int, default=250_000, help='每批向量化計算筆數')
+    risk.add_argument('--workers', type=int, default=1, help='平行行程數')
+    risk.add_argument('-o', '--output', help='寫入統計摘要 CSV')
+
+    calib = sub.add_parser('calibrate', help='以歷史案例校準模型係數')
+    calib.add_argument('input', help='含 actual_return_area 的案例 CSV 檔')
+    calib.add_argument('--params', help='補齊 CSV 缺少欄位的參數 JSON 檔')
+    calib.add_argument('--coefficients', nargs='+', help='校準係數，預設 disaster_bonus_multiplier sales_coef')
+    calib.add_argument('--loss', choices=['absolute', 'relative'], default='absolute', help='殘差定義')
+    calib.add_argument('--folds', type=int, default=0, help='交叉驗證折數（0 表示不驗證）')
+
+    cash = sub.add_parser('cashflow', help='逐月現金流量與 NPV / IRR')
+    cash.add_argument('input', help='參數 JSON 檔（- 代表標準輸入）或多情境 CSV 檔')
+    cash.add_argument('--params', help='補齊 CSV 缺少欄位的參數 JSON 檔')
+    cash.add_argument('--schedule', help='覆寫開發時程的 JSON 檔，如 {"months": 40, "construction": [3, 30]}')
+    cash.add_argument('--loan-rate', type=float, default=0.03, help='資金缺口融資年利率')
+    cash.add_argument('--discount-rate', type=float, default=0.05, help='NPV 折現年利率')
+    cash.add_argument('-o', '--output', help='寫入各情境結果 CSV')
+
+    store = sub.add_parser('store', help='持久化結果檔維護')
+    store.add_argument('action', choices=['stats', 'compact', 'clear'], help='統計 / 壓縮整理 / 清空')
+    store.add_argument('--path', help='結果檔路徑，預設 ~/.cache/urban_renewal/results.sqlite')
+    store.add_argument('--max-mb', type=float, help='容量上限(MB)，compact 時淘汰至此上限內')
+
+    serve = sub.add_parser('serve', help='啟動 JSON API 服務')
+    serve.add_argument('--host', default='127.0.0.1', help='監聽位址')
+    serve.add_argument('--port', type=int, default=8080, help='監聽埠')
+    serve.add_argument('--max-batch', type=int, default=256, help='單案請求合併批次上限')
+    serve.add_argument('--max-wait-ms', type=float, default=2.0, help='合併批次等待時間(毫秒)')
+    serve.add_argument('--max-queue', type=int, default=10_000, help='等候佇列上限')
+    serve.add_argument('--timeout', type=float, default=1.0, help='單一請求逾時秒數')
+
+    args = parser.parse_args(argv)
+    instrumented = args.metrics_json or args.metrics_prom or args.trace_memory
+    if instrumented:
+        from .instrumentation import metrics
+        metrics.enable(trace_memory=args.trace_memory)
+    try:
+        if args.command == 'serve':
+            return _serve(args)
+        handler = {'case': _run_case, 'batch': _run_batch, 'sensitivity': _run_sensitivity,
+                   'risk': _run_risk, 'calibrate': _run_calibrate, 'cashflow': _run_cashflow, 'store': _run_store}[args.command]
+        result = handler(args)
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2, default=_to_json)
+        sys.stdout.write('\n')
+        return 0
+    finally:
+        if instrumented:
+            _dump_metrics(args)
+
+def _dump_metrics(args) -> None:
+    from .instrumentation import metrics
+
+    if args.metrics_json:
+        metrics.to_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.to_prometheus(args.metrics_prom)
+    if not (args.metrics_json or args.metrics_prom):
+        sys.stderr.write(metrics.to_json() + '\n')
+
+def _load_params(path: str) -> Dict[str, Any]:
+    if path == '-':
+        return json.load(sys.stdin)
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _run_case(args) -> Dict[str, Any]:
+    from .volume_calculator import VolumeCalculator
+    from .cost_calculator import CostCalculator
+    from .allocation_calculator import AllocationCalculator
+
+    params = _load_params(args.params)
+    volume = VolumeCalculator().calculate_volume(params)
+    cost = CostCalculator().calculate_total_costs(params, volume)
+    allocation = AllocationCalculator().calculate_allocation(params, volume, cost)
+    return {'volume': volume, 'cost': cost, 'allocation': allocation}
+
+def _run_batch(args) -> Dict[str, Any]:
+    import pandas as pd
+    from .batch_comparator import BatchComparator, CompareSummary
+    from .parallel_executor import ParallelExecutor
+
+    comparator = BatchComparator()
+    dtype = None
+    if args.parcels:
+        from .parcel_store import ParcelStore
+
+        parcels = ParcelStore.from_file(args.parcels)
+        dtype = {parcels.id_column: str}  # 保留地號前導零
+    base_params = _load_params(args.params) if args.params else {}
+    required = set(comparator.engine.required_keys) | {'actual_return_area'}
+
+    def chunks():
+        for chunk in pd.read_csv(args.input, chunksize=args.chunk_size, dtype=dtype):
+            if args.parcels:
+                chunk = parcels.enrich(chunk)
+            chunk = chunk.assign(**{k: v for k, v in base_params.items()
+                                    if k not in chunk.columns and v is not None})
+            missing = sorted(required - set(chunk.columns))
+            if missing:
+                raise SystemExit(f"{args.input} 缺少欄位: {', '.join(missing)}"
+                                 "（可以 --params 參數 JSON 檔或 --parcels 地籍參照檔補齊）")
+            yield chunk
+
+    source = chunks()
+    with ParallelExecutor(max_workers=args.workers, chunk_size=args.chunk_size) as executor:
+        if args.excel:
+            from .report_exporter import ReportExporter
+            return ReportExporter().export_batch(source, args.excel, chunk_size=args.chunk_size,
+                                                 executor=executor, include_inputs=not args.no_inputs)
+        if args.output:
+            return comparator.compare_to_csv(source, args.output, chunk_size=args.chunk_size,
+                                             executor=executor)
+        summary = CompareSummary()
+        for _ in comparator.iter_compare(source, chunk_size=args.chunk_size,
+                                         summary=summary, executor=executor):
+            pass
+        return summary.to_dict()
+
+def _run_sensitivity(args) -> Dict[str, Any]:
+    from .sensitivity_analyzer import SensitivityAnalyzer
+    from .parallel_executor import ParallelExecutor
+
+    params = _load_params(args.params)
+    if args.sobol:
+        with ParallelExecutor(max_workers=args.workers) as executor:
+            result = SensitivityAnalyzer().sobol(params, factors=args.factors, span=args.span,
+                                                 n_samples=args.sobol, n_bootstrap=args.bootstrap,
+                                                 seed=args.seed, executor=executor,
+                                                 store=_open_store(args.store))
+        if args.output:
+            result['indices_df'].to_csv(args.output, index=False, encoding='utf-8-sig')
+        if args.excel:
+            from .report_exporter import ReportExporter
+            ReportExporter().write(args.excel, {'全域敏感度': result['indices_df']})
+        return {
+            'n_evaluations': result['n_evaluations'],
+            'variance': result['variance'],
+            'indices': result['indices_df'].to_dict(orient='records')
+        }
+    levels = None
+    if args.levels:
+        low, high, n = args.levels
+        levels = np.linspace(low, high, int(n))
+    result = SensitivityAnalyzer().analyze(params, factors=args.factors, levels=levels,
+                                           store=_open_store(args.store))
+    if args.output:
+        result['spider_df'].to_csv(args.output, index=False, encoding='utf-8-sig')
+    if args.excel:
+        from .report_exporter import ReportExporter
+        exporter = ReportExporter()
+        exporter.write(args.excel, exporter.sensitivity_sheets(result))
+    return {
+        'levels': result['levels'],
+        'summary': result['summary_df'].to_dict(orient='records'),
+        'tornado': result['tornado_df'].to_dict(orient='records')
+    }
+
+def _run_risk(args) -> Dict[str, Any]:
+    from .risk_simulator import RiskSimulator
+    from .parallel_executor import ParallelExecutor
+
+    params = _load_params(args.params)
+    correlations = {(a, b): float(rho) for a, b, rho in args.corr or []}
+    with ParallelExecutor(max_workers=args.workers) as executor:
+        result = RiskSimulator().simulate(params, n_draws=args.draws, correlations=correlations,
+                                          seed=args.seed, chunk_size=args.chunk_size,
+                                          executor=executor)
+    if args.output:
+        result['summary_df'].to_csv(args.output, index=False, encoding='utf-8-sig')
+    return {
+        'n_draws': result['n_draws'],
+        'seed': result['seed'],
+        'prob_shortfall': result['prob_shortfall'],
+        'summary': result['summary_df'].to_dict(orient='records')
+    }
+
+def _run_calibrate(args) -> Dict[str, Any]:
+    import pandas as pd
+    from .calibrator import ModelCalibrator
+
+    df = pd.read_csv(args.input)
+    base_params = _load_params(args.params) if args.params else None
+    calibrator = ModelCalibrator()
+    result = calibrator.fit(df, args.coefficients, base_params=base_params, loss=args.loss)
+    output = {key: result[key] for key in ('coefficients', 'initial', 'metrics_before',
+                                           'metrics_after', 'iterations', 'converged')}
+    if args.folds:
+        cv = calibrator.cross_validate(df, args.coefficients, n_folds=args.folds,
+                                       base_params=base_params, loss=args.loss)
+        output['cross_validation'] = {'folds': cv['folds_df'].to_dict(orient='records'),
+                                      'summary': cv['summary']}
+    return output
+
+def _run_cashflow(args) -> Dict[str, Any]:
+    import pandas as pd
+    from .cash_flow import CashFlowEngine
+
+    if args.input.lower().endswith('.csv'):
+        data = pd.read_csv(args.input)
+        if args.params:
+            base_params = _load_params(args.params)
+            data = data.assign(**{k: v for k, v in base_params.items()
+                                  if k not in data.columns and v is not None})
+    else:
+        data = _load_params(args.input)
+    schedule = _load_params(args.schedule) if args.schedule else None
+    result = CashFlowEngine().evaluate(data, schedule, loan_rate=args.loan_rate,
+                                       discount_rate=args.discount_rate)
+    results_df = pd.DataFrame(result)
+    if isinstance(data, pd.DataFrame) and 'case_name' in data.columns:
+        results_df.insert(0, 'case_name', data['case_name'].to_numpy())
+    if args.output:
+        results_df.to_csv(args.output, index=False, encoding='utf-8-sig')
+    if len(results_df) == 1:
+        return results_df.iloc[0].to_dict()
+    return {'scenarios': len(results_df), 'summary': results_df.describe().to_dict()}
+
+def _run_store(args) -> Dict[str, Any]:
+    from .result_store import ResultStore, DEFAULT_STORE_PATH
+
+    options = {'max_bytes': int(args.max_mb * 1024 ** 2)} if args.max_mb else {}
+    store = ResultStore(args.path or DEFAULT_STORE_PATH, **options)
+    if args.action == 'compact':
+        return store.compact()
+    if args.action == 'clear':
+        store.clear()
+    return store.stats()
+
+def _open_store(path: str):
+    if not path:
+        return None
+    from .result_store import ResultStore
+    return ResultStore(path)
+
+def _serve(args) -> int:
+    import asyncio
+    from .api_server import ApiServer
+
+    server = ApiServer(args.host, args.port, request_timeout=args.timeout,
+                       max_batch=args.max_batch, max_wait_ms=args.max_wait_ms,
+                       max_queue=args.max_queue)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return dict(value.items())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"無法序列化的型別: {type(value).__name__}")
@@ -3,11 +3,16 @@
 計算都市更新共同負擔各項費用
 """
 
-import plotly.graph_objects as go
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
+
+from .results import CostResult
+from .instrumentation import instrumented
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 class CostCalculator:
-    """成本計算類別"""
+    """成本計算類別（無狀態，可多執行緒共用）"""
     
     def __init__(self):
         self.cost_categories = [
@@ -18,16 +23,22 @@ class CostCalculator:
             ('management', '管理費用'),
             ('tax_other', '稅捐及其他費用')
         ]
+        # 本階段讀取的參數（另依賴容積計算結果）
+        self.input_keys = (
+            'total_land_area', 'unit_cost', 'demo_unit_cost', 'design_rate', 'finance_rate',
+            'management_rate', 'tax_rate', 'market_price', 'scenario_factor'
+        )
         
+    @instrumented('calculate_total_costs')
     def calculate_total_costs(self, params: Dict[str, Any], 
-                              volume_results: Dict[str, Any]) -> Dict[str, Any]:
+                              volume_results: Dict[str, Any]) -> CostResult:
         """
         計算總開發成本
         Args:
             params: 輸入參數
             volume_results: 容積計算結果
         Returns:
-            Dict: 成本計算結果
+            CostResult: 成本計算結果（可用字典方式取值）
         """
         max_vol = volume_results['max_volume_ping']
         # 基地規模係數
@@ -45,24 +56,25 @@ class CostCalculator:
         revenue = volume_results['saleable_volume_ping'] * params['market_price'] * params['scenario_factor']
         burden_ratio = total / revenue if revenue > 0 else 0
         
-        return {
-            'construction_cost': construction,
-            'demolition_cost': demolition,
-            'design_cost': design,
-            'finance_cost': finance,
-            'management_cost': management,
-            'tax_other_cost': tax_other,
-            'total_cost': total,
-            'burden_ratio': burden_ratio,
-            'unit_cost_used': unit_cost
-        }
+        return CostResult(
+            construction_cost=construction,
+            demolition_cost=demolition,
+            design_cost=design,
+            finance_cost=finance,
+            management_cost=management,
+            tax_other_cost=tax_other,
+            total_cost=total,
+            burden_ratio=burden_ratio,
+            unit_cost_used=unit_cost
+        )
     
     def _scale_factor(self, area: float) -> float:
         if area < 50:    return 1.15
         if area < 100:   return 1.05
         return 1.0
     
-    def create_pie_chart(self, cost_results: Dict[str, Any]) -> go.Figure:
+    def create_pie_chart(self, cost_results: Dict[str, Any]) -> 'go.Figure':
+        import plotly.graph_objects as go
         labels = [name for _, name in self.cost_categories]
         values = [
             cost_results['construction_cost'],
@@ -0,0 +1,157 @@
+"""
+設計參數最佳化模組
+在限制條件下搜尋容積效率係數、銷售係數與費率假設，
+使地主換回坪數或實施者分配價值最大
+"""
+
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine, Columns
+
+class DesignOptimizer:
+    """限制式設計參數最佳化類別"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+
+        # 決策變數：(下限, 上限, 是否為整數)，範圍對應 InputHandler 輸入範圍
+        # num_floors 為原建物樓層數（僅用於推估原容積與防災獎勵），不是新建物的設計，故不列入
+        self.variables = {
+            'efficiency_coef': (0.85, 0.95, False),
+            'sales_coef': (1.30, 1.70, False),
+            'design_rate': (0.02, 0.08, False),
+            'finance_rate': (0.01, 0.08, False),
+            'management_rate': (0.15, 0.30, False),
+            'tax_rate': (0.01, 0.05, False)
+        }
+        self.objectives = {
+            'return_area_ping': '地主換回坪數',
+            'developer_share': '實施者分配價值'
+        }
+
+    def optimize(self, params: Dict[str, Any], objective: str = 'return_area_ping',
+                 variables: List[str] = None,
+                 constraints: Dict[str, Tuple[str, float]] = None,
+                 grid_points: int = 5, top_k: int = 10,
+                 max_iter: int = 100, chunk_size: int = 500_000) -> Dict[str, Any]:
+        """
+        網格搜尋後局部精修的限制式最佳化
+
+        Args:
+            params: 基準參數字典（非決策變數維持不變）
+            objective: 最大化指標，'return_area_ping' 或 'developer_share'（或任一結果欄位）
+            variables: 決策變數名稱（須在 self.variables 中），預設為 efficiency_coef、sales_coef
+            constraints: 限制式，如 {'shortfall': ('<=', 0), 'burden_ratio': ('<=', 0.5)}
+            grid_points: 連續變數的網格點數（整數變數取全部整數）
+            top_k: 進入局部精修的可行候選數
+            max_iter: 局部精修最多迭代次數
+            chunk_size: 網格分批計算筆數
+
+        Returns:
+            Dict: best（最佳變數值）、objective_value、metrics、candidates_df、evaluations
+        """
+        names = variables or ['efficiency_coef', 'sales_coef']
+        specs = [self.variables[name] for name in names]
+        constraints = constraints or {}
+        base = {k: v for k, v in params.items() if v is not None}
+
+        # 1. 向量化網格搜尋：逐批計算，只保留目前最佳的 top_k 個可行解
+        axes = [np.arange(lo, hi + 1) if is_int else np.linspace(lo, hi, grid_points)
+                for lo, hi, is_int in specs]
+        sizes = [len(axis) for axis in axes]
+        total = int(np.prod(sizes))
+        best_x = np.empty((0, len(names)))
+        best_f = np.empty(0)
+        for start in range(0, total, chunk_size):
+            index = np.unravel_index(np.arange(start, min(start + chunk_size, total)), sizes)
+            x = np.column_stack([axis[i] for axis, i in zip(axes, index)])
+            f = self._score(base, names, x, objective, constraints)
+            best_x, best_f = self._keep_top(np.vstack([best_x, x]), np.concatenate([best_f, f]), top_k)
+        evaluations = total
+
+        if not np.isfinite(best_f).any():
+            return {'best': None, 'objective_value': None, 'metrics': None,
+                    'candidates_df': pd.DataFrame(columns=names), 'evaluations': evaluations}
+
+        # 2. 局部精修：各候選同時做座標式樣式搜尋，無改善時縮小步長
+        lo = np.array([s[0] for s in specs], dtype=float)
+        hi = np.array([s[1] for s in specs], dtype=float)
+        is_int = np.array([s[2] for s in specs])
+        spacing = np.where(is_int, 1.0, (hi - lo) / max(grid_points - 1, 1))
+        step = np.tile(np.where(is_int, 1.0, spacing / 2), (len(best_x), 1))
+        min_step = np.where(is_int, 1.0, (hi - lo) * 1e-6)
+        x, f = best_x.copy(), best_f.copy()
+        n_vars = len(names)
+        for _ in range(max_iter):
+            active = np.isfinite(f) & (step > min_step).any(axis=1)
+            if not active.any():
+                break
+            moves = np.concatenate([np.eye(n_vars), -np.eye(n_vars)])  # (2d, d)
+            neighbors = x[:, None, :] + moves[None, :, :] * step[:, None, :]
+            neighbors = np.clip(neighbors, lo, hi)
+            neighbors = np.where(is_int, np.round(neighbors), neighbors)
+            nf = self._score(base, names, neighbors.reshape(-1, n_vars), objective, constraints)
+            nf = nf.reshape(len(x), 2 * n_vars)
+            evaluations += nf.size
+
+            best_move = np.argmax(nf, axis=1)
+            improved = active & (nf[np.arange(len(x)), best_move] > f)
+            x[improved] = neighbors[improved, best_move[improved]]
+            f[improved] = nf[improved, best_move[improved]]
+            shrink = active & ~improved
+            step[shrink] = np.where(is_int, step[shrink], step[shrink] / 2)
+            # 整數變數步長固定為 1，連續變數都已收斂且無改善時停止
+            done = shrink & ((step <= min_step) | is_int).all(axis=1)
+            step[done] = min_step
+
+        order = np.argsort(-f)
+        x, f = x[order], f[order]
+        metrics = self._metrics(base, names, x[:1], objective, constraints)
+        candidates = pd.DataFrame(x, columns=names)
+        candidates[self.objectives.get(objective, objective)] = f
+        candidates = candidates[np.isfinite(f)].drop_duplicates().reset_index(drop=True)
+
+        return {
+            'best': dict(zip(names, x[0].tolist())),
+            'objective_value': float(f[0]),
+            'metrics': metrics,
+            'candidates_df': candidates,
+            'evaluations': evaluations
+        }
+
+    def _evaluate(self, base: Dict[str, Any], names: List[str], x: np.ndarray) -> Columns:
+        cols = dict(base)
+        for j, name in enumerate(names):
+            cols[name] = x[:, j]
+        return self.engine.run(cols)
+
+    def _score(self, base: Dict[str, Any], names: List[str], x: np.ndarray,
+               objective: str, constraints: Dict[str, Tuple[str, float]]) -> np.ndarray:
+        """目標值；不可行解為 -inf"""
+        results = self._evaluate(base, names, x)
+        feasible = np.ones(len(x), dtype=bool)
+        for metric, (op, bound) in constraints.items():
+            values = results[metric]
+            if op == '<=':
+                feasible &= values <= bound
+            elif op == '>=':
+                feasible &= values >= bound
+            else:
+                raise ValueError(f"不支援的限制式運算子: {op}")
+        f = np.broadcast_to(results[objective], (len(x),))
+        return np.where(feasible & np.isfinite(f), f, -np.inf)
+
+    def _metrics(self, base: Dict[str, Any], names: List[str], x: np.ndarray,
+                 objective: str, constraints: Dict[str, Tuple[str, float]]) -> Dict[str, float]:
+        results = self._evaluate(base, names, x)
+        keys = [objective, 'return_area_ping', 'developer_share', 'shortfall', 'burden_ratio', *constraints]
+        return {k: float(np.broadcast_to(results[k], (len(x),))[0]) for k in dict.fromkeys(keys)}
+
+    @staticmethod
+    def _keep_top(x: np.ndarray, f: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(f) > k:
+            keep = np.argpartition(-f, k - 1)[:k]
+            return x[keep], f[keep]
+        return x, f
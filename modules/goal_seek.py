@@ -0,0 +1,164 @@
+"""
+目標搜尋模組
+求解單案或整批案例的損益兩平參數值（如需補差額為 0、或達到目標換回坪數）
+"""
+
+from typing import Dict, Any, Tuple, Union, Mapping
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine, Columns
+
+class GoalSeeker:
+    """向量化目標搜尋類別"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+
+        # 目標函數對參數（經轉換後）為線性者，以兩點求解的封閉解計算
+        # 'linear'：對參數本身線性；'reciprocal'：對參數倒數線性
+        self.affine_params = {
+            'return_area_ping': {
+                'ownership_ratio': 'linear', 'unit_cost': 'linear', 'demo_unit_cost': 'linear',
+                'design_rate': 'linear', 'finance_rate': 'linear', 'management_rate': 'linear',
+                'tax_rate': 'linear', 'sales_coef': 'linear',
+                'market_price': 'reciprocal', 'scenario_factor': 'reciprocal',
+                'efficiency_coef': 'reciprocal'
+            },
+            'shortfall': {
+                'ownership_ratio': 'linear', 'unit_cost': 'linear', 'demo_unit_cost': 'linear',
+                'design_rate': 'linear', 'finance_rate': 'linear', 'management_rate': 'linear',
+                'tax_rate': 'linear', 'sales_coef': 'linear',
+                'market_price': 'linear', 'scenario_factor': 'linear',
+                'efficiency_coef': 'reciprocal'
+            }
+        }
+
+        # 參數有效範圍（對應 InputHandler 輸入範圍）：分段函數的搜尋區間，封閉解亦不採用區間外的根
+        self.bounds = {
+            'legal_far': (1.0, 8.0),
+            'total_land_area': (10.0, 1000.0),
+            'personal_land_area': (1.0, 1000.0),
+            'personal_building_area': (0.0, 500.0),
+            'num_floors': (1.0, 20.0),
+            'building_year': (1900.0, 2030.0),
+            'efficiency_coef': (0.85, 0.95),
+            'sales_coef': (1.30, 1.70),
+            'ownership_ratio': (0.0, 1.0),
+            'unit_cost': (100000.0, 300000.0),
+            'market_price': (300000.0, 1500000.0),
+            'demo_unit_cost': (0.0, 50000.0),
+            'design_rate': (0.0, 1.0),
+            'finance_rate': (0.0, 1.0),
+            'management_rate': (0.0, 1.0),
+            'tax_rate': (0.0, 1.0),
+            'scenario_factor': (0.5, 1.5)
+        }
+
+    def solve(self, data: Union[pd.DataFrame, Mapping[str, Any]], param: str,
+              target: str = 'shortfall', value: float = 0.0,
+              bounds: Tuple[float, float] = None,
+              max_iter: int = 60, n_grid: int = 16) -> Dict[str, Any]:
+        """
+        求解使目標指標達到指定值的參數值
+
+        Args:
+            data: 單案參數字典或整批 DataFrame / 陣列字典
+            param: 要求解的參數名稱，如 'market_price'、'ownership_ratio'
+            target: 'shortfall'（需補差額恰為 0 的臨界點）或任一結果欄位名稱，如 'return_area_ping'
+            value: 目標值（target 為 'shortfall' 時忽略）
+            bounds: 參數有效範圍（分段求解的搜尋區間），預設取 self.bounds
+            max_iter: 二分法最多迭代次數
+            n_grid: 二分法前先以等距網格尋找第一個變號區間的點數
+
+        Returns:
+            Dict: value（求得參數值，無解或超出有效範圍時為 NaN）、converged（是否收斂）、
+                  out_of_bounds（根不在有效範圍內而不採用）、method（'closed_form' 或 'bisection'）
+        """
+        cols = self.engine.to_columns(data)
+        shape = cols['total_land_area'].shape
+        objective = lambda x: self._objective(cols, param, x, target, value)
+
+        transform = self.affine_params.get(target, {}).get(param)
+        lo, hi = bounds or self.bounds.get(param, (None, None))
+        if transform is not None:
+            x, converged = self._solve_affine(cols[param], objective, transform)
+            # 與分段求解一致：有效範圍外的根（如負單價）不採用
+            out_of_bounds = np.zeros(shape, dtype=bool)
+            if lo is not None:
+                out_of_bounds = np.isfinite(x) & ((x < lo) | (x > hi))
+                x = np.where(out_of_bounds, np.nan, x)
+                converged = converged & ~out_of_bounds
+            method = 'closed_form'
+        else:
+            if lo is None:
+                raise ValueError(f"請提供參數 {param} 的搜尋區間 bounds")
+            x, converged, bracketed = self._solve_bisection(objective, lo, hi, shape, max_iter, n_grid)
+            out_of_bounds = ~bracketed
+            method = 'bisection'
+
+        if not shape:
+            x, converged, out_of_bounds = float(x), bool(converged), bool(out_of_bounds)
+        return {'value': x, 'converged': converged, 'out_of_bounds': out_of_bounds, 'method': method}
+
+    def _objective(self, cols: Columns, param: str, x: np.ndarray,
+                   target: str, value: float) -> np.ndarray:
+        """目標函數：等於 0 時即為解"""
+        inputs = {**cols, param: x}
+        results = self.engine.run(inputs)
+        if target == 'shortfall':
+            # 個人分配價值 − 原建物價值，變號處即需補差額由正轉 0（求解建物面積時以候選值計算原建物價值）
+            return (results['personal_allocated_value']
+                    - inputs['personal_building_area'] * results['effective_price'])
+        return results[target] - value
+
+    def _solve_affine(self, base: np.ndarray, objective, transform: str) -> Tuple[np.ndarray, np.ndarray]:
+        """目標函數於轉換空間為線性：取兩點直接求根"""
+        x0 = np.where(base != 0, base, 1.0)
+        x1 = x0 * 1.1
+        f0, f1 = objective(x0), objective(x1)
+        if transform == 'reciprocal':
+            u0, u1 = 1 / x0, 1 / x1
+        else:
+            u0, u1 = x0, x1
+        slope = f1 - f0
+        converged = (slope != 0) & np.isfinite(slope)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = np.where(converged, u0 - f0 * (u1 - u0) / slope, np.nan)
+            x = 1 / u if transform == 'reciprocal' else u
+        return x, converged & np.isfinite(x)
+
+    def _solve_bisection(self, objective, lo: float, hi: float, shape,
+                         max_iter: int, n_grid: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        分段函數：網格找出第一個變號區間後，全部案例同步二分
+
+        Returns:
+            Tuple: (參數值, 是否收斂, 區間內是否有變號)
+        """
+        grid = np.linspace(lo, hi, n_grid)
+        f_grid = np.stack([objective(np.full(shape, g)) for g in grid])
+
+        sign_change = np.sign(f_grid[:-1]) * np.sign(f_grid[1:]) <= 0
+        bracketed = sign_change.any(axis=0)
+        first = np.argmax(sign_change, axis=0)
+        a = grid[first]
+        b = grid[np.minimum(first + 1, n_grid - 1)]
+        fa = np.take_along_axis(f_grid, first[None, ...], axis=0)[0]
+        fb = np.take_along_axis(f_grid, np.minimum(first + 1, n_grid - 1)[None, ...], axis=0)[0]
+        scale = np.abs(fa) + np.abs(fb)
+
+        for _ in range(max_iter):
+            m = (a + b) / 2
+            fm = objective(m)
+            left = np.sign(fa) * np.sign(fm) <= 0
+            b = np.where(left, m, b)
+            a = np.where(left, a, m)
+            fa = np.where(left, fa, fm)
+            if np.all(b - a <= 1e-12 * np.maximum(1.0, np.abs(m))):
+                break
+
+        x = (a + b) / 2
+        # 落在不連續點（如規模係數級距）而非真正的根時不視為收斂
+        converged = bracketed & (np.abs(objective(x)) <= 1e-6 * scale + 1e-9)
+        return np.where(bracketed, x, np.nan), converged, bracketed
@@ -11,6 +11,7 @@ class InputHandler:
             'legal_far': 2.25,
             'unit_cost': 180000,
             'relocation_cost': 4000,
+            'demo_unit_cost': 4000,
             'design_rate': 0.04,
             'finance_rate': 0.03,
             'management_rate': 0.22,
@@ -44,6 +45,7 @@ class InputHandler:
         st.sidebar.subheader("💰 共同負擔費用設定")
         uc = st.sidebar.number_input("工程費用單價（元/坪）",100000,300000,self.defaults['unit_cost'])
         rc = st.sidebar.number_input("拆遷補償安置費用（元/坪）",2000,20000,self.defaults['relocation_cost'])
+        dc = st.sidebar.number_input("拆除工程單價（元/坪）",1000,20000,self.defaults['demo_unit_cost'])
         dr = st.sidebar.slider("設計規劃費率（%）",2.0,8.0,self.defaults['design_rate']*100)/100
         fr = st.sidebar.slider("融資利息率（%）",1.0,8.0,self.defaults['finance_rate']*100)/100
         mr = st.sidebar.slider("管理費率（%）",15.0,30.0,self.defaults['management_rate']*100)/100
@@ -59,7 +61,7 @@ class InputHandler:
             'estimated_original_far': est_far, 'ownership_ratio': personal/total,
             'num_floors': far_floor, 'building_year': self.defaults['building_year'],
             'efficiency_coef': eff, 'sales_coef': sal,
-            'unit_cost': uc, 'relocation_cost': rc,
+            'unit_cost': uc, 'relocation_cost': rc, 'demo_unit_cost': dc,
             'design_rate': dr, 'finance_rate': fr,
             'management_rate': mr, 'tax_rate': tr,
             'market_price': mp, 'scenario_factor': sf
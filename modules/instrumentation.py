@@ -0,0 +1,240 @@
+"""
+效能量測模組
+選擇性啟用的各階段耗時、呼叫次數、處理筆數與快取命中統計，
+可輸出為統計字典、JSON 或 Prometheus 文字格式；未啟用時幾乎沒有額外負擔
+
+事件計數器（count）：result_cache.* / result_store.*（hits、misses、evictions）、
+pipeline.<階段>.computed / reused、api.requests / api.responses.<狀態碼> / api.batch_retries、jobs.<結束狀態>
+
+啟用方式：
+    metrics.enable(trace_memory=True)
+    或設定環境變數 URBAN_RENEWAL_METRICS=1（URBAN_RENEWAL_METRICS_TRACEMALLOC=1 一併量測記憶體峰值）
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator
+
+class _StageStats:
+    """單一階段的累計統計"""
+
+    __slots__ = ('calls', 'seconds', 'max_seconds', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class Instrumentation:
+    """效能量測類別（執行緒安全）"""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self._stages = {}
+        self._counters = {}
+        self._sources = {}  # 具 stats() 方法的外部統計來源，如快取、管線
+        self._lock = threading.Lock()
+
+    def enable(self, trace_memory: bool = False) -> None:
+        """
+        啟用量測
+
+        Args:
+            trace_memory: 是否以 tracemalloc 追蹤記憶體峰值（開銷較大，僅供診斷）
+        """
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def reset(self) -> None:
+        """清除累計統計（保留已註冊的統計來源）"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+    def record(self, stage: str, seconds: float, rows: int = 1) -> None:
+        """累計一次階段執行"""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats()
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.rows += rows
+
+    def count(self, name: str, n: int = 1) -> None:
+        """累加計數器（未啟用時不記錄）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, stage: str, rows: int = 1) -> Iterator[None]:
+        """量測 with 區塊耗時，如 Streamlit 畫面繪製"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, rows)
+
+    def register(self, name: str, source: Any) -> None:
+        """註冊統計來源（需有 stats() 方法），快照時一併收集，如 ResultCache、IncrementalPipeline"""
+        with self._lock:
+            self._sources[name] = source
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        目前統計快照
+
+        Returns:
+            Dict: stages（各階段 calls / seconds / mean_seconds / max_seconds / rows）、
+                  counters、sources（已註冊來源的 stats()）、memory（追蹤中時的 current / peak 位元組）
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    'calls': s.calls,
+                    'seconds': s.seconds,
+                    'mean_seconds': s.seconds / s.calls if s.calls else 0.0,
+                    'max_seconds': s.max_seconds,
+                    'rows': s.rows
+                }
+                for name, s in self._stages.items()
+            }
+            counters = dict(self._counters)
+            sources = dict(self._sources)
+        snapshot = {
+            'enabled': self.enabled,
+            'stages': stages,
+            'counters': counters,
+            'sources': {name: source.stats() for name, source in sources.items()}
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot['memory'] = {'current_bytes': current, 'peak_bytes': peak}
+        return snapshot
+
+    def to_json(self, path: str = None) -> str:
+        """統計快照 JSON；指定 path 時寫入檔案"""
+        text = json.dumps(self.stats(), ensure_ascii=False, indent=2, default=str)
+        if path:
+            _atomic_write(path, text)
+        return text
+
+    def to_prometheus(self, path: str = None, prefix: str = 'urban_renewal') -> str:
+        """
+        Prometheus 文字格式（可供 node_exporter textfile collector 讀取）
+
+        Args:
+            path: 指定時以原子方式寫入檔案
+            prefix: 指標名稱前綴
+        """
+        snapshot = self.stats()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            samples = list(samples)
+            if not samples:
+                return
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {float(value)!r}" if label_text
+                             else f"{prefix}_{name} {float(value)!r}")
+
+        stages = snapshot['stages']
+        metric('stage_calls_total', 'counter', 'Stage call count',
+               (({'stage': k}, v['calls']) for k, v in stages.items()))
+        metric('stage_seconds_total', 'counter', 'Cumulative stage wall time in seconds',
+               (({'stage': k}, v['seconds']) for k, v in stages.items()))
+        metric('stage_max_seconds', 'gauge', 'Slowest single stage call in seconds',
+               (({'stage': k}, v['max_seconds']) for k, v in stages.items()))
+        metric('stage_rows_total', 'counter', 'Rows processed by stage',
+               (({'stage': k}, v['rows']) for k, v in stages.items()))
+        metric('events_total', 'counter', 'Event counters',
+               (({'name': k}, v) for k, v in snapshot['counters'].items()))
+        for source, values in snapshot['sources'].items():
+            for key, value in _flatten_numeric(values):
+                metric(f'{source}_{key}', 'gauge', f'{source} {key}', [({}, value)])
+        if 'memory' in snapshot:
+            metric('memory_current_bytes', 'gauge', 'Traced memory in use', [({}, snapshot['memory']['current_bytes'])])
+            metric('memory_peak_bytes', 'gauge', 'Peak traced memory', [({}, snapshot['memory']['peak_bytes'])])
+
+        text = '\n'.join(lines) + '\n'
+        if path:
+            _atomic_write(path, text)
+        return text
+
+
+def _flatten_numeric(values: Dict[str, Any], prefix: str = ''):
+    """展開巢狀統計字典的數值欄位，如 {'volume': {'computed': 3}} → ('volume_computed', 3)"""
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten_numeric(value, f"{name}_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _atomic_write(path: str, text: str) -> None:
+    """先寫入暫存檔再取代，避免收集程式讀到寫一半的檔案"""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# 全程序共用的量測實例
+metrics = Instrumentation()
+if os.environ.get('URBAN_RENEWAL_METRICS') == '1':
+    metrics.enable(trace_memory=os.environ.get('URBAN_RENEWAL_METRICS_TRACEMALLOC') == '1')
+
+
+def instrumented(stage: str, rows: Callable[..., int] = None) -> Callable:
+    """
+    量測函式耗時的裝飾器；未啟用時僅多一次旗標判斷
+
+    Args:
+        stage: 階段名稱，如 'calculate_volume'
+        rows: 由呼叫參數取得處理筆數的函式，預設每次呼叫計 1 筆
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(stage, time.perf_counter() - start,
+                               rows(*args, **kwargs) if rows else 1)
+        return wrapper
+    return decorator
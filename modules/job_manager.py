@@ -0,0 +1,320 @@
+"""
+背景工作模組
+以執行緒池於背景執行批次比對與（單因子 / 全域）敏感度分析，回報進度與逐批部分結果，並支援取消；
+工作與 Streamlit session 脫鉤，瀏覽器重新連線後可依工作編號重新取得
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .batch_comparator import BatchComparator, CompareSummary
+from .sensitivity_analyzer import SensitivityAnalyzer
+from .report_exporter import ReportExporter
+from .parallel_executor import ParallelExecutor
+from .result_store import ResultStore
+from .instrumentation import metrics
+
+class JobCancelled(Exception):
+    """工作已被取消（由 Job.report 於下一次回報進度時拋出）"""
+
+
+class Job:
+    """背景工作類別（執行緒安全，工作執行緒寫入、UI 執行緒讀取）"""
+
+    def __init__(self, kind: str, label: str = ''):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.label = label
+        self.status = 'pending'  # pending / running / done / cancelled / error
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._partials = []
+        self._dropped = 0  # 超過 max_partials 而捨棄的最早批數
+        self.max_partials = None  # 保留的部分結果批數上限，None 為全部保留
+        self._cleanups = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ('pending', 'running')
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """要求取消；工作於下一次回報進度時停止，已產出的部分結果保留"""
+        self._cancel.set()
+
+    def report(self, progress: float, partial: Any = None, message: str = None) -> None:
+        """
+        回報進度（供工作函式呼叫）
+
+        Args:
+            progress: 完成比例 0~1
+            partial: 本批部分結果，依序累積（設定 max_partials 時只保留最新的批次）
+            message: 目前階段說明
+
+        Raises:
+            JobCancelled: 已要求取消時
+        """
+        with self._lock:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+            if partial is not None:
+                self._partials.append(partial)
+                excess = len(self._partials) - (self.max_partials or len(self._partials))
+                if excess > 0:
+                    del self._partials[:excess]
+                    self._dropped += excess
+            if message is not None:
+                self.message = message
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def partials(self, start: int = 0) -> List[Any]:
+        """第 start 批之後的部分結果，UI 每次只取新增的批次（已捨棄的批次略過）"""
+        with self._lock:
+            return self._partials[max(start - self._dropped, 0):]
+
+    def add_cleanup(self, func: Callable[[], None]) -> None:
+        """登記工作移除時執行的清理函式，如刪除暫存檔"""
+        with self._lock:
+            self._cleanups.append(func)
+
+    def discard(self) -> None:
+        """執行清理函式（JobManager 移除已結束的工作或關閉時呼叫）"""
+        with self._lock:
+            cleanups, self._cleanups = self._cleanups, []
+        for func in cleanups:
+            func()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """目前狀態（不含部分結果）"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'label': self.label,
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'partials': self._dropped + len(self._partials),
+                'error': self.error,
+                'elapsed': (self.finished or time.time()) - self.created
+            }
+
+    def _finish(self, status: str, result: Any = None, error: str = None) -> None:
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == 'done':
+                self.progress = 1.0
+            self.finished = time.time()
+        metrics.count(f'jobs.{status}')
+
+
+class JobManager:
+    """背景工作管理類別（可跨 Streamlit session 共用）"""
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 32):
+        """
+        Args:
+            max_workers: 同時執行的工作數，超過時排隊等候
+            max_finished: 保留的已結束工作數，超過時移除最早結束者
+        """
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable[..., Any], *args, kind: str = 'job', label: str = '',
+               **kwargs) -> Job:
+        """
+        提交背景工作
+
+        Args:
+            func: 工作函式 func(job, *args, **kwargs)，以 job.report 回報進度，回傳最終結果
+            kind: 工作類別，如 'batch'、'sensitivity'
+            label: 顯示名稱
+
+        Returns:
+            Job: 工作物件
+        """
+        job = Job(kind, label)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Union[Job, None]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[Job]:
+        """全部工作（依建立時間排序）"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.created)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel()
+        return True
+
+    def shutdown(self) -> None:
+        """取消所有工作並等候執行緒結束"""
+        for job in self.jobs():
+            job.cancel()
+        self._pool.shutdown(wait=True)
+        for job in self.jobs():
+            job.discard()
+
+    def stats(self) -> Dict[str, Any]:
+        """各狀態工作數"""
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'cancelled': 0, 'error': 0}
+        for job in self.jobs():
+            counts[job.status] += 1
+        return {'max_workers': self.max_workers, **counts}
+
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        if job.cancelled:
+            job._finish('cancelled')
+            return
+        with job._lock:
+            job.status = 'running'
+        try:
+            result = func(job, *args, **kwargs)
+        except JobCancelled:
+            job._finish('cancelled')
+        except Exception as e:
+            job._finish('error', error=f"{type(e).__name__}: {e}")
+        else:
+            job._finish('done', result)
+
+    def _prune(self) -> None:
+        finished = sorted((job for job in self._jobs.values() if not job.active),
+                          key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+            job.discard()
+
+
+def batch_compare_job(job: Job, data: bytes, chunk_size: int = 20_000,
+                      defaults: Dict[str, Any] = None, calculators: Dict[str, Any] = None,
+                      executor: ParallelExecutor = None, excel: bool = False,
+                      preview_rows: int = 10_000) -> Dict[str, Any]:
+    """
+    背景批次比對：逐批計算上傳的 CSV，結果逐批寫入暫存檔，只保留最新的預覽列作為部分結果
+
+    Args:
+        job: 工作物件
+        data: CSV 檔案內容
+        chunk_size: 每批列數，亦為進度與取消的粒度
+        defaults: 補齊 CSV 缺少欄位的參數字典（如目前側邊欄參數）
+        calculators, executor: 同 BatchComparator.compare
+        excel: 是否同時以 ReportExporter.export_batch 串流產生 Excel 活頁簿
+        preview_rows: 部分結果保留的最新列數（供進度畫面預覽）
+
+    Returns:
+        Dict: summary（誤差統計）、csv（逐案結果 CSV 路徑）、excel（活頁簿路徑，未要求時為 None）；
+              暫存檔於工作自 JobManager 移除時刪除
+    """
+    total_rows = max(data.count(b'\n') - 1, 1)  # 扣除標題列；結尾無換行時略少估一列
+    directory = tempfile.mkdtemp(prefix='urban_renewal_job_')
+    job.add_cleanup(lambda: shutil.rmtree(directory, ignore_errors=True))
+    csv_path = os.path.join(directory, '批次比對結果.csv')
+    excel_path = os.path.join(directory, '批次比對報表.xlsx') if excel else None
+    job.max_partials = max(1, -(-preview_rows // chunk_size))
+    job.report(0.0, message='讀取中')
+    chunks = pd.read_csv(io.BytesIO(data), chunksize=chunk_size)
+    if defaults:
+        chunks = (chunk.assign(**{k: v for k, v in defaults.items() if k not in chunk.columns and v is not None})
+                  for chunk in chunks)
+
+    done = 0
+    def write(result: pd.DataFrame) -> None:
+        nonlocal done
+        result.to_csv(csv_path, mode='a' if done else 'w', header=not done,
+                      index=False, encoding='utf-8' if done else 'utf-8-sig')
+        done += len(result)
+        job.report(done / total_rows, result.tail(preview_rows), f'已完成 {done:,} 筆')
+
+    if excel:
+        totals = ReportExporter().export_batch(chunks, excel_path, calculators, executor=executor,
+                                               include_inputs=False, on_result=write)
+    else:
+        summary = CompareSummary()
+        for result in BatchComparator().iter_compare(chunks, calculators, summary=summary,
+                                                     executor=executor):
+            write(result)
+        totals = summary.to_dict()
+    return {'summary': totals, 'csv': csv_path, 'excel': excel_path}
+
+
+def sensitivity_job(job: Job, params: Dict[str, Any],
+                    factors: Sequence[Union[str, Tuple[str, str]]] = None,
+                    levels: Sequence[float] = None, factors_per_step: int = 1,
+                    analyzer: SensitivityAnalyzer = None, executor: ParallelExecutor = None,
+                    store: ResultStore = None) -> Dict[str, Any]:
+    """
+    背景敏感度分析：參數分批計算，每批的摘要列作為部分結果回報，最後合併為完整結果
+
+    Args:
+        job: 工作物件
+        params, factors, levels, executor, store: 同 SensitivityAnalyzer.analyze
+        factors_per_step: 每批參數數，亦為進度與取消的粒度
+        analyzer: 敏感度分析器，預設新建
+
+    Returns:
+        Dict: 同 SensitivityAnalyzer.analyze
+    """
+    analyzer = analyzer or SensitivityAnalyzer()
+    factors = list(factors or analyzer.factors)
+    levels = np.asarray(analyzer.levels if levels is None else levels, dtype=float)
+    parts = []
+    for start in range(0, len(factors), factors_per_step):
+        part = analyzer.analyze(params, factors=factors[start:start + factors_per_step], levels=levels,
+                                executor=executor, store=store)
+        parts.append(part)
+        done = min(start + factors_per_step, len(factors))
+        job.report(done / len(factors), part['summary_df'], f'已完成 {done} / {len(factors)} 個參數')
+    return analyzer.combine(parts)
+
+
+def sobol_job(job: Job, params: Dict[str, Any], analyzer: SensitivityAnalyzer = None,
+              **options) -> Dict[str, Any]:
+    """
+    背景全域敏感度分析：每批取樣計算完成後回報進度
+
+    Args:
+        job: 工作物件
+        params: 基準參數字典
+        analyzer: 敏感度分析器，預設新建
+        options: 傳給 SensitivityAnalyzer.sobol 的其他參數，如 n_samples、span、executor、store
+
+    Returns:
+        Dict: 同 SensitivityAnalyzer.sobol
+    """
+    analyzer = analyzer or SensitivityAnalyzer()
+    return analyzer.sobol(params, progress=lambda done: job.report(done, message=f'取樣計算 {done:.0%}'),
+                          **options)
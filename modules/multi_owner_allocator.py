@@ -0,0 +1,137 @@
+"""
+多地主權利分配模組
+全基地容積與成本只計算一次，再以地主清冊一次向量化計算每位地主的
+分配價值、換回坪數、找補與投資報酬，並彙總基地層級總計
+"""
+
+from typing import Dict, Any, Union
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine, _safe_divide
+
+class MultiOwnerAllocator:
+    """多地主權利分配類別（無狀態，可多執行緒共用）"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+        # 地主清冊欄位別名 → 逐筆參數名稱
+        self.column_aliases = {
+            'land_area': 'personal_land_area',
+            'building_area': 'personal_building_area'
+        }
+        # 輸出的各地主結果欄位
+        self.owner_fields = (
+            'ownership_ratio', 'personal_land_area', 'personal_building_area',
+            'personal_allocated_value', 'return_area_ping', 'surplus', 'shortfall',
+            'estimated_original_value', 'personal_cost', 'net_benefit', 'roi'
+        )
+
+    def allocate(self, params: Dict[str, Any], owners: Union[pd.DataFrame, Dict[str, Any]],
+                 id_column: str = 'owner_id') -> Dict[str, Any]:
+        """
+        全基地多地主權利分配
+
+        Args:
+            params: 基地參數字典（同單案參數；personal_land_area / personal_building_area
+                未提供時以全體地主合計推估原容積率）
+            owners: 地主清冊，每列一位地主；欄位：
+                land_area（或 personal_land_area）：持分土地面積（坪）
+                building_area（或 personal_building_area）：持有建物面積（坪）
+                ownership_ratio：選填，未提供時為 land_area / total_land_area
+                original_value：選填，更新前權利價值，提供時取代 ROI 的估計原值
+            id_column: 地主識別欄位，未提供時以列序編號
+
+        Returns:
+            Dict: owners_df（各地主結果）、totals（基地總計）、volume、cost（全基地純量結果）
+        """
+        table = pd.DataFrame(owners).rename(columns=self.column_aliases)
+        n = len(table)
+        if n == 0:
+            raise ValueError("地主清冊不可為空")
+        total_land_area = float(params['total_land_area'])
+
+        land = _column(table, 'personal_land_area', n)
+        building = _column(table, 'personal_building_area', n)
+        if 'ownership_ratio' in table.columns:
+            ratio = table['ownership_ratio'].to_numpy(dtype=float)
+        else:
+            if np.isnan(land).any():
+                raise ValueError("地主清冊需提供 land_area 或 ownership_ratio")
+            ratio = land / total_land_area
+        if ratio.sum() > 1 + 1e-9:
+            raise ValueError(f"地主持分比例合計 {ratio.sum():.4f} 超過 1")
+
+        # 1. 全基地容積與成本：與地主人數無關，只算一次
+        base = {k: v for k, v in params.items() if v is not None}
+        base.setdefault('personal_land_area', float(np.nansum(land)) if not np.isnan(land).all()
+                        else total_land_area * float(ratio.sum()))
+        base.setdefault('personal_building_area', float(np.nansum(building)))
+        base_cols = self.engine.to_columns(base)
+        vol = self.engine.calculate_volume(base_cols)
+        cost = self.engine.calculate_total_costs(base_cols, vol)
+
+        # 2. 各地主分配：同一組基地結果廣播至全部地主，一次計算
+        owner_cols = {
+            **base_cols,
+            'ownership_ratio': ratio,
+            'personal_building_area': np.nan_to_num(building)
+        }
+        alloc = self.engine.calculate_allocation(owner_cols, vol, cost)
+
+        if 'original_value' in table.columns:
+            original = table['original_value'].to_numpy(dtype=float)
+            given = ~np.isnan(original)
+            alloc['estimated_original_value'] = np.where(given, original, alloc['estimated_original_value'])
+            alloc['net_benefit'] = (alloc['personal_allocated_value'] - alloc['estimated_original_value']
+                                    - alloc['personal_cost'])
+            alloc['roi'] = _safe_divide(alloc['net_benefit'], alloc['estimated_original_value'],
+                                        alloc['estimated_original_value'] > 0)
+
+        values = {'ownership_ratio': ratio, 'personal_land_area': land,
+                  'personal_building_area': building, **alloc}
+        owners_df = pd.DataFrame({
+            id_column: table[id_column].to_numpy() if id_column in table.columns else np.arange(n),
+            **{field: np.broadcast_to(values[field], (n,)) for field in self.owner_fields}
+        })
+
+        volume = {k: _scalar(v) for k, v in vol.items()}
+        cost = {k: _scalar(v) for k, v in cost.items()}
+        return {
+            'owners_df': owners_df,
+            'totals': self._totals(owners_df, volume, cost, base_cols),
+            'volume': volume,
+            'cost': cost
+        }
+
+    def _totals(self, owners_df: pd.DataFrame, volume: Dict[str, Any], cost: Dict[str, Any],
+                base_cols: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """基地總計：地主分配合計 + 實施者分配 = 共同負擔後淨值"""
+        effective_price = _scalar(base_cols['market_price'] * base_cols['scenario_factor'])
+        total_revenue = volume['saleable_volume_ping'] * effective_price
+        net_value = total_revenue - cost['total_cost']
+        ratio_sum = float(owners_df['ownership_ratio'].sum())
+        owners_value = float(owners_df['personal_allocated_value'].sum())
+        return {
+            'owner_count': len(owners_df),
+            'ownership_ratio_sum': ratio_sum,
+            'total_revenue': total_revenue,
+            'total_cost': cost['total_cost'],
+            'net_value': net_value,
+            'owners_allocated_value': owners_value,
+            'developer_share': net_value * (1 - ratio_sum),
+            'return_area_ping': float(owners_df['return_area_ping'].sum()),
+            'surplus': float(owners_df['surplus'].sum()),
+            'shortfall': float(owners_df['shortfall'].sum())
+        }
+
+
+def _column(table: pd.DataFrame, name: str, n: int) -> np.ndarray:
+    if name in table.columns:
+        return table[name].to_numpy(dtype=float)
+    return np.full(n, np.nan)
+
+
+def _scalar(value: Any) -> Any:
+    array = np.asarray(value)
+    return array.reshape(-1)[0].item() if array.size else None
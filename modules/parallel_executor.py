@@ -0,0 +1,94 @@
+"""
+多核心平行運算模組
+將批次陣列切分為分片，以行程池平行計算並依原順序合併結果
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, List, Mapping, Union
+
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine, Columns
+
+class ParallelExecutor:
+    """行程池平行運算類別（執行緒安全，可多執行緒共用同一行程池）"""
+
+    def __init__(self, max_workers: int = None, chunk_size: int = 50_000):
+        """
+        Args:
+            max_workers: 工作行程數，預設為 CPU 核心數
+            chunk_size: 每個分片的列數；總列數不超過此值時直接於本行程計算
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ParallelExecutor':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """關閉行程池"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def run_engine(self, engine: VectorizedEngine,
+                   data: Union[pd.DataFrame, Mapping[str, Any]]) -> Columns:
+        """以行程池分片執行 engine.run，結果與單行程計算相同且順序不變"""
+        return self.map_columns(_run_engine, engine.to_columns(data), engine)
+
+    def map_columns(self, func: Callable[..., Columns], cols: Columns, *args) -> Columns:
+        """
+        將欄位陣列切分為分片後平行執行 func(shard, *args)，再依序串接結果
+
+        廣播而來的常數欄位以純量傳送，只有實際變動的欄位才會序列化整段陣列
+
+        Args:
+            func: 模組層級函式（需可被 pickle），回傳 {名稱: 陣列}
+            cols: 等長的欄位陣列字典
+            args: 傳給 func 的其他參數
+
+        Returns:
+            Dict: 串接後的結果陣列
+        """
+        n_rows = len(next(iter(cols.values()))) if cols else 0
+        if n_rows <= self.chunk_size or self.max_workers <= 1:
+            return func(cols, *args)
+
+        constants = {k: float(v[0]) for k, v in cols.items() if v.strides == (0,)}
+        arrays = {k: v for k, v in cols.items() if k not in constants}
+        bounds = range(0, n_rows, self.chunk_size)
+        shards = [{**constants, **{k: v[start:start + self.chunk_size] for k, v in arrays.items()}}
+                  for start in bounds]
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            pool = self._pool
+        sizes = [min(self.chunk_size, n_rows - start) for start in bounds]
+        parts = list(pool.map(_call_shard, [(func, shard, size, args)
+                                            for shard, size in zip(shards, sizes)]))
+        return _concat(parts)
+
+
+def _run_engine(cols: Columns, engine: VectorizedEngine) -> Columns:
+    return engine.run(cols)
+
+
+def _call_shard(task) -> Columns:
+    """工作行程：還原常數欄位長度後執行計算"""
+    func, shard, size, args = task
+    shard = {k: np.broadcast_to(np.asarray(v, dtype=float), (size,)) for k, v in shard.items()}
+    return {k: np.broadcast_to(v, (size,)) for k, v in func(shard, *args).items()}
+
+
+def _concat(parts: List[Columns]) -> Columns:
+    return {k: np.concatenate([part[k] for part in parts]) for k in parts[0]}
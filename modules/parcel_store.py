@@ -0,0 +1,178 @@
+"""
+地籍與營建單價參照模組
+由本機 CSV / Parquet 載入地號 → 使用分區、法定容積率、基地面積、建築年代的對照表，
+以記憶體雜湊索引一次對整批地號補齊批次試算欄位；
+並將 cost_parameters.json 的營建單價表編譯為依（設計）樓層數查詢的級距陣列
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Any, List, Sequence, Union
+import numpy as np
+import pandas as pd
+
+DEFAULT_COST_PARAMETERS = Path(__file__).resolve().parents[1] / 'data' / 'cost_parameters.json'
+
+class ConstructionCostTable:
+    """營建單價級距查詢類別（依樓層數向量化查表）"""
+
+    def __init__(self, tiers: List[Dict[str, Any]]):
+        """
+        Args:
+            tiers: 各級距 {'name', 'min_floors', 'max_floors', 'unit_cost'}
+        """
+        tiers = sorted(tiers, key=lambda t: t['max_floors'])
+        self.names = np.array([t['name'] for t in tiers])
+        self.max_floors = np.array([t['max_floors'] for t in tiers], dtype=float)
+        self.unit_costs = np.array([t['unit_cost'] for t in tiers], dtype=float)
+
+    @classmethod
+    def from_json(cls, path: Union[str, os.PathLike] = DEFAULT_COST_PARAMETERS) -> 'ConstructionCostTable':
+        """
+        讀取 cost_parameters.json 的 base_construction_costs
+
+        樓層範圍取自各項 description 的「(1-5層)」字樣，或 min_floors / max_floors 欄位
+        """
+        with open(path, encoding='utf-8') as f:
+            costs = json.load(f)['base_construction_costs']
+        tiers = []
+        for name, item in costs.items():
+            if 'max_floors' in item:
+                low, high = item.get('min_floors', 1), item['max_floors']
+            else:
+                match = re.search(r'(\d+)\s*-\s*(\d+)\s*層', item.get('description', ''))
+                if match is None:
+                    raise ValueError(f"無法判讀營建單價級距的樓層範圍: {name}")
+                low, high = int(match.group(1)), int(match.group(2))
+            tiers.append({'name': name, 'min_floors': low, 'max_floors': high,
+                          'unit_cost': item['unit_cost']})
+        return cls(tiers)
+
+    def tier_index(self, floors: Union[float, Sequence[float], np.ndarray]) -> np.ndarray:
+        """樓層數所屬級距索引；超過最高級距者歸入最高級距"""
+        index = np.searchsorted(self.max_floors, np.asarray(floors, dtype=float), side='left')
+        return np.minimum(index, len(self.max_floors) - 1)
+
+    def unit_cost(self, floors: Union[float, Sequence[float], np.ndarray]) -> np.ndarray:
+        """營建單價（元/坪）；樓層數缺值時為 NaN"""
+        floors = np.asarray(floors, dtype=float)
+        return np.where(np.isnan(floors), np.nan, self.unit_costs[self.tier_index(floors)])
+
+    def tier_name(self, floors: Union[float, Sequence[float], np.ndarray]) -> np.ndarray:
+        return self.names[self.tier_index(floors)]
+
+
+class ParcelStore:
+    """地籍參照資料類別（建立後唯讀，可多執行緒共用）"""
+
+    def __init__(self, table: pd.DataFrame, id_column: str = 'parcel_id',
+                 cost_table: ConstructionCostTable = None):
+        """
+        Args:
+            table: 地籍資料，每列一筆地號；可含 zone、legal_far（倍數，如 2.25）、
+                   total_land_area（坪）、building_year、num_floors 等欄位
+            id_column: 地號欄位名稱
+            cost_table: 營建單價表，預設讀取 data/cost_parameters.json
+        """
+        ids = table[id_column].astype(str)
+        if ids.duplicated().any():
+            raise ValueError(f"地號重複: {ids[ids.duplicated()].unique()[:5].tolist()}")
+        self.id_column = id_column
+        self.index = pd.Index(ids.to_numpy())  # 雜湊索引，整批查詢為 O(n)
+        # 各欄位轉為連續陣列，查詢時以位置索引直接取值
+        self.columns = {
+            name: (table[name].to_numpy(dtype=float) if pd.api.types.is_numeric_dtype(table[name])
+                   else table[name].to_numpy(dtype=object))
+            for name in table.columns if name != id_column
+        }
+        self.cost_table = cost_table or ConstructionCostTable.from_json()
+
+    @classmethod
+    def from_file(cls, path: Union[str, os.PathLike], id_column: str = 'parcel_id',
+                  cost_table: ConstructionCostTable = None) -> 'ParcelStore':
+        """由 .csv 或 .parquet 檔載入（Parquet 需安裝 pyarrow 或 fastparquet）"""
+        if str(path).lower().endswith(('.parquet', '.pq')):
+            table = pd.read_parquet(path)
+        else:
+            table = pd.read_csv(path, dtype={id_column: str})  # 保留地號前導零
+        return cls(table, id_column, cost_table)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def positions(self, ids: Union[Sequence[Any], np.ndarray, pd.Series]) -> np.ndarray:
+        """地號於參照表中的位置，查無者為 -1"""
+        return self.index.get_indexer(pd.Index(np.asarray(ids).astype(str)))
+
+    def lookup(self, ids: Union[Sequence[Any], np.ndarray, pd.Series],
+               columns: List[str] = None) -> pd.DataFrame:
+        """
+        整批查詢地號
+
+        Args:
+            ids: 地號序列
+            columns: 要取出的欄位，預設全部
+
+        Returns:
+            pd.DataFrame: 與 ids 同順序，查無的地號為缺值
+        """
+        pos = self.positions(ids)
+        found = pos >= 0
+        safe = np.where(found, pos, 0)
+        data = {}
+        for name in columns or list(self.columns):
+            values = self.columns[name][safe]
+            if values.dtype == object:
+                values[~found] = None
+            else:
+                values[~found] = np.nan
+            data[name] = values
+        return pd.DataFrame(data)
+
+    def enrich(self, df: pd.DataFrame, id_column: str = None, overwrite: bool = False,
+               design_floors_column: str = 'design_floors',
+               coverage_ratio: float = 0.6) -> pd.DataFrame:
+        """
+        依地號補齊批次試算欄位
+
+        營建單價是新建物的造價，級距依更新後的設計樓層數查詢，而非參照表中原建物的 num_floors；
+        df 未提供設計樓層數時，以法定容積率 ÷ 建蔽率（無條件進位）估算
+
+        Args:
+            df: 批次案例，需含地號欄位
+            id_column: df 的地號欄位名稱，預設同參照表
+            overwrite: True 時以參照表取代既有值（僅限查得的地號）；否則僅補齊缺值
+            design_floors_column: df 中設計樓層數的欄位名稱
+            coverage_ratio: 估算設計樓層數的建蔽率，預設同標準建蔽率 0.6
+
+        Returns:
+            pd.DataFrame: 補齊後的新 DataFrame（查無地號的列維持原值或缺值）
+        """
+        ids = df[id_column or self.id_column]
+        matched = pd.Series(self.positions(ids) >= 0, index=df.index)
+        found = self.lookup(ids)
+        found.index = df.index
+        out = df.copy()
+        for name in found.columns:
+            if name not in out.columns:
+                out[name] = found[name]
+            elif overwrite:
+                out[name] = found[name].where(matched, out[name])
+            else:
+                out[name] = out[name].where(out[name].notna(), found[name])
+
+        if design_floors_column in out.columns:
+            design_floors = pd.to_numeric(out[design_floors_column], errors='coerce')
+        else:
+            design_floors = pd.Series(np.nan, index=out.index)
+        if 'legal_far' in out.columns:
+            legal_far = pd.to_numeric(out['legal_far'], errors='coerce')
+            design_floors = design_floors.fillna(np.ceil(legal_far / coverage_ratio))
+        tier_cost = self.cost_table.unit_cost(design_floors.to_numpy())
+        if 'unit_cost' not in out.columns:
+            out['unit_cost'] = tier_cost
+        else:
+            out['unit_cost'] = out['unit_cost'].where(out['unit_cost'].notna(), tier_cost)
+        return out
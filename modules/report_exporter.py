@@ -0,0 +1,246 @@
+"""
+Excel 報表匯出模組
+以 openpyxl 唯寫（串流）模式輸出多工作表活頁簿，批次結果逐批寫入，
+記憶體用量與列數無關；超過 Excel 單一工作表列數上限時自動接續至新工作表
+"""
+
+import io
+import os
+import re
+from typing import Dict, Any, Callable, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from .batch_comparator import BatchComparator, CompareSummary
+from .parallel_executor import ParallelExecutor
+
+Frames = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+EXCEL_MAX_ROWS = 1_048_576
+
+class ReportExporter:
+    """Excel 報表匯出類別"""
+
+    def __init__(self, max_rows_per_sheet: int = EXCEL_MAX_ROWS):
+        """
+        Args:
+            max_rows_per_sheet: 每個工作表的列數上限（含標題列），超過時接續至「名稱 (2)」等工作表
+        """
+        self.max_rows_per_sheet = max_rows_per_sheet
+        self.header_font = Font(bold=True, color='FFFFFF')
+        self.header_fill = PatternFill('solid', fgColor='1F4E79')
+        self.column_width = 16
+
+    def write(self, target: Union[str, os.PathLike, io.BytesIO], sheets: Dict[str, Frames]) -> Dict[str, int]:
+        """
+        依序寫入多個工作表
+
+        Args:
+            target: 輸出檔案路徑或 BytesIO
+            sheets: {工作表名稱: DataFrame 或逐批產出 DataFrame 的可迭代物件}
+
+        Returns:
+            Dict: 各工作表寫入的資料列數
+        """
+        workbook = Workbook(write_only=True)
+        counts = {name: self._write_sheet(workbook, name, frames) for name, frames in sheets.items()}
+        workbook.save(target)
+        return counts
+
+    def export_batch(self, source: Union[str, os.PathLike, Iterable[pd.DataFrame]],
+                     target: Union[str, os.PathLike, io.BytesIO],
+                     calculators: Dict[str, Any] = None, chunk_size: int = 100_000,
+                     executor: ParallelExecutor = None, include_inputs: bool = True,
+                     sensitivity: Dict[str, Any] = None,
+                     on_result: Callable[[pd.DataFrame], None] = None) -> Dict[str, Any]:
+        """
+        串流批次比對並匯出活頁簿：誤差統計、逐案結果、輸入參數（選擇性）、敏感度表（選擇性）
+
+        每批讀取後立即計算並寫入逐案結果與輸入參數工作表，不保留整批資料
+
+        Args:
+            source: CSV 檔案路徑，或逐批產出 DataFrame 的可迭代物件
+            target: 輸出檔案路徑或 BytesIO
+            calculators, chunk_size, executor: 同 BatchComparator.iter_compare
+            include_inputs: 是否輸出輸入參數工作表
+            sensitivity: SensitivityAnalyzer.analyze 結果，提供時加入敏感度工作表
+            on_result: 每批比對結果寫入後呼叫，如回報進度或另存 CSV
+
+        Returns:
+            Dict: 全部案例的誤差統計
+        """
+        if isinstance(source, (str, os.PathLike)):
+            source = pd.read_csv(source, chunksize=chunk_size)
+        comparator = BatchComparator()
+        summary = CompareSummary()
+
+        # 唯寫模式各工作表獨立串流，逐案結果與輸入參數可逐批交錯寫入
+        workbook = Workbook(write_only=True)
+        summary_sheet = workbook.create_sheet('誤差統計')  # 置於最前，內容於全部批次完成後寫入
+        results = _SheetWriter(self, workbook, '逐案結果')
+        inputs = _SheetWriter(self, workbook, '輸入參數') if include_inputs else None
+        for chunk in source:
+            result = comparator.compare(chunk, calculators, executor)
+            summary.update(result)
+            results.write(result)
+            if inputs is not None:
+                inputs.write(chunk)
+            if on_result is not None:
+                on_result(result)
+
+        totals = summary.to_dict()
+        self._append_frame(summary_sheet, self.summary_frame(totals), header=True)
+        if sensitivity is not None:
+            for name, frame in self.sensitivity_sheets(sensitivity).items():
+                self._write_sheet(workbook, name, frame)
+        _group_sheets(workbook)
+        workbook.save(target)
+        return totals
+
+    def export_case(self, target: Union[str, os.PathLike, io.BytesIO], params: Dict[str, Any],
+                    volume_results: Dict[str, Any], cost_results: Dict[str, Any],
+                    allocation_results: Dict[str, Any], calculators: Dict[str, Any],
+                    sensitivity: Dict[str, Any] = None) -> Dict[str, int]:
+        """
+        匯出單案報表：輸入參數、容積比較、成本明細、分配摘要與敏感度表
+
+        Args:
+            target: 輸出檔案路徑或 BytesIO
+            params: 參數字典
+            volume_results, cost_results, allocation_results: 逐筆計算器結果
+            calculators: 逐筆計算器 {'volume', 'alloc'}，用於產生比較表與摘要表
+            sensitivity: SensitivityAnalyzer.analyze 結果（選擇性）
+
+        Returns:
+            Dict: 各工作表寫入的資料列數
+        """
+        sheets = {
+            '輸入參數': pd.DataFrame({'參數': list(params), '數值': [_cell(v) for v in params.values()]}),
+            '容積比較': pd.DataFrame(calculators['volume'].get_volume_comparison_table(volume_results)),
+            '成本明細': pd.DataFrame({
+                '項目': list(cost_results),
+                '數值': [_cell(v) for v in cost_results.values()]
+            }),
+            '分配摘要': calculators['alloc'].get_allocation_summary_table(allocation_results)
+        }
+        if sensitivity is not None:
+            sheets.update(self.sensitivity_sheets(sensitivity))
+        return self.write(target, sheets)
+
+    @staticmethod
+    def summary_frame(totals: Dict[str, Any]) -> pd.DataFrame:
+        """誤差統計（CompareSummary.to_dict）轉為「項目 / 數值」兩欄表格"""
+        return pd.DataFrame({'項目': list(totals), '數值': list(totals.values())})
+
+    @staticmethod
+    def sensitivity_sheets(sensitivity: Dict[str, Any]) -> Dict[str, pd.DataFrame]:
+        """敏感度分析結果的工作表：摘要、龍捲風圖與蛛網圖資料"""
+        return {
+            '敏感度摘要': sensitivity['summary_df'],
+            '龍捲風圖資料': sensitivity['tornado_df'],
+            '蛛網圖資料': sensitivity['spider_df']
+        }
+
+    def _write_sheet(self, workbook: Workbook, name: str, frames: Frames) -> int:
+        writer = _SheetWriter(self, workbook, name)
+        for frame in ([frames] if isinstance(frames, pd.DataFrame) else frames):
+            writer.write(frame)
+        return writer.rows
+
+    def _append_frame(self, sheet, frame: pd.DataFrame, header: bool) -> None:
+        if header:
+            for i in range(len(frame.columns)):
+                sheet.column_dimensions[_column_letter(i)].width = self.column_width
+            sheet.freeze_panes = 'A2'
+            cells = []
+            for name in frame.columns:
+                cell = WriteOnlyCell(sheet, value=str(name))
+                cell.font = self.header_font
+                cell.fill = self.header_fill
+                cells.append(cell)
+            sheet.append(cells)
+        if len(frame) == 0:
+            return
+        # 逐欄轉為 Python 物件，缺值寫為空白儲存格
+        columns = [_to_cells(frame[name]) for name in frame.columns]
+        for row in zip(*columns):
+            sheet.append(row)
+
+
+class _SheetWriter:
+    """逐批寫入同一工作表；第一批決定欄位，超過列數上限時建立「名稱 (2)」等接續工作表並重寫標題列"""
+
+    def __init__(self, exporter: ReportExporter, workbook: Workbook, name: str):
+        self.exporter = exporter
+        self.workbook = workbook
+        self.name = name
+        self.sheet = None
+        self.columns = None
+        self.parts = 0
+        self.rows_in_sheet = 0
+        self.rows = 0
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        frame = frame.reindex(columns=self.columns)
+        limit = self.exporter.max_rows_per_sheet
+        start = 0
+        while start < len(frame) or self.sheet is None:
+            if self.sheet is None or self.rows_in_sheet >= limit:
+                self.parts += 1
+                self.sheet = self.workbook.create_sheet(
+                    self.name if self.parts == 1 else f'{self.name} ({self.parts})')
+                self.exporter._append_frame(self.sheet, frame.iloc[:0], header=True)
+                self.rows_in_sheet = 1
+            part = frame.iloc[start:start + limit - self.rows_in_sheet]
+            self.exporter._append_frame(self.sheet, part, header=False)
+            self.rows_in_sheet += len(part)
+            start += max(len(part), 1)
+        self.rows += len(frame)
+
+
+def _group_sheets(workbook: Workbook) -> None:
+    """交錯寫入時建立的接續工作表移至同名工作表之後"""
+    base = lambda sheet: re.sub(r' \(\d+\)$', '', sheet.title)
+    order = {}
+    for sheet in workbook.worksheets:
+        order.setdefault(base(sheet), len(order))
+    for position, sheet in enumerate(sorted(workbook.worksheets, key=lambda ws: order[base(ws)])):
+        workbook.move_sheet(sheet.title, position - workbook.index(sheet))
+
+
+def _to_cells(series: pd.Series) -> List[Any]:
+    values = series.to_numpy()
+    if values.dtype.kind == 'f':
+        return np.where(np.isnan(values), None, values).tolist()
+    if values.dtype.kind in 'biu':
+        return values.tolist()
+    return [None if _missing(v) else _cell(v) for v in values.tolist()]
+
+
+def _cell(value: Any) -> Any:
+    """非 Excel 原生型別（陣列、字典等）轉為字串"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return str(value)
+
+
+def _missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA
+
+
+def _column_letter(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
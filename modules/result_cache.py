@@ -0,0 +1,124 @@
+"""
+結果快取模組
+以參數內容雜湊為鍵，快取容積、成本、分配與敏感度計算結果
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable
+
+import numpy as np
+
+from . import __version__
+from .instrumentation import metrics
+
+class ResultCache:
+    """LRU 結果快取類別（執行緒安全，可跨 Streamlit session 共用）"""
+
+    def __init__(self, max_entries: int = 256, model_version: str = __version__):
+        self.max_entries = max_entries
+        self.model_version = model_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, params: Dict[str, Any], namespace: str = 'pipeline') -> str:
+        """產生參數字典的正規化雜湊鍵（見 make_key）"""
+        return make_key(params, namespace, self.model_version)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count('result_cache.hits')
+                return self._entries[key]
+            self.misses += 1
+            metrics.count('result_cache.misses')
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                metrics.count('result_cache.evictions')
+
+    def get_or_compute(self, params: Dict[str, Any], compute: Callable[[], Any],
+                       namespace: str = 'pipeline') -> Any:
+        """
+        查詢快取，未命中時執行 compute 並寫回
+
+        Args:
+            params: 參數字典
+            compute: 無參數的計算函式
+            namespace: 結果類別，如 'pipeline'、'sensitivity'
+
+        Returns:
+            快取或新計算的結果
+        """
+        key = self.make_key(params, namespace)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """快取統計：項目數、命中、未命中、淘汰次數與命中率"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'model_version': self.model_version
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_key(params: Dict[str, Any], namespace: str = 'pipeline',
+             model_version: str = __version__) -> str:
+    """
+    產生參數字典的正規化雜湊鍵
+
+    數值一律轉為浮點數、鍵排序後序列化，並納入模型版本與命名空間，
+    模型版本變更時舊結果自然失效
+    """
+    canonical = json.dumps(
+        {'version': model_version, 'namespace': namespace,
+         'params': {k: _normalize(v) for k, v in params.items()}},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _normalize(value: Any) -> Any:
+    """將參數值轉為可穩定序列化的形式"""
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return str(value)
@@ -0,0 +1,490 @@
+"""
+持久化結果儲存模組
+以 SQLite 檔案保存試算結果，鍵為正規化參數雜湊加模型版本，程序重啟或跨批次作業皆可沿用；
+整批結果以區塊寫入並以記憶體索引向量化查詢，支援容量上限淘汰與壓縮整理
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Callable, Tuple, Union, Mapping
+
+import numpy as np
+import pandas as pd
+
+from . import __version__
+from .instrumentation import metrics
+from .result_cache import make_key
+from .vectorized_engine import VectorizedEngine, Columns
+
+DEFAULT_STORE_PATH = Path.home() / '.cache' / 'urban_renewal' / 'results.sqlite'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key INTEGER PRIMARY KEY,
+    check_key INTEGER NOT NULL,
+    namespace TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+CREATE TABLE IF NOT EXISTS row_blocks (
+    block_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    namespace TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    columns TEXT NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    keys BLOB NOT NULL,
+    value BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS row_blocks_accessed ON row_blocks (accessed);
+CREATE INDEX IF NOT EXISTS row_blocks_namespace ON row_blocks (namespace, model_version);
+"""
+
+class ResultStore:
+    """持久化結果儲存類別（執行緒安全；SQLite WAL 模式下可多程序共用同一檔案）"""
+
+    def __init__(self, path: Union[str, os.PathLike] = DEFAULT_STORE_PATH,
+                 max_bytes: int = 512 * 1024 ** 2, model_version: str = __version__,
+                 block_rows: int = 50_000):
+        """
+        Args:
+            path: SQLite 檔案路徑（':memory:' 為不落地的記憶體資料庫）
+            max_bytes: 結果資料總量上限，超過時淘汰最久未使用的項目至上限的 90%
+            model_version: 模型版本，納入鍵值，版本變更時舊結果自然失效
+            block_rows: 整批結果每個區塊的列數（淘汰與讀取的單位）
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.model_version = model_version
+        self.block_rows = block_rows
+        if self.path != ':memory:':
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._indexes = {}  # namespace → 整批結果的記憶體鍵索引
+        self._total_bytes = self._stored_bytes()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # 單筆結果（單案、敏感度分析等任意可 pickle 的結果）
+    # ------------------------------------------------------------------
+
+    def make_key(self, params: Dict[str, Any], namespace: str = 'pipeline') -> str:
+        """同 ResultCache.make_key"""
+        return make_key(params, namespace, self.model_version)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        key_id, check = _split_key(key)
+        with self._lock:
+            row = self._conn.execute('SELECT check_key, value FROM results WHERE key = ?',
+                                     (key_id,)).fetchone()
+            if row is None or row[0] != check:
+                self.misses += 1
+                metrics.count('result_store.misses')
+                return default
+            self._conn.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key_id))
+            self.hits += 1
+            metrics.count('result_store.hits')
+        return pickle.loads(row[1])
+
+    def put(self, key: str, value: Any, namespace: str = '') -> None:
+        key_id, check = _split_key(key)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               (key_id, check, namespace, self.model_version, time.time(), len(blob), blob))
+            self._after_write()
+
+    def get_or_compute(self, params: Dict[str, Any], compute: Callable[[], Any],
+                       namespace: str = 'pipeline') -> Any:
+        """
+        查詢儲存的結果，未命中時執行 compute 並寫回
+
+        Args:
+            params: 參數字典
+            compute: 無參數的計算函式
+            namespace: 結果類別，如 'pipeline'、'sensitivity'
+
+        Returns:
+            儲存或新計算的結果
+        """
+        key = self.make_key(params, namespace)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value, namespace)
+        return value
+
+    # ------------------------------------------------------------------
+    # 整批結果（每列一案的向量化引擎輸出）
+    # ------------------------------------------------------------------
+
+    def row_keys(self, data: Union[pd.DataFrame, Mapping[str, Any]],
+                 engine: VectorizedEngine = None) -> np.ndarray:
+        """
+        整批計算每列的 128 位元鍵（逐欄向量化雜湊，不逐列序列化）
+
+        僅引擎讀取的參數參與雜湊，案例名稱、實際坪數等欄位不影響鍵值；
+        缺少的欄位與缺值分別雜湊（引擎對缺少的欄位另有預設值），最多少命中而不會誤用結果；
+        模型版本與引擎係數決定雜湊種子
+
+        Returns:
+            np.ndarray: (列數, 2) int64，第 0 欄為主鍵、第 1 欄為檢查碼
+        """
+        engine = engine or VectorizedEngine()
+        cols = engine.to_columns(data)
+        n = len(data) if isinstance(data, pd.DataFrame) else max((np.size(v) for v in cols.values()), default=0)
+        names = engine.input_keys()
+        column_hashes = [
+            pd.util.hash_array(np.broadcast_to(cols[name], (n,)) + 0.0) if name in cols
+            else np.zeros(n, dtype=np.uint64)
+            for name in names
+        ]
+        seed = make_key({'engine': engine.signature(), 'columns': names}, 'engine_rows',
+                        self.model_version)
+        rng = np.random.default_rng(int(seed[:32], 16))
+        keys = np.empty((n, 2), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for j in range(2):
+                salt, *multipliers = rng.integers(0, 2 ** 63, len(names) + 1, dtype=np.uint64) | np.uint64(1)
+                out = np.full(n, salt, dtype=np.uint64)
+                for h, m in zip(column_hashes, multipliers):
+                    out ^= h
+                    out *= m
+                keys[:, j] = _mix64(out)
+        return keys.view(np.int64)
+
+    def lookup_rows(self, keys: np.ndarray, namespace: str = 'engine') -> Tuple[Columns, np.ndarray]:
+        """
+        整批查詢：記憶體索引一次比對全部鍵，只讀取有命中的區塊
+
+        Args:
+            keys: row_keys 的結果
+            namespace: 結果類別
+
+        Returns:
+            Tuple: (結果欄位陣列，未命中的列為缺值；命中遮罩)
+        """
+        n = len(keys)
+        found = np.zeros(n, dtype=bool)
+        columns, values = None, None
+        with self._lock:
+            index = self._row_index(namespace)
+            if index is None:
+                self.misses += n
+                metrics.count('result_store.misses', n)
+                return {}, found
+            match = index['keys'].get_indexer(keys[:, 0])
+            ok = match >= 0
+            ok[ok] = index['checks'][match[ok]] == keys[ok, 1]
+            rows = np.flatnonzero(ok)
+            blocks = index['blocks'][match[rows]]
+            positions = index['positions'][match[rows]]
+
+            touched = np.unique(blocks).tolist()
+            for block_id in touched:
+                record = self._conn.execute('SELECT columns, value FROM row_blocks WHERE block_id = ?',
+                                            (block_id,)).fetchone()
+                if record is None:
+                    continue  # 已被其他程序淘汰，視為未命中
+                block_columns = [tuple(c) for c in json.loads(record[0])]
+                if columns is None:
+                    columns = block_columns
+                    values = np.full((n, len(columns)), np.nan)
+                elif block_columns != columns:
+                    continue
+                matrix = np.frombuffer(record[1], dtype=np.float64).reshape(-1, len(columns))
+                in_block = blocks == block_id
+                values[rows[in_block]] = matrix[positions[in_block]]
+                found[rows[in_block]] = True
+            if touched:
+                marks = ','.join('?' * len(touched))
+                self._conn.execute(f'UPDATE row_blocks SET accessed = ? WHERE block_id IN ({marks})',
+                                   [time.time(), *touched])
+            self.hits += int(found.sum())
+            self.misses += int(n - found.sum())
+            metrics.count('result_store.hits', int(found.sum()))
+            metrics.count('result_store.misses', int(n - found.sum()))
+        if columns is None:
+            return {}, found
+        return {name: _restore(values[:, j], dtype) for j, (name, dtype) in enumerate(columns)}, found
+
+    def store_rows(self, keys: np.ndarray, results: Columns, namespace: str = 'engine') -> None:
+        """整批寫入每列結果（同批重複鍵只寫一次）"""
+        n = len(keys)
+        if n == 0:
+            return
+        columns = json.dumps([(name, np.asarray(v).dtype.str) for name, v in results.items()])
+        matrix = np.column_stack([np.broadcast_to(np.asarray(v, dtype=float), (n,)) for v in results.values()])
+        _, unique = np.unique(keys[:, 0], return_index=True)
+        unique.sort()
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            for start in range(0, len(unique), self.block_rows):
+                index = unique[start:start + self.block_rows]
+                self._insert_block(namespace, columns, now, keys[index], matrix[index])
+            self._conn.execute('COMMIT')
+            self._after_write()
+
+    def run_engine(self, engine: VectorizedEngine, data: Union[pd.DataFrame, Mapping[str, Any]],
+                   executor=None, namespace: str = 'engine') -> Columns:
+        """
+        先查詢儲存結果，僅計算未命中的列並寫回，結果與 engine.run(data) 相同
+
+        逐列雜湊與讀取的成本與預設 VectorizedEngine 重算相當，僅適用於每列計算成本
+        明顯高於雜湊的引擎（批次比對因此直接重算，不經此路徑）
+
+        Args:
+            engine: 向量化引擎（其係數納入鍵值，校準後的引擎不會誤用舊結果）
+            data: DataFrame 或欄位陣列字典
+            executor: 提供時未命中的列以多行程分片計算
+            namespace: 結果類別
+
+        Returns:
+            Dict: {結果名稱: 陣列}
+        """
+        keys = self.row_keys(data, engine)
+        cached, found = self.lookup_rows(keys, namespace)
+        if found.all():
+            return cached
+        missing = np.flatnonzero(~found)
+        if isinstance(data, pd.DataFrame):
+            subset = data.iloc[missing]
+        else:
+            subset = {k: (np.broadcast_to(v, (len(keys),))[missing] if np.ndim(v) else v)
+                      for k, v in data.items()}
+        computed = executor.run_engine(engine, subset) if executor else engine.run(subset)
+        computed = {k: np.broadcast_to(v, (len(missing),)) for k, v in computed.items()}
+        self.store_rows(keys[missing], computed, namespace)
+        if not found.any():
+            return computed
+        results = {}
+        for name, values in computed.items():
+            merged = (cached[name].astype(values.dtype) if name in cached
+                      else np.empty(len(keys), dtype=values.dtype))
+            merged[missing] = values
+            results[name] = merged
+        return results
+
+    # ------------------------------------------------------------------
+    # 容量管理
+    # ------------------------------------------------------------------
+
+    def evict(self, target_bytes: int = None) -> int:
+        """
+        淘汰最久未使用的項目直到總量不超過 target_bytes（預設為上限的 90%）
+
+        Returns:
+            int: 淘汰的單筆結果與區塊數
+        """
+        with self._lock:
+            return self._evict(int(self.max_bytes * 0.9) if target_bytes is None else target_bytes)
+
+    def compact(self) -> Dict[str, Any]:
+        """
+        壓縮整理：刪除其他模型版本的結果、合併零碎區塊並去除重複列、
+        淘汰超量項目後重整資料庫檔案
+
+        Returns:
+            Dict: 刪除的過期筆數、合併前後區塊數、淘汰數與整理前後檔案大小
+        """
+        before = self._file_size()
+        with self._lock:
+            stale = self._conn.execute('DELETE FROM results WHERE model_version != ?',
+                                       (self.model_version,)).rowcount
+            stale += self._conn.execute('DELETE FROM row_blocks WHERE model_version != ?',
+                                        (self.model_version,)).rowcount
+            blocks_before = self._conn.execute('SELECT COUNT(*) FROM row_blocks').fetchone()[0]
+            namespaces = [r[0] for r in self._conn.execute('SELECT DISTINCT namespace FROM row_blocks')]
+            for namespace in namespaces:
+                self._repack(namespace)
+            blocks_after = self._conn.execute('SELECT COUNT(*) FROM row_blocks').fetchone()[0]
+            self._indexes.clear()
+            self._total_bytes = self._stored_bytes()
+            evicted = self._evict(self.max_bytes)
+            self._conn.execute('VACUUM')
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return {'stale_removed': stale, 'blocks_before': blocks_before, 'blocks_after': blocks_after,
+                'evicted': evicted, 'file_bytes_before': before, 'file_bytes_after': self._file_size()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+            self._conn.execute('DELETE FROM row_blocks')
+            self._indexes.clear()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """儲存統計：單筆結果數、整批區塊數、資料量、命中、未命中、淘汰次數與命中率"""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+            blocks = self._conn.execute('SELECT COUNT(*) FROM row_blocks').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'row_blocks': blocks,
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'model_version': self.model_version,
+                'path': self.path
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def _row_index(self, namespace: str) -> Dict[str, Any]:
+        """
+        整批結果的記憶體鍵索引（呼叫端需持有鎖）
+
+        只載入各區塊的鍵；其他程序新增區塊時增量載入，區塊被淘汰或整理時整個重建
+        """
+        count, last = self._conn.execute(
+            'SELECT COUNT(*), COALESCE(MAX(block_id), 0) FROM row_blocks '
+            'WHERE namespace = ? AND model_version = ?', (namespace, self.model_version)).fetchone()
+        if count == 0:
+            self._indexes.pop(namespace, None)
+            return None
+        index = self._indexes.get(namespace)
+        if index is not None and index['last'] == last and index['count'] == count:
+            return index
+        query = ('SELECT block_id, keys FROM row_blocks WHERE namespace = ? AND model_version = ? '
+                 'AND block_id > ? ORDER BY block_id')
+        new = self._conn.execute(query, (namespace, self.model_version,
+                                         index['last'] if index else 0)).fetchall()
+        if index is None or index['count'] + len(new) != count:
+            index = None
+            new = self._conn.execute(query, (namespace, self.model_version, 0)).fetchall()
+
+        parts = [np.frombuffer(blob, dtype=np.int64).reshape(-1, 2) for _, blob in new]
+        raw = np.concatenate([index['raw'], *parts]) if index else np.concatenate(parts)
+        blocks = np.concatenate([index['raw_blocks'] if index else np.empty(0, dtype=np.int64),
+                                 *[np.full(len(p), b, dtype=np.int64) for (b, _), p in zip(new, parts)]])
+        positions = np.concatenate([index['raw_positions'] if index else np.empty(0, dtype=np.int64),
+                                    *[np.arange(len(p), dtype=np.int64) for p in parts]])
+        # 同一鍵出現在多個區塊時以最新區塊為準
+        latest = ~pd.Index(raw[:, 0]).duplicated(keep='last')
+        index = {
+            'raw': raw, 'raw_blocks': blocks, 'raw_positions': positions,
+            'keys': pd.Index(raw[latest, 0]),
+            'checks': raw[latest, 1],
+            'blocks': blocks[latest],
+            'positions': positions[latest],
+            'count': count,
+            'last': last
+        }
+        self._indexes[namespace] = index
+        return index
+
+    def _repack(self, namespace: str) -> None:
+        """將同一結果類別的區塊依最後使用時間重新裝填為完整區塊，並去除被取代的重複列（呼叫端需持有鎖）"""
+        records = self._conn.execute(
+            'SELECT columns, accessed, keys, value FROM row_blocks '
+            'WHERE namespace = ? ORDER BY accessed, block_id', (namespace,)).fetchall()
+        if len(records) < 2:
+            return
+        columns = records[-1][0]  # 僅保留與最近使用區塊相同欄位的結果
+        kept = [r for r in records if r[0] == columns]
+        width = len(json.loads(columns))
+        keys = np.concatenate([np.frombuffer(r[2], dtype=np.int64).reshape(-1, 2) for r in kept])
+        values = np.concatenate([np.frombuffer(r[3], dtype=np.float64).reshape(-1, width) for r in kept])
+        accessed = np.concatenate([np.full(len(r[2]) // 16, r[1]) for r in kept])
+        latest = ~pd.Index(keys[:, 0]).duplicated(keep='last')
+        keys, values, accessed = keys[latest], values[latest], accessed[latest]
+
+        self._conn.execute('BEGIN')
+        self._conn.execute('DELETE FROM row_blocks WHERE namespace = ?', (namespace,))
+        for start in range(0, len(keys), self.block_rows):
+            stop = start + self.block_rows
+            self._insert_block(namespace, columns, float(accessed[start:stop].max()),
+                               keys[start:stop], values[start:stop])
+        self._conn.execute('COMMIT')
+
+    def _insert_block(self, namespace: str, columns: str, accessed: float,
+                      keys: np.ndarray, values: np.ndarray) -> None:
+        key_blob = np.ascontiguousarray(keys).tobytes()
+        value_blob = np.ascontiguousarray(values).tobytes()
+        self._conn.execute(
+            'INSERT INTO row_blocks (namespace, model_version, columns, accessed, size, keys, value) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (namespace, self.model_version, columns, accessed, len(key_blob) + len(value_blob),
+             key_blob, value_blob))
+
+    def _after_write(self) -> None:
+        """寫入後重新加總資料量（其他程序亦可能寫入），超過上限時淘汰（呼叫端需持有鎖）"""
+        self._total_bytes = self._stored_bytes()
+        if self._total_bytes > self.max_bytes:
+            self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target_bytes: int) -> int:
+        """依最後使用時間由舊至新刪除單筆結果與區塊，直到總量不超過 target_bytes（呼叫端需持有鎖）"""
+        excess = self._total_bytes - target_bytes
+        if excess <= 0:
+            return 0
+        items = self._conn.execute(
+            'SELECT accessed, size FROM results UNION ALL SELECT accessed, size FROM row_blocks '
+            'ORDER BY accessed').fetchall()
+        sizes = np.cumsum([size for _, size in items])
+        cutoff = items[min(int(np.searchsorted(sizes, excess)), len(items) - 1)][0]
+        deleted = self._conn.execute('DELETE FROM results WHERE accessed <= ?', (cutoff,)).rowcount
+        deleted += self._conn.execute('DELETE FROM row_blocks WHERE accessed <= ?', (cutoff,)).rowcount
+        self._total_bytes = self._stored_bytes()
+        self.evictions += deleted
+        metrics.count('result_store.evictions', deleted)
+        return deleted
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute(
+            'SELECT (SELECT COALESCE(SUM(size), 0) FROM results) + '
+            '(SELECT COALESCE(SUM(size), 0) FROM row_blocks)').fetchone()[0]
+
+    def _file_size(self) -> int:
+        if self.path == ':memory:':
+            return 0
+        return sum(os.path.getsize(p) for p in (self.path, self.path + '-wal') if os.path.exists(p))
+
+
+def _split_key(key: str) -> Tuple[int, int]:
+    """sha256 十六進位鍵 → (主鍵, 檢查碼) 兩個 int64"""
+    raw = bytes.fromhex(key)
+    return (int.from_bytes(raw[:8], 'little', signed=True),
+            int.from_bytes(raw[8:16], 'little', signed=True))
+
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 末段混合，使鍵的各位元均勻分布"""
+    x = x ^ (x >> np.uint64(30))
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _restore(values: np.ndarray, dtype: str) -> np.ndarray:
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'b':
+        return values == 1
+    return values.astype(dtype, copy=False)
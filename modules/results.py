@@ -0,0 +1,180 @@
+"""
+計算結果型別模組
+以 __slots__ 不可變資料類別保存數值結果，說明文字於取用時才組成
+仍支援 results['key'] 字典式存取，與原本的結果字典相容
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+from typing import Dict, Any, Optional, Tuple
+
+class _Record(Mapping):
+    """結果型別共用基底：字典式唯讀存取（含延遲計算的文字欄位）"""
+
+    __slots__ = ()
+    _derived: Tuple[str, ...] = ()  # 於取用時才計算的欄位
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._keys():
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    @classmethod
+    def _keys(cls) -> Tuple[str, ...]:
+        keys = cls.__dict__.get('_all_keys')
+        if keys is None:
+            keys = tuple(f.name for f in fields(cls)) + cls._derived
+            setattr(cls, '_all_keys', keys)
+        return keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為一般字典（含文字欄位）"""
+        return {key: getattr(self, key) for key in self._keys()}
+
+    def __reduce__(self):
+        return (self.__class__, tuple(getattr(self, f.name) for f in fields(self)))
+
+
+@dataclass(frozen=True)
+class VolumeResult(_Record):
+    """容積計算結果"""
+
+    __slots__ = (
+        'legal_volume_ping', 'original_volume_ping', 'disaster_bonus_volume_ping',
+        'max_volume_ping', 'total_floor_area', 'saleable_volume_ping',
+        'efficiency_coef', 'sales_coef', 'ping_efficiency', 'legal_adopted',
+        'bonus_ratio', 'legal_far', 'estimated_original_far', 'far_estimates'
+    )
+    _derived = ('adopted_scheme', 'scheme_basis', 'original_far_method', 'volume_breakdown')
+
+    legal_volume_ping: float
+    original_volume_ping: float
+    disaster_bonus_volume_ping: float
+    max_volume_ping: float
+    total_floor_area: float  # 總樓地板面積
+    saleable_volume_ping: float  # 可售建坪
+    efficiency_coef: float
+    sales_coef: float
+    ping_efficiency: float  # 坪效
+    legal_adopted: bool  # 是否採用法定容積
+    bonus_ratio: float
+    legal_far: float
+    estimated_original_far: float
+    # 原容積率各推估方法：(方法, 數值...)，供組成推估說明
+    far_estimates: Tuple[Tuple[Any, ...], ...]
+
+    @property
+    def adopted_scheme(self) -> str:
+        return "法定容積" if self.legal_adopted else "防災2.0獎勵容積"
+
+    @property
+    def scheme_basis(self) -> str:
+        if self.legal_adopted:
+            return f"法定容積率{self.legal_far:.1%}"
+        return f"原容{self.estimated_original_far:.1%} × 1.5倍獎勵"
+
+    @property
+    def original_far_method(self) -> str:
+        methods = [_describe_far_estimate(e) for e in self.far_estimates]
+        if len(methods) >= 2:
+            return f"多重驗證法(中位數): {', '.join(methods)}"
+        return methods[0] if methods else "預設值300%"
+
+    @property
+    def volume_breakdown(self) -> Dict[str, Any]:
+        """容積分解詳情"""
+        stage1_volume = self.max_volume_ping  # 容積樓地板面積
+        stage2_volume = self.total_floor_area  # 總樓地板面積（容積 ÷ 效率係數，係數為 0 時為 0）
+        stage3_volume = stage2_volume * self.sales_coef  # 可售建坪
+        return {
+            'stage1_volume_ping': stage1_volume,
+            'stage2_total_floor_ping': stage2_volume,
+            'stage3_saleable_ping': stage3_volume,
+            'efficiency_addition': stage2_volume - stage1_volume,
+            'sales_addition': stage3_volume - stage2_volume,
+            'total_multiplier': stage3_volume / stage1_volume if stage1_volume else 0,
+            'explanation': {
+                '階段1': f"容積樓地板面積 {stage1_volume:.1f}坪",
+                '階段2': f"÷ 效率係數{self.efficiency_coef:.2f} = 總樓地板{stage2_volume:.1f}坪",
+                '階段3': f"× 銷售係數{self.sales_coef:.2f} = 可售建坪{stage3_volume:.1f}坪"
+            }
+        }
+
+
+def _describe_far_estimate(estimate: Tuple[Any, ...]) -> str:
+    """單一原容積率推估方法的說明文字"""
+    method = estimate[0]
+    if method == 'title':
+        return f"權狀面積法({estimate[1]:.1%})"
+    if method == 'floors':
+        _, floors, coverage, far = estimate
+        return f"樓層估算法({floors}層×{coverage:.0%}={far:.1%})"
+    if method == 'default':
+        _, floors, coverage, far = estimate
+        return f"預設估算法({floors}層×{coverage:.0%}={far:.1%})"
+    _, year, far = estimate
+    return f"年代修正法({year}年約{far:.1%})"
+
+
+@dataclass(frozen=True)
+class CostResult(_Record):
+    """成本計算結果"""
+
+    __slots__ = (
+        'construction_cost', 'demolition_cost', 'design_cost', 'finance_cost',
+        'management_cost', 'tax_other_cost', 'total_cost', 'burden_ratio', 'unit_cost_used'
+    )
+
+    construction_cost: float
+    demolition_cost: float
+    design_cost: float
+    finance_cost: float
+    management_cost: float
+    tax_other_cost: float
+    total_cost: float
+    burden_ratio: float
+    unit_cost_used: float
+
+
+@dataclass(frozen=True)
+class AllocationResult(_Record):
+    """分配計算結果"""
+
+    __slots__ = (
+        'total_revenue', 'net_value', 'owner_total_share', 'developer_share',
+        'personal_allocated_value', 'return_area_ping', 'surplus', 'shortfall',
+        'effective_price', 'personal_cost_burden',
+        'estimated_original_value', 'personal_cost', 'net_benefit', 'roi'
+    )
+    _derived = ('roi_analysis',)
+
+    total_revenue: float
+    net_value: float
+    owner_total_share: float
+    developer_share: float
+    personal_allocated_value: float
+    return_area_ping: float
+    surplus: float
+    shortfall: float
+    effective_price: float
+    personal_cost_burden: float
+    # 投資報酬分析
+    estimated_original_value: float
+    personal_cost: float
+    net_benefit: float
+    roi: float
+
+    @property
+    def roi_analysis(self) -> Dict[str, Any]:
+        return {
+            'estimated_original_value': self.estimated_original_value,
+            'personal_cost': self.personal_cost,
+            'net_benefit': self.net_benefit,
+            'roi': self.roi
+        }
@@ -0,0 +1,141 @@
+"""
+風險模擬模組
+以蒙地卡羅抽樣評估市場價格、營建成本與設計係數不確定性對換回面積的影響
+"""
+
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import pandas as pd
+
+from .vectorized_engine import VectorizedEngine
+from .parallel_executor import ParallelExecutor
+
+class RiskSimulator:
+    """蒙地卡羅風險模擬類別"""
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+
+        # 預設分佈：數值皆為相對基準值的倍數，clip 為抽樣後的絕對上下限
+        self.distributions = {
+            'market_price': {'dist': 'lognormal', 'sigma': 0.10},
+            'unit_cost': {'dist': 'normal', 'sd': 0.08},
+            'finance_rate': {'dist': 'triangular', 'low': 0.7, 'mode': 1.0, 'high': 1.6},
+            'efficiency_coef': {'dist': 'uniform', 'low': 0.97, 'high': 1.03, 'clip': (0.85, 0.95)},
+            'sales_coef': {'dist': 'uniform', 'low': 0.95, 'high': 1.05, 'clip': (1.30, 1.70)}
+        }
+        self.metrics = [
+            ('return_area_ping', '換回面積(坪)'),
+            ('shortfall', '需補差額(元)'),
+            ('roi', '投資報酬率')
+        ]
+        self.percentiles = [5, 10, 25, 50, 75, 90, 95]
+
+    def simulate(self, params: Dict[str, Any],
+                 n_draws: int = 1_000_000,
+                 distributions: Dict[str, Dict[str, Any]] = None,
+                 correlations: Dict[Tuple[str, str], float] = None,
+                 seed: int = 42,
+                 chunk_size: int = 250_000,
+                 executor: ParallelExecutor = None) -> Dict[str, Any]:
+        """
+        執行蒙地卡羅模擬
+
+        Args:
+            params: 基準參數字典（同逐筆計算）
+            n_draws: 抽樣次數
+            distributions: 各參數分佈設定，未提供時使用預設分佈
+            correlations: 參數間相關係數，如 {('market_price', 'unit_cost'): 0.5}
+            seed: 亂數種子，固定種子可重現結果（與 chunk_size 無關）
+            chunk_size: 每批向量化計算筆數
+            executor: 提供時每批再以多行程分片計算
+
+        Returns:
+            Dict: 各指標樣本、統計摘要與需補差額機率
+        """
+        distributions = distributions or self.distributions
+        factors = list(distributions)
+        chol = self._correlation_cholesky(factors, correlations or {})
+        rng = np.random.default_rng(seed)
+
+        samples = {key: np.empty(n_draws) for key, _ in self.metrics}
+        for start in range(0, n_draws, chunk_size):
+            size = min(chunk_size, n_draws - start)
+            # 以高斯 copula 產生相關的標準常態亂數
+            z = rng.standard_normal((size, len(factors))) @ chol.T
+            cols = dict(params)
+            for j, key in enumerate(factors):
+                cols[key] = self._transform(z[:, j], params[key], distributions[key])
+            results = executor.run_engine(self.engine, cols) if executor else self.engine.run(cols)
+            for key, _ in self.metrics:
+                samples[key][start:start + size] = results[key]
+
+        return {
+            'samples': samples,
+            'summary_df': self._summarize(samples),
+            'prob_shortfall': float(np.mean(samples['shortfall'] > 0)),
+            'n_draws': n_draws,
+            'seed': seed
+        }
+
+    def _correlation_cholesky(self, factors: List[str],
+                              correlations: Dict[Tuple[str, str], float]) -> np.ndarray:
+        """建立相關係數矩陣並做 Cholesky 分解"""
+        index = {key: i for i, key in enumerate(factors)}
+        corr = np.eye(len(factors))
+        for (a, b), rho in correlations.items():
+            if a not in index or b not in index:
+                raise ValueError(f"相關係數參數未設定分佈: {a}, {b}")
+            corr[index[a], index[b]] = corr[index[b], index[a]] = rho
+        try:
+            return np.linalg.cholesky(corr)
+        except np.linalg.LinAlgError:
+            raise ValueError("相關係數矩陣必須為正定矩陣")
+
+    def _transform(self, z: np.ndarray, base: float, spec: Dict[str, Any]) -> np.ndarray:
+        """將標準常態亂數轉換為指定分佈的參數值"""
+        dist = spec['dist']
+        if dist == 'normal':
+            values = base * (1 + spec['sd'] * z)
+        elif dist == 'lognormal':
+            sigma = spec['sigma']
+            values = base * np.exp(sigma * z - 0.5 * sigma ** 2)
+        elif dist == 'uniform':
+            u = _norm_cdf(z)
+            values = base * (spec['low'] + (spec['high'] - spec['low']) * u)
+        elif dist == 'triangular':
+            u = _norm_cdf(z)
+            low, mode, high = spec['low'], spec['mode'], spec['high']
+            split = (mode - low) / (high - low)
+            values = base * np.where(
+                u < split,
+                low + np.sqrt(u * (high - low) * (mode - low)),
+                high - np.sqrt((1 - u) * (high - low) * (high - mode))
+            )
+        else:
+            raise ValueError(f"不支援的分佈類型: {dist}")
+
+        if 'clip' in spec:
+            values = np.clip(values, *spec['clip'])
+        return values
+
+    def _summarize(self, samples: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """產生各指標平均、標準差與百分位數摘要表"""
+        rows = []
+        for key, name in self.metrics:
+            values = samples[key]
+            row = {'指標': name, '平均': values.mean(), '標準差': values.std()}
+            for q, v in zip(self.percentiles, np.percentile(values, self.percentiles)):
+                row[f'P{q}'] = v
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def _norm_cdf(z: np.ndarray) -> np.ndarray:
+    """標準常態累積分佈函數（Abramowitz-Stegun 7.1.26 近似，誤差 < 1.5e-7）"""
+    x = np.abs(z) / np.sqrt(2)
+    t = 1 / (1 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+                + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - poly * np.exp(-x * x)
+    return 0.5 * (1 + np.sign(z) * erf)
@@ -1,56 +1,435 @@
 """
 敏感度分析模組
-評估關鍵參數變動對試算結果的影響
+評估關鍵參數變動對試算結果的影響：單因子擾動，以及 Sobol 變異數分解的全域敏感度
 """
 
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Sequence, Tuple, Union
 import numpy as np
 
+from .vectorized_engine import VectorizedEngine, _safe_divide
+from .pipeline import IncrementalPipeline
+from .parallel_executor import ParallelExecutor
+from .result_store import ResultStore
+from .instrumentation import instrumented
+
 class SensitivityAnalyzer:
     """敏感度分析類別"""
-    
-    def __init__(self):
+
+    def __init__(self, engine: VectorizedEngine = None):
+        self.engine = engine or VectorizedEngine()
+        self.pipeline = IncrementalPipeline.from_engine(self.engine)
         self.factors = [
             ('unit_cost', '營建單價'),
             ('market_price', '市場單價'),
-            ('saleable_ratio', '可售係數'),
+            ('sales_coef', '銷售係數'),
+            ('efficiency_coef', '容積效率係數'),
             ('design_rate', '設計監造率'),
             ('finance_rate', '融資利率'),
-            ('estimated_original_far', '原建築容積率')
+            ('legal_far', '法定容積率')
         ]
         self.levels = [-0.1, 0.0, 0.1]  # ±10%
-    
-    def analyze(self, params: Dict[str, Any], calculators: Dict[str, Any]) -> Dict[str, Any]:
-        base_alloc = self._run_once(params, calculators)['return_area_ping']
+        self.metrics = [
+            ('return_area_ping', '換回面積'),
+            ('personal_allocated_value', '個人分配價值'),
+            ('developer_share', '實施者分配價值'),
+            ('surplus', '盈餘'),
+            ('shortfall', '需補差額'),
+            ('roi', '投資報酬率'),
+            ('total_cost', '總開發成本'),
+            ('burden_ratio', '共同負擔比'),
+            ('saleable_volume_ping', '可售建坪')
+        ]
+
+        # 全域敏感度：預設抽樣範圍為基準值 ±global_span 的均勻分佈，global_offsets 中的參數改為基準值 ± 固定量
+        self.global_span = 0.1
+        self.global_offsets = {'building_year': 10}
+        self.param_names = {
+            **dict(self.factors),
+            'total_land_area': '基地面積',
+            'personal_land_area': '個人土地面積',
+            'personal_building_area': '個人建物面積',
+            'ownership_ratio': '持分比例',
+            'num_floors': '建物樓層數',
+            'building_year': '建築年份',
+            'demo_unit_cost': '拆除單價',
+            'management_rate': '管理費率',
+            'tax_rate': '稅捐及其他費率',
+            'scenario_factor': '情境係數'
+        }
+
+    @instrumented('sensitivity_analyze')
+    def analyze(self, params: Dict[str, Any], calculators: Dict[str, Any] = None,
+                factors: Sequence[Union[str, Tuple[str, str]]] = None,
+                levels: Sequence[float] = None,
+                executor: ParallelExecutor = None, store: ResultStore = None) -> Dict[str, Any]:
+        """
+        單因子敏感度分析，所有擾動一次批次計算
+
+        Args:
+            params: 基準參數字典
+            calculators: 可提供 'engine' 指定向量化引擎
+            factors: 參數清單，元素為參數名稱或 (參數名稱, 顯示名稱)，預設 self.factors
+            levels: 相對變動幅度，如 np.linspace(-0.3, 0.3, 41)，預設 ±10%
+            executor: 提供時批次擾動以多行程分片計算
+            store: 提供時先查詢持久化結果（鍵含參數、因子、變動幅度與引擎係數），未命中才計算並寫回
+
+        Returns:
+            Dict: radar_data / summary_df（換回面積）、spider_df 與 tornado_df（全部指標）
+        """
+        engine = (calculators or {}).get('engine', self.engine)
+        factors = [(f, f) if isinstance(f, str) else tuple(f) for f in (factors or self.factors)]
+        levels = np.asarray(self.levels if levels is None else levels, dtype=float)
+        if store is None:
+            return self._analyze(params, engine, factors, levels, executor)
+        key = {'params': params, 'factors': factors, 'levels': levels,
+               'metrics': self.metrics, 'engine': engine.signature()}
+        return store.get_or_compute(key, lambda: self._analyze(params, engine, factors, levels, executor),
+                                    namespace='sensitivity')
+
+    def _analyze(self, params: Dict[str, Any], engine: VectorizedEngine, factors: List[Tuple[str, str]],
+                 levels: np.ndarray, executor: ParallelExecutor = None) -> Dict[str, Any]:
+        """analyze 的實際計算（不經持久化儲存）"""
+        pipeline = self.pipeline if engine is self.engine else IncrementalPipeline.from_engine(engine)
+
+        outputs = self.evaluate(params, [key for key, _ in factors], levels, pipeline,
+                                engine if executor else None, executor)
+        base = _flatten(pipeline.run(params))
+        base_alloc = float(base['return_area_ping'])
+
         radar = []
         summary = []
-        
-        for key, name in self.factors:
-            impacts = []
-            for lvl in self.levels:
-                p = params.copy()
-                p[key] = params[key] * (1 + lvl)
-                ret = self._run_once(p, calculators)['return_area_ping']
-                impacts.append(ret)
-            max_imp = max(impacts) - min(impacts)
-            radar.append({'param': name, 'values': impacts})
-            lvl_str = f"±10%"
+        impacts = outputs['return_area_ping']
+        span_str = f"±{np.abs(levels).max():.0%}"
+        for i, (key, name) in enumerate(factors):
+            max_imp = impacts[i].max() - impacts[i].min()
+            radar.append({'param': name, 'values': impacts[i].tolist()})
             impact_pct = max_imp / base_alloc * 100 if base_alloc>0 else 0
             summary.append({
                 '參數': name,
+                '變動範圍': span_str,
                 '影響範圍(坪)': f"{max_imp:.2f}",
                 '影響率(%)': f"{impact_pct:.1f}%",
                 '等級': '高' if impact_pct>15 else '中' if impact_pct>10 else '低'
             })
-        
+
         return {
             'radar_data': radar,
-            'summary_df': pd.DataFrame(summary)
+            'levels': levels.tolist(),
+            'summary_df': pd.DataFrame(summary),
+            'spider_df': self._spider_frame(factors, levels, outputs),
+            'tornado_df': self._tornado_frame(factors, levels, outputs, base)
+        }
+
+    @instrumented('sensitivity_sobol')
+    def sobol(self, params: Dict[str, Any], calculators: Dict[str, Any] = None,
+              factors: Sequence[Union[str, Tuple[str, str]]] = None,
+              bounds: Dict[str, Tuple[float, float]] = None, span: float = None,
+              n_samples: int = 2 ** 14, n_bootstrap: int = 100, confidence: float = 0.95,
+              seed: int = 42, chunk_size: int = 250_000, executor: ParallelExecutor = None,
+              store: ResultStore = None, progress: Callable[[float], None] = None) -> Dict[str, Any]:
+        """
+        全域敏感度分析：各指標對各參數的 Sobol 一階指數與總效應指數
+
+        以亂序 Halton 準亂數產生 Saltelli 取樣矩陣 A、B 與 d 個 AB_i（A 的第 i 欄換成 B 的第 i 欄），
+        共 n_samples × (d + 2) 次向量化計算。一階指數採 Saltelli (2010)、總效應指數採 Jansen 估計式，
+        信賴區間以 bootstrap 重抽樣本列求得。總效應與一階指數的差為交互作用，
+        如法定容積率與防災獎勵方案擇優之間的交互影響
+
+        Args:
+            params: 基準參數字典
+            calculators: 可提供 'engine' 指定向量化引擎
+            factors: 參數清單，元素為參數名稱或 (參數名稱, 顯示名稱)，預設為引擎讀取且基準值非零的全部數值參數
+            bounds: 各參數均勻分佈的抽樣範圍 {參數名稱: (下限, 上限)}，未指定者依 span 與 global_offsets
+            span: 相對變動幅度，預設 self.global_span
+            n_samples: 基本樣本數 N
+            n_bootstrap: bootstrap 次數，0 表示不計算信賴區間
+            confidence: 信賴水準
+            seed: 亂數種子（準亂數亂序與 bootstrap），固定種子可重現結果（與 chunk_size 無關）
+            chunk_size: 每批向量化計算筆數（含 d + 2 個取樣矩陣）
+            executor: 提供時每批再以多行程分片計算
+            store: 提供時先查詢持久化結果，未命中才計算並寫回
+            progress: 每批完成後以完成比例呼叫，如背景工作的 job.report
+
+        Returns:
+            Dict: indices_df（指標 × 參數的一階 / 總效應指數、信賴區間與交互作用，各指標內依總效應排序）、
+                  bounds、variance（各指標輸出變異數）、n_samples、n_evaluations、confidence
+        """
+        engine = (calculators or {}).get('engine', self.engine)
+        factors = self._global_factors(params, engine, factors, bounds or {},
+                                       self.global_span if span is None else span)
+        options = dict(n_samples=n_samples, n_bootstrap=n_bootstrap, confidence=confidence, seed=seed)
+        if store is None:
+            return self._sobol(params, engine, factors, chunk_size=chunk_size, executor=executor,
+                               progress=progress, **options)
+        key = {'params': params, 'factors': factors, 'metrics': self.metrics,
+               'engine': engine.signature(), **options}
+        return store.get_or_compute(
+            key, lambda: self._sobol(params, engine, factors, chunk_size=chunk_size, executor=executor,
+                                     progress=progress, **options),
+            namespace='sobol')
+
+    def _global_factors(self, params: Dict[str, Any], engine: VectorizedEngine,
+                        factors: Sequence[Union[str, Tuple[str, str]]],
+                        bounds: Dict[str, Tuple[float, float]],
+                        span: float) -> List[Tuple[str, str, float, float]]:
+        """全域敏感度的參數與抽樣範圍 [(參數名稱, 顯示名稱, 下限, 上限)]"""
+        if factors is None:
+            factors = [key for key in engine.input_keys()
+                       if _is_number(params.get(key)) and (key in bounds or params[key] != 0)]
+        factors = [(f, self.param_names.get(f, f)) if isinstance(f, str) else tuple(f) for f in factors]
+        resolved = []
+        for key, name in factors:
+            if key in bounds:
+                low, high = bounds[key]
+            elif key in self.global_offsets:
+                low, high = params[key] - self.global_offsets[key], params[key] + self.global_offsets[key]
+            else:
+                low, high = sorted((params[key] * (1 - span), params[key] * (1 + span)))
+            if not high > low:
+                raise ValueError(f"抽樣範圍無效: {key} ({low}, {high})")
+            resolved.append((key, name, float(low), float(high)))
+        return resolved
+
+    def _sobol(self, params: Dict[str, Any], engine: VectorizedEngine,
+               factors: List[Tuple[str, str, float, float]], n_samples: int, n_bootstrap: int,
+               confidence: float, seed: int, chunk_size: int, executor: ParallelExecutor = None,
+               progress: Callable[[float], None] = None) -> Dict[str, Any]:
+        """sobol 的實際計算（不經持久化儲存）"""
+        d = len(factors)
+        keys = [key for key, _, _, _ in factors]
+        low = np.array([f[2] for f in factors])[:, None]
+        width = np.array([f[3] for f in factors])[:, None] - low
+        base = {k: v for k, v in params.items() if _is_number(v)}
+
+        # outputs[指標, 矩陣, 樣本]：矩陣 0 為 A、1 為 B、2 + i 為 AB_i
+        outputs = np.empty((len(self.metrics), d + 2, n_samples))
+        step = max(1, chunk_size // (d + 2))
+        for start in range(0, n_samples, step):
+            size = min(step, n_samples - start)
+            sample = halton_sequence(start, size, 2 * d, seed).T  # (2d, size)
+            a = low + width * sample[:d]
+            b = low + width * sample[d:]
+            # 每個參數一列，d + 2 個矩陣依序串接為 (d, (d + 2) × size)
+            stacked = np.tile(a, (1, d + 2))
+            stacked[:, size:2 * size] = b
+            for i in range(d):
+                stacked[i, (2 + i) * size:(3 + i) * size] = b[i]
+            cols = {**base, **dict(zip(keys, stacked))}
+            results = executor.run_engine(engine, cols) if executor else engine.run(cols)
+            for m, (key, _) in enumerate(self.metrics):
+                values = np.broadcast_to(results[key], (stacked.shape[1],))
+                outputs[m, :, start:start + size] = values.reshape(d + 2, size)
+            if progress is not None:
+                progress((start + size) / n_samples)
+
+        rng = np.random.default_rng([seed, 1])
+        alpha = (1 - confidence) / 2
+        frames = []
+        variance = {}
+        for m, (key, name) in enumerate(self.metrics):
+            y = outputs[m]
+            y = y[:, np.isfinite(y).all(axis=0)]  # 略過任一矩陣結果非有限值的樣本列
+            y = y - y[:2].mean()  # 置中以降低估計誤差與數值誤差
+            first, total, var = _sobol_indices(y, np.ones((1, y.shape[1])))
+            variance[name] = float(var[0])
+            first_ci = total_ci = np.full((2, d), np.nan)
+            if n_bootstrap:
+                boot_first, boot_total = [], []
+                # 分段產生 bootstrap 權重，限制 (次數 × 樣本數) 權重矩陣大小
+                block = max(1, 2_000_000 // max(y.shape[1], 1))
+                for b_start in range(0, n_bootstrap, block):
+                    count = min(block, n_bootstrap - b_start)
+                    draws = rng.integers(0, y.shape[1], (count, y.shape[1]))
+                    weights = np.bincount((draws + y.shape[1] * np.arange(count)[:, None]).ravel(),
+                                          minlength=count * y.shape[1]).reshape(count, y.shape[1])
+                    f, t, _ = _sobol_indices(y, weights.astype(float))
+                    boot_first.append(f)
+                    boot_total.append(t)
+                first_ci = np.quantile(np.concatenate(boot_first), [alpha, 1 - alpha], axis=0)
+                total_ci = np.quantile(np.concatenate(boot_total), [alpha, 1 - alpha], axis=0)
+            frames.append(pd.DataFrame({
+                '指標': name,
+                '參數': [label for _, label, _, _ in factors],
+                '一階指數': first[0],
+                '一階下限': first_ci[0],
+                '一階上限': first_ci[1],
+                '總效應指數': total[0],
+                '總效應下限': total_ci[0],
+                '總效應上限': total_ci[1],
+                '交互作用': total[0] - first[0]
+            }).sort_values('總效應指數', ascending=False))
+
+        return {
+            'indices_df': pd.concat(frames, ignore_index=True),
+            'bounds': {key: (lo, hi) for key, _, lo, hi in factors},
+            'variance': variance,
+            'n_samples': n_samples,
+            'n_evaluations': n_samples * (d + 2),
+            'confidence': confidence
+        }
+
+    def combine(self, parts: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        合併以不同參數子集分別執行 analyze 的結果（變動幅度須相同），如背景工作分批計算
+
+        Returns:
+            Dict: 同 analyze；蛛網圖與龍捲風圖資料依指標分組，龍捲風圖於各指標內重新依影響範圍排序
+        """
+        by_metric = lambda frames: pd.concat(
+            [group for _, group in pd.concat(frames, ignore_index=True).groupby('指標', sort=False)],
+            ignore_index=True)
+        tornado = by_metric([part['tornado_df'] for part in parts])
+        return {
+            'radar_data': [row for part in parts for row in part['radar_data']],
+            'levels': parts[0]['levels'],
+            'summary_df': pd.concat([part['summary_df'] for part in parts], ignore_index=True),
+            'spider_df': by_metric([part['spider_df'] for part in parts]),
+            'tornado_df': pd.concat([group.sort_values('影響範圍', ascending=False)
+                                     for _, group in tornado.groupby('指標', sort=False)],
+                                    ignore_index=True)
         }
-    
-    def _run_once(self, p: Dict[str, Any], calc: Dict[str, Any]) -> Dict[str, Any]:
-        vol = calc['volume'].calculate_volume(p)
-        cost = calc['cost'].calculate_total_costs(p, vol)
-        alloc = calc['alloc'].calculate_allocation(p, vol, cost)
-        return alloc
+
+    def evaluate(self, params: Dict[str, Any], keys: List[str], levels: np.ndarray,
+                 pipeline: IncrementalPipeline = None, engine: VectorizedEngine = None,
+                 executor: ParallelExecutor = None) -> Dict[str, np.ndarray]:
+        """
+        批次計算所有 (參數, 變動幅度) 組合
+
+        參數依最早影響的計算階段分組，每組一次批次計算；
+        上游階段沿用基準案例的快取結果，例如費率擾動不會重算容積。
+        提供 executor 時各組改以多行程分片執行完整管線
+
+        Returns:
+            Dict: {指標名稱: 陣列(參數數, 變動幅度數)}
+        """
+        pipeline = pipeline or self.pipeline
+        base = pipeline.run(params)
+        n_levels = len(levels)
+        outputs = {key: np.empty((len(keys), n_levels)) for key, _ in self.metrics}
+
+        groups = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(pipeline.first_affected_stage([key]), []).append(i)
+
+        for start, indices in groups.items():
+            if start is None:
+                # 未被任何階段讀取的參數：結果同基準值
+                flat = _flatten(base)
+                for key, _ in self.metrics:
+                    outputs[key][indices] = flat[key]
+                continue
+            cols = {k: v for k, v in params.items() if _is_number(v)}
+            for k in {keys[i] for i in indices}:
+                cols[k] = np.full(len(indices) * n_levels, float(params[k]))
+            for j, i in enumerate(indices):
+                cols[keys[i]][j * n_levels:(j + 1) * n_levels] = params[keys[i]] * (1 + levels)
+            if executor is not None:
+                results = executor.run_engine(engine or self.engine, cols)
+            else:
+                results = _flatten(pipeline.run_from(pipeline.prepare(cols), start, base))
+            for key, _ in self.metrics:
+                values = np.broadcast_to(results[key], (len(indices) * n_levels,))
+                outputs[key][indices] = values.reshape(len(indices), n_levels)
+        return outputs
+
+    def _spider_frame(self, factors: List[Tuple[str, str]], levels: np.ndarray,
+                      outputs: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """蛛網圖資料（長表格）：參數 × 變動幅度 × 指標"""
+        n_factors, n_levels = len(factors), len(levels)
+        frames = []
+        for key, name in self.metrics:
+            frames.append(pd.DataFrame({
+                '參數': np.repeat([n for _, n in factors], n_levels),
+                '變動幅度': np.tile(levels, n_factors),
+                '指標': name,
+                '數值': outputs[key].ravel()
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+    def _tornado_frame(self, factors: List[Tuple[str, str]], levels: np.ndarray,
+                       outputs: Dict[str, np.ndarray], base: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """龍捲風圖資料：各指標在最低/最高變動幅度下的數值，依影響範圍排序"""
+        lo, hi = int(np.argmin(levels)), int(np.argmax(levels))
+        frames = []
+        for key, name in self.metrics:
+            values = outputs[key]
+            frames.append(pd.DataFrame({
+                '指標': name,
+                '參數': [n for _, n in factors],
+                '基準值': float(base[key]),
+                '低值': values[:, lo],
+                '高值': values[:, hi],
+                '影響範圍': values.max(axis=1) - values.min(axis=1)
+            }).sort_values('影響範圍', ascending=False))
+        return pd.concat(frames, ignore_index=True)
+
+
+def _flatten(stage_results: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """合併各階段結果為單層字典"""
+    flat = {}
+    for name in ('volume', 'cost', 'alloc'):
+        flat.update(stage_results[name])
+    return flat
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def halton_sequence(start: int, n: int, d: int, seed: int = 42) -> np.ndarray:
+    """
+    亂序 Halton 準亂數序列第 start ~ start + n - 1 點（略過原點）
+
+    第 j 維以第 j 個質數為底，各位數依種子產生的隨機排列置換，改善高維度時各維間的相關
+
+    Returns:
+        np.ndarray: (n, d) 介於 [0, 1) 的點
+    """
+    index = np.arange(start + 1, start + n + 1, dtype=np.int64)
+    points = np.empty((n, d))
+    for j, base in enumerate(_primes(d)):
+        n_digits = int(np.ceil(40 * np.log(2) / np.log(base)))  # 足以表示 2^40 個點
+        rng = np.random.default_rng([seed, j])
+        perms = np.argsort(rng.random((n_digits, base)), axis=1)
+        value = np.zeros(n)
+        rest = index
+        scale = 1.0 / base
+        for k in range(n_digits):
+            rest, digit = np.divmod(rest, base)
+            value += perms[k][digit] * scale
+            scale /= base
+        points[:, j] = value
+    return points
+
+
+def _primes(n: int) -> List[int]:
+    """前 n 個質數"""
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def _sobol_indices(y: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    以樣本列權重計算 Sobol 指數（權重全為 1 即點估計，bootstrap 時為重抽次數）
+
+    Args:
+        y: (d + 2, N) 輸出，列依序為 f(A)、f(B)、f(AB_1) ... f(AB_d)
+        weights: (次數, N) 樣本列權重
+
+    Returns:
+        Tuple: (一階指數 (次數, d), 總效應指數 (次數, d), 輸出變異數 (次數,))
+    """
+    f_a, f_b, f_ab = y[0], y[1], y[2:]
+    n = weights.sum(axis=1)
+    mean = weights @ (f_a + f_b) / (2 * n)
+    var = weights @ (f_a ** 2 + f_b ** 2) / (2 * n) - mean ** 2
+    first = weights @ (f_b * (f_ab - f_a)).T / n[:, None]
+    total = 0.5 * (weights @ ((f_a - f_ab) ** 2).T) / n[:, None]
+    positive = (var > 0)[:, None]
+    return _safe_divide(first, var[:, None], positive), _safe_divide(total, var[:, None], positive), var
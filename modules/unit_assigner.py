@@ -0,0 +1,313 @@
+"""
+選配模組
+將各地主的分配價值配對至實際住宅單元（坪數與樓層 / 位置價差固定），
+以指派問題最佳解使全體找補金額最小，並納入地主選配偏好
+
+無選配偏好時，找補成本為價差的凸函數，最佳解必為依價值排序的單調配對，
+以逐列向量化動態規劃於 O(地主數 × 單元數) 求得精確解；
+有偏好時已安裝 SciPy 則使用 scipy.optimize.linear_sum_assignment，
+否則使用同演算法（最短擴增路徑）的 NumPy 實作
+"""
+
+from typing import Dict, Any, Callable, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # SciPy 為選用套件
+    linear_sum_assignment = None
+
+class UnitAssigner:
+    """地主與住宅單元指派類別"""
+
+    def __init__(self, topup_weight: float = 1.0, cash_weight: float = 1.0,
+                 use_scipy: bool = True):
+        """
+        Args:
+            topup_weight: 地主補繳差額相對於找還差額的權重（>1 表示盡量避免地主補錢）
+            cash_weight: 不選配單元、全額領取現金的成本權重；設為 None 表示每位地主皆須選配
+            use_scipy: 已安裝 SciPy 時是否使用其求解器
+        """
+        self.topup_weight = topup_weight
+        self.cash_weight = cash_weight
+        self.use_scipy = use_scipy and linear_sum_assignment is not None
+
+    def assign(self, owners: pd.DataFrame, units: pd.DataFrame, unit_price: float = None,
+               preferences: pd.DataFrame = None, owner_id: str = 'owner_id',
+               unit_id: str = 'unit_id') -> Dict[str, Any]:
+        """
+        求解地主 → 單元指派
+
+        Args:
+            owners: 地主資料，需含 personal_allocated_value（如 MultiOwnerAllocator 的 owners_df）
+            units: 單元清冊，需含 area_ping；選填 premium（樓層 / 位置價差係數，預設 1）、
+                   unit_price（每坪單價，未提供時使用 unit_price 參數）
+            unit_price: 預設每坪單價（通常為 market_price × scenario_factor）
+            preferences: 選配偏好，欄位 owner_id、unit_id、bonus（元）；bonus 由該配對成本扣除，
+                         -inf 表示禁止該配對
+            owner_id: 地主識別欄位
+            unit_id: 單元識別欄位
+
+        Returns:
+            Dict: assignments_df（各地主配得單元與找補）、summary（找補合計與指派統計）
+        """
+        n_owners, n_units = len(owners), len(units)
+        allowed_cash = self.cash_weight is not None
+        if not allowed_cash and n_owners > n_units:
+            raise ValueError(f"單元數 {n_units} 少於地主數 {n_owners}，須允許現金找補")
+
+        values = owners['personal_allocated_value'].to_numpy(dtype=float)
+        unit_values = self.unit_values(units, unit_price)
+
+        cash = np.abs(values) * self.cash_weight if allowed_cash else None
+
+        if (preferences is None or not len(preferences)) and self.topup_weight >= 0:
+            # 單調配對逐列計算成本，不建立地主數 × 單元數矩陣
+            unit_of_owner = _monotone_assignment(values, unit_values, self._pair_cost, cash)
+            solver = 'monotone'
+        else:
+            unit_of_owner, solver = self._solve_general(owners, units, values, unit_values,
+                                                        preferences, cash, owner_id, unit_id)
+
+        assigned = unit_of_owner >= 0
+        safe = np.where(assigned, unit_of_owner, 0)
+        unit_value = np.where(assigned, unit_values[safe], 0.0)
+        settlement = unit_value - values  # 正值為地主補繳，負值為找還地主
+        pair_cost = np.where(assigned, self._pair_cost(unit_value, values), cash if allowed_cash else 0.0)
+        if preferences is not None and len(preferences):
+            pair_cost = pair_cost - self._bonus_of_pairs(owners, units, preferences, unit_of_owner,
+                                                         owner_id, unit_id)
+        assignments = pd.DataFrame({
+            owner_id: owners[owner_id].to_numpy() if owner_id in owners.columns else np.arange(n_owners),
+            unit_id: np.where(assigned, units[unit_id].to_numpy(dtype=object)[safe], None),
+            'allocated_value': values,
+            'unit_value': unit_value,
+            'settlement': settlement
+        })
+        return {
+            'assignments_df': assignments,
+            'summary': {
+                'owners': n_owners,
+                'units': n_units,
+                'assigned': int(assigned.sum()),
+                'cash_settled': int((~assigned).sum()),
+                'total_topup': float(settlement[settlement > 0].sum()),
+                'total_refund': float(-settlement[settlement < 0].sum()),
+                'objective': float(pair_cost.sum()),
+                'solver': solver
+            }
+        }
+
+    def _pair_cost(self, unit_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """配對成本：補繳差額 × 權重 + 找還差額"""
+        diff = unit_values - values
+        return np.where(diff > 0, diff * self.topup_weight, -diff)
+
+    def _solve_general(self, owners: pd.DataFrame, units: pd.DataFrame, values: np.ndarray,
+                       unit_values: np.ndarray, preferences: pd.DataFrame, cash: np.ndarray,
+                       owner_id: str, unit_id: str) -> Tuple[np.ndarray, str]:
+        """含選配偏好的一般指派問題"""
+        cost = self._pair_cost(unit_values[None, :], values[:, None])
+        if preferences is not None and len(preferences):
+            rows = pd.Index(owners[owner_id]).get_indexer(preferences[owner_id])
+            cols = pd.Index(units[unit_id]).get_indexer(preferences[unit_id])
+            valid = (rows >= 0) & (cols >= 0)
+            # bonus 為 -inf 時成本成為 inf，即禁止該配對
+            np.subtract.at(cost, (rows[valid], cols[valid]),
+                           preferences['bonus'].to_numpy(dtype=float)[valid])
+        if self.use_scipy:
+            unit_of_owner, solver = self._solve_scipy(cost, cash), 'scipy'
+        else:
+            unit_of_owner, solver = _shortest_augmenting_path(cost, cash), 'numpy'
+        assigned = unit_of_owner >= 0
+        if np.isinf(cost[np.flatnonzero(assigned), unit_of_owner[assigned]]).any():
+            raise ValueError("禁止配對過多，無可行的指派")
+        return unit_of_owner, solver
+
+    @staticmethod
+    def _bonus_of_pairs(owners: pd.DataFrame, units: pd.DataFrame, preferences: pd.DataFrame,
+                        unit_of_owner: np.ndarray, owner_id: str, unit_id: str) -> np.ndarray:
+        """各地主實際配得單元的偏好加分"""
+        rows = pd.Index(owners[owner_id]).get_indexer(preferences[owner_id])
+        cols = pd.Index(units[unit_id]).get_indexer(preferences[unit_id])
+        bonus = np.zeros(len(owners))
+        hit = (rows >= 0) & (cols >= 0)
+        hit[hit] = unit_of_owner[rows[hit]] == cols[hit]
+        np.add.at(bonus, rows[hit], preferences['bonus'].to_numpy(dtype=float)[hit])
+        return bonus
+
+    @staticmethod
+    def unit_values(units: pd.DataFrame, unit_price: float = None) -> np.ndarray:
+        """單元價值 = 坪數 × 每坪單價 × 價差係數"""
+        if 'unit_price' in units.columns:
+            price = units['unit_price'].to_numpy(dtype=float)
+        elif unit_price is not None:
+            price = float(unit_price)
+        else:
+            raise ValueError("請提供 unit_price 參數或單元清冊的 unit_price 欄位")
+        premium = units['premium'].to_numpy(dtype=float) if 'premium' in units.columns else 1.0
+        return units['area_ping'].to_numpy(dtype=float) * price * premium
+
+    @staticmethod
+    def _solve_scipy(cost: np.ndarray, cash: np.ndarray = None) -> np.ndarray:
+        """每位地主附加一個專屬現金欄，轉為 SciPy 長方形指派問題"""
+        n, m = cost.shape
+        if cash is not None:
+            private = np.full((n, n), np.inf)
+            np.fill_diagonal(private, cash)
+            cost = np.hstack([cost, private])
+        rows, cols = linear_sum_assignment(_finite(cost, cash))
+        unit_of_owner = np.full(n, -1)
+        unit_of_owner[rows] = np.where(cols < m, cols, -1)
+        return unit_of_owner
+
+
+def _finite(cost: np.ndarray, cash: np.ndarray = None) -> np.ndarray:
+    """以遠大於其他成本（含現金找補）的有限值取代禁止配對，避免求解器判定無解"""
+    finite = np.concatenate([cost[np.isfinite(cost)], cash if cash is not None else []])
+    big = (np.abs(finite).max() + 1) * (cost.shape[0] + 1) if finite.size else 1.0
+    return np.where(np.isfinite(cost), cost, big)
+
+
+def _monotone_assignment(values: np.ndarray, unit_values: np.ndarray,
+                         pair_cost: Callable[[np.ndarray, float], np.ndarray],
+                         cash: np.ndarray = None) -> np.ndarray:
+    """
+    成本為價差凸函數時的精確指派（Monge 性質：依價值排序後最佳配對不交叉）
+
+    F[i, j] 為前 i 位地主使用前 j 個單元的最小成本：
+    F[i, j] = min(F[i-1, j] + 現金, F[i-1, j-1] + 成本(i, j), F[i, j-1])
+    每位地主一列，以 np.minimum.accumulate 向量化處理「略過單元」的遞迴
+
+    Returns:
+        np.ndarray: 各地主指派的單元索引，-1 表示現金找補
+    """
+    n, m = len(values), len(unit_values)
+    owner_order = np.argsort(values, kind='stable')
+    unit_order = np.argsort(unit_values, kind='stable')
+    sorted_units = unit_values[unit_order]
+
+    # 決策：0 = 現金、1 = 配對單元 j、2 = 略過單元 j
+    decision = np.empty((n, m + 1), dtype=np.int8)
+    prev = np.zeros(m + 1)
+    for i in range(n):
+        cash_i = cash[owner_order[i]] if cash is not None else np.inf
+        stay = prev + cash_i
+        match = np.empty(m + 1)
+        match[0] = np.inf
+        match[1:] = prev[:-1] + pair_cost(sorted_units, values[owner_order[i]])
+        take_match = match < stay
+        best = np.where(take_match, match, stay)
+        current = np.minimum.accumulate(best)
+        decision[i] = np.where(current < best, 2, take_match)
+        prev = current
+    if not np.isfinite(prev[m]):
+        raise ValueError("單元數不足以指派全部地主")
+
+    unit_of_owner = np.full(n, -1)
+    i, j = n, m
+    while i > 0:
+        step = decision[i - 1, j]
+        if step == 2:
+            j -= 1
+        else:
+            if step == 1:
+                unit_of_owner[owner_order[i - 1]] = unit_order[j - 1]
+                j -= 1
+            i -= 1
+    return unit_of_owner
+
+
+def _shortest_augmenting_path(cost: np.ndarray, cash: np.ndarray = None) -> np.ndarray:
+    """
+    長方形指派問題的最短擴增路徑演算法（Jonker-Volgenant / Crouse，同 SciPy 實作）
+
+    逐列以 Dijkstra 尋找至未指派欄的最短擴增路徑，每一步對全部欄位向量化更新；
+    現金欄為各列專屬欄，不另建 n × n 矩陣，於掃描該列時附加
+
+    Args:
+        cost: (地主數, 單元數) 成本矩陣，inf 表示禁止
+        cash: 各地主專屬現金欄成本，None 表示不允許
+
+    Returns:
+        np.ndarray: 各地主指派的單元索引，-1 表示現金找補
+    """
+    cost = _finite(cost, cash)
+    n, m = cost.shape
+    n_cols = m + (n if cash is not None else 0)
+    row_cost: Callable[[int], np.ndarray]
+    if cash is not None:
+        # 他列現金欄的成本須高於任何僅用自身現金欄與單元欄的完整指派，最佳解才不會借用
+        blocked = (np.abs(cost).max() + np.abs(cash).max() + 1) * (n + 1)
+
+        def row_cost(i: int) -> np.ndarray:
+            row = np.full(n_cols, blocked)
+            row[:m] = cost[i]
+            row[m + i] = cash[i]
+            return row
+    else:
+        if n > m:
+            raise ValueError("欄數不足以指派全部列")
+        row_cost = cost.__getitem__
+
+    # 初始解：列縮減後，最小成本欄尚未被指派者直接配對（多數列不需擴增）
+    u = np.empty(n)
+    v = np.zeros(n_cols)
+    col4row = np.full(n, -1)
+    row4col = np.full(n_cols, -1)
+    for i in range(n):
+        row = row_cost(i)
+        j = int(np.argmin(row))
+        u[i] = row[j]
+        if row4col[j] < 0:
+            row4col[j] = i
+            col4row[i] = j
+
+    for cur_row in np.flatnonzero(col4row < 0):
+        shortest = np.full(n_cols, np.inf)
+        path = np.full(n_cols, -1)
+        remaining = np.ones(n_cols, dtype=bool)
+        scanned_rows = []
+        scanned_cols = []
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+        while sink < 0:
+            scanned_rows.append(i)
+            reduced = min_val + row_cost(i) - u[i] - v
+            better = remaining & (reduced < shortest)
+            path[better] = i
+            shortest[better] = reduced[better]
+
+            candidates = np.where(remaining, shortest, np.inf)
+            lowest = candidates.min()
+            ties = np.flatnonzero(candidates == lowest)
+            free = ties[row4col[ties] < 0]
+            j = free[0] if free.size else ties[0]  # 同距離時優先選未指派欄
+            min_val = lowest
+            remaining[j] = False
+            scanned_cols.append(j)
+            if row4col[j] < 0:
+                sink = j
+            else:
+                i = row4col[j]
+
+        # 更新對偶變數
+        u[cur_row] += min_val
+        others = np.array(scanned_rows[1:], dtype=int)
+        if others.size:
+            u[others] += min_val - shortest[col4row[others]]
+        cols = np.array(scanned_cols, dtype=int)
+        v[cols] -= min_val - shortest[cols]
+
+        # 沿路徑擴增
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+
+    return np.where(col4row < m, col4row, -1)
@@ -0,0 +1,391 @@
+"""
+向量化批次運算模組
+以 NumPy 陣列一次計算多筆案例的容積、成本與分配結果
+計算邏輯與 VolumeCalculator / CostCalculator / AllocationCalculator 逐筆結果一致
+"""
+
+from typing import Dict, Any, List, Union, Mapping, Sequence
+import numpy as np
+import pandas as pd
+
+from .instrumentation import instrumented
+
+ArrayLike = Union[float, int, np.ndarray]
+Columns = Dict[str, np.ndarray]
+
+
+def _batch_rows(engine: 'VectorizedEngine', data: Union[pd.DataFrame, Mapping[str, ArrayLike]],
+                *args, **kwargs) -> int:
+    """批次筆數（供效能量測記錄處理筆數）"""
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    return max((np.size(v) for v in data.values()), default=0)
+
+
+class VectorizedEngine:
+    """向量化批次運算類別（無狀態，可多執行緒共用）"""
+
+    def __init__(self):
+        # 與 VolumeCalculator 相同的標準參數
+        self.standard_coverage_ratio = 0.6  # 標準建蔽率
+        self.default_floors = 5  # 無樓層資料時的預設層數
+        self.far_bounds = (1.0, 8.0)  # 原容積率合理範圍
+
+        # 與 VolumeCalculator / CostCalculator 相同的係數
+        self.disaster_bonus_multiplier = 1.5  # 防災2.0獎勵倍數
+        self.demolition_factor = 0.3  # 拆除面積比例
+        self.scale_tiers = ((50, 1.15), (100, 1.05))  # (基地面積上限, 規模係數)
+        self.default_scale = 1.0
+
+        # 各階段讀取的參數（供增量計算判斷是否需重算）
+        # 原容積率推估子步驟的 total_land_area 用於個人土地面積預設值
+        self.original_far_keys = (
+            'total_land_area', 'personal_land_area', 'personal_building_area',
+            'num_floors', 'building_year'
+        )
+        self.volume_keys = ('total_land_area', 'legal_far', 'efficiency_coef', 'sales_coef')
+        self.cost_keys = (
+            'total_land_area', 'unit_cost', 'demo_unit_cost', 'design_rate', 'finance_rate',
+            'management_rate', 'tax_rate', 'market_price', 'scenario_factor'
+        )
+        self.allocation_keys = (
+            'ownership_ratio', 'market_price', 'scenario_factor', 'personal_building_area'
+        )
+        # 無預設值、必須提供的參數
+        self.required_keys = (
+            'total_land_area', 'legal_far', 'personal_building_area', 'ownership_ratio',
+            'unit_cost', 'demo_unit_cost', 'design_rate', 'finance_rate', 'management_rate',
+            'tax_rate', 'market_price', 'scenario_factor'
+        )
+
+    @instrumented('engine.run', rows=_batch_rows)
+    def run(self, data: Union[pd.DataFrame, Mapping[str, ArrayLike]]) -> Columns:
+        """
+        一次執行容積 → 成本 → 分配三階段計算
+
+        Args:
+            data: DataFrame 或 {參數名稱: 陣列/純量} 字典，欄位名稱同逐筆參數字典
+
+        Returns:
+            Dict: {結果名稱: 陣列}，合併三階段結果，roi_analysis 展開為同層欄位
+        """
+        cols = self.to_columns(data)
+        vol = self.calculate_volume(cols)
+        cost = self.calculate_total_costs(cols, vol)
+        alloc = self.calculate_allocation(cols, vol, cost)
+        return {**vol, **cost, **alloc}
+
+    def input_keys(self) -> List[str]:
+        """各階段讀取的全部參數名稱（排序），如結果儲存的列鍵欄位、全域敏感度的預設參數"""
+        return sorted(set(self.original_far_keys) | set(self.volume_keys) | set(self.cost_keys)
+                      | set(self.allocation_keys))
+
+    def signature(self) -> Dict[str, Any]:
+        """引擎係數（不含參數清單），供快取鍵區分係數不同（如校準後）的引擎"""
+        return {k: v for k, v in vars(self).items() if not k.endswith('_keys')}
+
+    def to_columns(self, data: Union[pd.DataFrame, Mapping[str, ArrayLike]]) -> Columns:
+        """
+        將輸入轉為浮點數陣列字典並廣播成相同長度
+
+        非數值欄位（如 case_name）略過；缺值(NaN)視同未提供該參數
+        """
+        if isinstance(data, pd.DataFrame):
+            items = {k: data[k].to_numpy() for k in data.columns}
+        else:
+            items = dict(data)
+
+        cols = {}
+        for key, value in items.items():
+            arr = np.asarray(value)
+            if arr.dtype.kind in 'biuf':
+                cols[key] = arr.astype(float, copy=False)
+            elif arr.dtype.kind == 'O':
+                try:
+                    cols[key] = arr.astype(float)
+                except (TypeError, ValueError):
+                    continue
+
+        if cols:
+            keys = list(cols)
+            for key, arr in zip(keys, np.broadcast_arrays(*cols.values())):
+                cols[key] = arr
+        return cols
+
+    def records_to_columns(self, records: Sequence[Mapping[str, Any]]) -> Columns:
+        """
+        將多筆參數字典轉為欄位陣列
+
+        各筆缺少的選填參數依逐筆版預設值補齊（個人土地面積為基地 25%、
+        效率係數 0.90、銷售係數 1.45），樓層數與建築年份缺少時以 NaN 表示未提供
+        """
+        keys = set().union(*records) if records else set()
+        cols = {}
+        for key in keys:
+            try:
+                cols[key] = np.array([_as_float(r.get(key)) for r in records])
+            except (TypeError, ValueError):
+                continue  # 非數值欄位（如案例名稱）
+
+        total_land_area = cols.get('total_land_area')
+        if 'personal_land_area' in cols and total_land_area is not None:
+            missing = np.isnan(cols['personal_land_area'])
+            cols['personal_land_area'][missing] = total_land_area[missing] * 0.25
+        for key, default in (('efficiency_coef', 0.90), ('sales_coef', 1.45)):
+            if key in cols:
+                cols[key][np.isnan(cols[key])] = default
+        return cols
+
+    @instrumented('engine.estimate_original_far', rows=_batch_rows)
+    def estimate_original_far(self, cols: Columns) -> np.ndarray:
+        """原建築容積率推估子步驟（僅讀取 original_far_keys）"""
+        total_land_area = cols['total_land_area']
+        return self._estimate_original_far(
+            cols.get('personal_land_area', total_land_area * 0.25),
+            cols.get('personal_building_area', np.full_like(total_land_area, 80.0)),
+            cols.get('num_floors'),
+            cols.get('building_year')
+        )
+
+    @instrumented('engine.calculate_volume', rows=_batch_rows)
+    def calculate_volume(self, cols: Columns,
+                         estimated_original_far: np.ndarray = None) -> Columns:
+        """
+        向量化容積計算，對應 VolumeCalculator.calculate_volume
+
+        Args:
+            cols: 參數陣列字典
+            estimated_original_far: 已推估的原容積率，未提供時即時推估
+
+        Returns:
+            Dict: 容積結果陣列；legal_adopted 為 True 表示採用法定容積
+        """
+        total_land_area = cols['total_land_area']
+        legal_far = cols['legal_far']
+        efficiency_coef = cols.get('efficiency_coef', 0.90)
+        sales_coef = cols.get('sales_coef', 1.45)
+
+        legal_volume_ping = total_land_area * legal_far
+
+        if estimated_original_far is None:
+            estimated_original_far = self.estimate_original_far(cols)
+
+        original_volume_ping = total_land_area * estimated_original_far
+        disaster_bonus_volume_ping = original_volume_ping * self.disaster_bonus_multiplier
+        max_volume_ping = np.maximum(legal_volume_ping, disaster_bonus_volume_ping)
+
+        total_floor_area = _safe_divide(max_volume_ping, efficiency_coef, efficiency_coef > 0)
+        saleable_volume_ping = total_floor_area * sales_coef
+
+        legal_adopted = max_volume_ping == legal_volume_ping
+        bonus_ratio = _safe_divide(max_volume_ping - legal_volume_ping,
+                                   legal_volume_ping, legal_volume_ping > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ping_efficiency = saleable_volume_ping / total_land_area
+
+        return {
+            'legal_volume_ping': legal_volume_ping,
+            'original_volume_ping': original_volume_ping,
+            'disaster_bonus_volume_ping': disaster_bonus_volume_ping,
+            'max_volume_ping': max_volume_ping,
+            'total_floor_area': total_floor_area,
+            'saleable_volume_ping': saleable_volume_ping,
+            'efficiency_coef': np.broadcast_to(efficiency_coef, total_land_area.shape),
+            'sales_coef': np.broadcast_to(sales_coef, total_land_area.shape),
+            'ping_efficiency': ping_efficiency,
+            'legal_adopted': legal_adopted,
+            'bonus_ratio': bonus_ratio,
+            'legal_far': legal_far,
+            'estimated_original_far': estimated_original_far
+        }
+
+    def _estimate_original_far(self, personal_land_area: np.ndarray,
+                               personal_building_area: np.ndarray,
+                               num_floors: np.ndarray = None,
+                               building_year: np.ndarray = None) -> np.ndarray:
+        """
+        向量化多重推估原建築容積率
+
+        每筆案例最多三個估計值（權狀面積法、樓層法、年代修正法），
+        樓層法一定存在；兩個估計值取較大者，三個取中位數，與逐筆版排序取中位一致
+        """
+        shape = np.shape(personal_land_area)
+
+        # 方法1：權狀建物面積法
+        has_title = (personal_land_area > 0) & (personal_building_area > 0)
+        far_from_title = _safe_divide(personal_building_area, personal_land_area, has_title)
+
+        # 方法2：樓層×建蔽率估算法（無樓層時以預設層數估算）
+        has_year = self._present(building_year, shape)
+        coverage_ratio = self._get_coverage_by_year(building_year, has_year)
+        if num_floors is None:
+            has_floors = np.zeros(shape, dtype=bool)
+            num_floors = np.zeros(shape)
+        else:
+            has_floors = num_floors > 0
+        far_from_floors = np.where(
+            has_floors,
+            num_floors * coverage_ratio,
+            self.default_floors * self.standard_coverage_ratio
+        )
+
+        # 方法3：建築年代修正法
+        far_from_year = self._get_far_by_building_year(building_year, has_year)
+
+        # 選擇估算值：1個取樓層法、2個取較大者、3個取中位數
+        a, b, c = far_from_title, far_from_floors, far_from_year
+        median3 = np.maximum(np.minimum(a, b), np.minimum(np.maximum(a, b), c))
+        estimate = np.select(
+            [has_title & has_year, has_title, has_year],
+            [median3, np.maximum(a, b), np.maximum(b, c)],
+            default=b
+        )
+
+        return np.clip(estimate, *self.far_bounds)
+
+    def _get_coverage_by_year(self, building_year: np.ndarray,
+                              has_year: np.ndarray) -> np.ndarray:
+        """依建築年代推估建蔽率（向量化）"""
+        if building_year is None:
+            return np.full(has_year.shape, self.standard_coverage_ratio)
+        by_year = np.select(
+            [building_year < 1980, building_year < 2000],
+            [0.7, 0.6],
+            default=0.5
+        )
+        return np.where(has_year, by_year, self.standard_coverage_ratio)
+
+    def _get_far_by_building_year(self, building_year: np.ndarray,
+                                  has_year: np.ndarray) -> np.ndarray:
+        """依建築年代推估典型容積率（向量化），無年份者回傳 NaN"""
+        if building_year is None:
+            return np.full(has_year.shape, np.nan)
+        by_year = np.select(
+            [building_year < 1970, building_year < 1990, building_year < 2010],
+            [2.5, 3.0, 3.5],
+            default=4.0
+        )
+        return np.where(has_year, by_year, np.nan)
+
+    @staticmethod
+    def _present(values: np.ndarray, shape) -> np.ndarray:
+        """選填欄位是否有值（None、0、NaN 視為未提供）"""
+        if values is None:
+            return np.zeros(shape, dtype=bool)
+        return (values != 0) & ~np.isnan(values)
+
+    @instrumented('engine.calculate_total_costs', rows=_batch_rows)
+    def calculate_total_costs(self, cols: Columns, vol: Columns) -> Columns:
+        """
+        向量化成本計算，對應 CostCalculator.calculate_total_costs
+
+        Args:
+            cols: 參數陣列字典
+            vol: calculate_volume 結果
+
+        Returns:
+            Dict: 成本結果陣列
+        """
+        max_vol = vol['max_volume_ping']
+        scale = self._scale_factor(cols['total_land_area'])
+        unit_cost = cols['unit_cost'] * scale
+
+        construction = max_vol * unit_cost
+        demolition = max_vol * self.demolition_factor * cols['demo_unit_cost']
+        design = construction * cols['design_rate']
+        finance = (construction + demolition + design) * cols['finance_rate']
+        management = construction * cols['management_rate']
+        tax_other = construction * cols['tax_rate']
+        total = construction + demolition + design + finance + management + tax_other
+
+        revenue = vol['saleable_volume_ping'] * cols['market_price'] * cols['scenario_factor']
+        burden_ratio = _safe_divide(total, revenue, revenue > 0)
+
+        return {
+            'construction_cost': construction,
+            'demolition_cost': demolition,
+            'design_cost': design,
+            'finance_cost': finance,
+            'management_cost': management,
+            'tax_other_cost': tax_other,
+            'total_cost': total,
+            'burden_ratio': burden_ratio,
+            'unit_cost_used': unit_cost
+        }
+
+    def _scale_factor(self, area: np.ndarray) -> np.ndarray:
+        """基地規模係數（向量化）"""
+        conditions = [area < limit for limit, _ in self.scale_tiers]
+        factors = [factor for _, factor in self.scale_tiers]
+        return np.select(conditions, factors, default=self.default_scale)
+
+    @instrumented('engine.calculate_allocation', rows=_batch_rows)
+    def calculate_allocation(self, cols: Columns, vol: Columns, cost: Columns) -> Columns:
+        """
+        向量化分配計算，對應 AllocationCalculator.calculate_allocation
+
+        Args:
+            cols: 參數陣列字典
+            vol: calculate_volume 結果
+            cost: calculate_total_costs 結果
+
+        Returns:
+            Dict: 分配結果陣列，roi_analysis 各項展開為同層欄位
+        """
+        ownership_ratio = cols['ownership_ratio']
+        market_price = cols['market_price']
+        scenario_factor = cols['scenario_factor']
+        personal_building_area = cols['personal_building_area']
+        total_cost = cost['total_cost']
+
+        total_revenue = vol['saleable_volume_ping'] * market_price * scenario_factor
+        net_value = total_revenue - total_cost
+        owner_total_share = net_value * ownership_ratio
+        developer_share = net_value * (1 - ownership_ratio)
+        personal_allocated_value = owner_total_share
+
+        effective_price = market_price * scenario_factor
+        return_area_ping = _safe_divide(personal_allocated_value, effective_price,
+                                        effective_price > 0)
+
+        # 盈餘 / 需補差額
+        personal_building_value = personal_building_area * effective_price
+        gap = personal_allocated_value - personal_building_value
+        has_surplus = personal_allocated_value >= personal_building_value
+        surplus = np.where(has_surplus, gap, 0.0)
+        shortfall = np.where(has_surplus, 0.0, -gap)
+
+        # 投資報酬分析
+        estimated_original_value = personal_building_area * market_price * 0.5
+        personal_cost = total_cost * ownership_ratio
+        net_benefit = personal_allocated_value - estimated_original_value - personal_cost
+        roi = _safe_divide(net_benefit, estimated_original_value, estimated_original_value > 0)
+
+        return {
+            'total_revenue': total_revenue,
+            'net_value': net_value,
+            'owner_total_share': owner_total_share,
+            'developer_share': developer_share,
+            'personal_allocated_value': personal_allocated_value,
+            'return_area_ping': return_area_ping,
+            'surplus': surplus,
+            'shortfall': shortfall,
+            'effective_price': effective_price,
+            'estimated_original_value': estimated_original_value,
+            'personal_cost': personal_cost,
+            'net_benefit': net_benefit,
+            'roi': roi,
+            'personal_cost_burden': personal_cost
+        }
+
+
+def _as_float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _safe_divide(num: ArrayLike, den: ArrayLike, mask: np.ndarray) -> np.ndarray:
+    """僅在 mask 為 True 處相除，其餘為 0（對應逐筆版 `x / y if 條件 else 0`）"""
+    num, den, mask = np.broadcast_arrays(num, den, mask)
+    out = np.zeros(num.shape)
+    np.divide(num, den, out=out, where=mask)
+    return out
@@ -1,15 +1,33 @@
 """
 視覺化模組
 生成各種 Plotly 圖表
+
+傳入先前建立的 fig 時僅以新資料就地更新，不重建整個圖表；
+大量批次結果以 WebGL 散佈圖（降採樣）或伺服器端分箱的直方圖 / 密度圖呈現，
+傳送至瀏覽器的資料量與案例數無關
 """
 
 import plotly.graph_objects as go
 import pandas as pd
-from typing import Dict, Any, List
+import numpy as np
+from typing import Dict, Any, List, Tuple, Union
+
+from .cost_calculator import CostCalculator
+from .instrumentation import instrumented
 
 class Visualizer:
     """視覺化類別"""
     
+    def __init__(self, max_points: int = 20_000, n_bins: int = 100):
+        """
+        Args:
+            max_points: 散佈圖最多繪製點數，超過時降採樣
+            n_bins: 直方圖 / 密度圖預設分箱數
+        """
+        self.cost_calculator = CostCalculator()
+        self.max_points = max_points
+        self.n_bins = n_bins
+    
     def kpi_data(self, vol: Dict[str, Any], cost: Dict[str, Any], alloc: Dict[str, Any]) -> List[Dict[str, Any]]:
         return [
             {'title':'總可建坪', 'value':vol['max_volume_ping'], 'unit':'坪'},
@@ -20,23 +38,173 @@ class Visualizer:
             {'title':'需補差額', 'value':alloc['shortfall']/1e6, 'unit':'百萬元'}
         ]
     
-    def cost_pie(self, cost_results: Dict[str, Any]) -> go.Figure:
-        from modules.cost_calculator import CostCalculator
-        return CostCalculator().create_pie_chart(cost_results)
+    @instrumented('visualizer.cost_pie')
+    def cost_pie(self, cost_results: Dict[str, Any], fig: go.Figure = None) -> go.Figure:
+        if fig is None:
+            return self.cost_calculator.create_pie_chart(cost_results)
+        fig.data[0].values = [cost_results[f'{key}_cost'] for key, _ in self.cost_calculator.cost_categories]
+        return fig
     
-    def allocation_bar(self, alloc_results: Dict[str, Any]) -> go.Figure:
-        labels = ['地主','實施者']
+    @instrumented('visualizer.allocation_bar')
+    def allocation_bar(self, alloc_results: Dict[str, Any], fig: go.Figure = None) -> go.Figure:
         values = [alloc_results['personal_allocated_value'], alloc_results['developer_share']]
+        if fig is not None:
+            fig.data[0].y = values
+            return fig
+        labels = ['地主','實施者']
         fig = go.Figure(data=[go.Bar(x=labels, y=values)])
         fig.update_layout(title_text="價值分配", yaxis_title="元")
         return fig
     
-    def sensitivity_radar(self, radar_data: List[Dict[str, Any]]) -> go.Figure:
+    @instrumented('visualizer.sensitivity_radar')
+    def sensitivity_radar(self, radar_data: List[Dict[str, Any]], levels: List[float] = None,
+                          fig: go.Figure = None) -> go.Figure:
+        theta = [f"{l:+.0%}" if l else '0%' for l in (levels or [-0.1, 0.0, 0.1])]
+        # 參數組成相同時就地更新各軌跡
+        if fig is not None and [t.name for t in fig.data] == [item['param'] for item in radar_data]:
+            with fig.batch_update():
+                for trace, item in zip(fig.data, radar_data):
+                    trace.r = item['values']
+                    trace.theta = theta
+            return fig
         fig = go.Figure()
-        theta = ['-10%','0%','+10%']
         for item in radar_data:
             fig.add_trace(go.Scatterpolar(
                 r=item['values'], theta=theta, fill='toself', name=item['param']
             ))
         fig.update_layout(polar=dict(radialaxis=dict(visible=True)))
         return fig
+    
+    @instrumented('visualizer.sobol_bar')
+    def sobol_bar(self, indices_df: pd.DataFrame, metric: str = '換回面積') -> go.Figure:
+        """
+        全域敏感度長條圖：各參數的一階與總效應指數（含信賴區間），依總效應排序
+
+        Args:
+            indices_df: SensitivityAnalyzer.sobol 結果的 indices_df
+            metric: 指標顯示名稱
+        """
+        df = indices_df[indices_df['指標'] == metric].sort_values('總效應指數')
+        fig = go.Figure()
+        for column, name in (('一階', '一階指數'), ('總效應', '總效應指數')):
+            fig.add_trace(go.Bar(
+                y=df['參數'], x=df[name], name=name, orientation='h',
+                error_x=dict(type='data', symmetric=False,
+                             array=df[f'{column}上限'] - df[name], arrayminus=df[name] - df[f'{column}下限'])
+            ))
+        fig.update_layout(title_text=f"{metric}全域敏感度（Sobol 指數）", xaxis_title="指數", barmode='group',
+                          height=max(400, 40 * len(df)))
+        return fig
+    
+    @instrumented('visualizer.predicted_vs_actual')
+    def predicted_vs_actual(self, results: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                            max_points: int = None, fig: go.Figure = None) -> go.Figure:
+        """
+        預測與實際換回坪數散佈圖（WebGL），超過 max_points 時降採樣
+
+        Args:
+            results: BatchComparator.compare 結果，或含 '預測坪數'、'實際坪數' 的陣列字典
+            max_points: 最多繪製點數，預設 self.max_points
+            fig: 先前建立的圖表，提供時就地更新
+
+        Returns:
+            go.Figure: 散佈圖，含 y = x 參考線
+        """
+        pred, act = _column(results, '預測坪數'), _column(results, '實際坪數')
+        index = downsample_index(pred - act, max_points or self.max_points)
+        pred, act = pred[index], act[index]
+        finite = np.concatenate([pred[np.isfinite(pred)], act[np.isfinite(act)]])
+        lo, hi = (float(finite.min()), float(finite.max())) if finite.size else (0.0, 1.0)
+        title = f"預測 vs 實際換回坪數（顯示 {len(index):,} / {len(_column(results, '實際坪數')):,} 筆）"
+        if fig is not None:
+            with fig.batch_update():
+                fig.data[0].x, fig.data[0].y = act, pred
+                fig.data[1].x = fig.data[1].y = [lo, hi]
+                fig.layout.title.text = title
+            return fig
+        fig = go.Figure(data=[
+            go.Scattergl(x=act, y=pred, mode='markers', name='案例',
+                         marker=dict(size=4, opacity=0.5)),
+            go.Scattergl(x=[lo, hi], y=[lo, hi], mode='lines', name='y = x',
+                         line=dict(dash='dash', color='gray'))
+        ])
+        fig.update_layout(title_text=title, xaxis_title="實際坪數", yaxis_title="預測坪數")
+        return fig
+    
+    @instrumented('visualizer.prediction_density')
+    def prediction_density(self, results: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                           n_bins: int = None, fig: go.Figure = None) -> go.Figure:
+        """預測與實際換回坪數二維密度圖（伺服器端分箱，只傳送 n_bins × n_bins 格數）"""
+        pred, act = _column(results, '預測坪數'), _column(results, '實際坪數')
+        ok = np.isfinite(pred) & np.isfinite(act)
+        counts, x_edges, y_edges = np.histogram2d(act[ok], pred[ok], bins=n_bins or self.n_bins)
+        x, y = _centers(x_edges), _centers(y_edges)
+        z = np.where(counts > 0, counts, np.nan).T  # 空格不著色
+        if fig is not None:
+            with fig.batch_update():
+                fig.data[0].x, fig.data[0].y, fig.data[0].z = x, y, z
+            return fig
+        fig = go.Figure(data=[go.Heatmap(x=x, y=y, z=z, colorscale='Viridis',
+                                         colorbar=dict(title='案例數'))])
+        fig.update_layout(title_text="預測 vs 實際換回坪數密度", xaxis_title="實際坪數", yaxis_title="預測坪數")
+        return fig
+    
+    @instrumented('visualizer.error_histogram')
+    def error_histogram(self, results: Union[pd.DataFrame, Dict[str, np.ndarray]],
+                        column: str = '相對誤差(%)', n_bins: int = None,
+                        value_range: Tuple[float, float] = None, fig: go.Figure = None) -> go.Figure:
+        """
+        誤差直方圖（伺服器端分箱後以長條圖呈現）
+
+        Args:
+            results: BatchComparator.compare 結果
+            column: 分箱欄位，'相對誤差(%)' 或 '絕對誤差'
+            n_bins: 分箱數，預設 self.n_bins
+            value_range: 分箱範圍，預設取 1%~99% 分位數，避免極端值壓縮主要分布
+            fig: 先前建立的圖表，提供時就地更新
+        """
+        values = _column(results, column)
+        values = values[np.isfinite(values)]
+        if value_range is None and values.size:
+            value_range = tuple(np.percentile(values, [1, 99]))
+        counts, edges = np.histogram(values, bins=n_bins or self.n_bins, range=value_range)
+        x, width = _centers(edges), np.diff(edges)
+        if fig is not None:
+            with fig.batch_update():
+                fig.data[0].x, fig.data[0].y, fig.data[0].width = x, counts, width
+            return fig
+        fig = go.Figure(data=[go.Bar(x=x, y=counts, width=width, name=column)])
+        fig.update_layout(title_text=f"{column}分布", xaxis_title=column, yaxis_title="案例數", bargap=0)
+        return fig
+
+
+def downsample_index(errors: np.ndarray, max_points: int, outlier_share: float = 0.1,
+                     seed: int = 0) -> np.ndarray:
+    """
+    降採樣索引：保留誤差最大的案例，其餘等機率抽樣（固定種子，重新執行時點位不跳動）
+
+    Args:
+        errors: 各案例誤差
+        max_points: 最多保留筆數
+        outlier_share: 保留給最大誤差案例的比例
+
+    Returns:
+        np.ndarray: 依原順序排列的索引
+    """
+    n = len(errors)
+    if n <= max_points:
+        return np.arange(n)
+    magnitude = np.nan_to_num(np.abs(errors), nan=np.inf)
+    n_outliers = int(max_points * outlier_share)
+    outliers = np.argpartition(-magnitude, n_outliers)[:n_outliers] if n_outliers else np.empty(0, dtype=int)
+    rest = np.setdiff1d(np.arange(n), outliers, assume_unique=True)
+    sample = np.random.default_rng(seed).choice(rest, max_points - n_outliers, replace=False)
+    return np.sort(np.concatenate([outliers, sample]))
+
+
+def _column(results: Union[pd.DataFrame, Dict[str, np.ndarray]], name: str) -> np.ndarray:
+    return np.asarray(results[name], dtype=float)
+
+
+def _centers(edges: np.ndarray) -> np.ndarray:
+    return (edges[:-1] + edges[1:]) / 2
@@ -0,0 +1,50 @@
+"""JSON API 服務：同批錯誤隔離與非有限值序列化"""
+
+import asyncio
+import json
+
+from modules.api_server import ApiServer
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+async def _post(port: int, path: str, payload) -> tuple:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response = (await reader.read()).split(b'\r\n\r\n', 1)[1]
+    writer.close()
+    return status, json.loads(response)
+
+
+def _run(*requests):
+    async def main():
+        server = ApiServer(port=0, request_timeout=5.0, max_wait_ms=50.0)
+        await server.start()
+        try:
+            return await asyncio.gather(*(_post(server.port, path, payload) for path, payload in requests))
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+def test_malformed_request_does_not_fail_its_batch():
+    bad = {**BASE, 'market_price': 'abc'}
+    responses = _run(*[('/evaluate', BASE)] * 5, ('/evaluate', bad))
+    assert [status for status, _ in responses] == [200] * 5 + [400]
+    assert 'market_price' in responses[-1][1]['error']
+
+
+def test_non_finite_results_are_null():
+    (status, body), = _run(('/evaluate', {**BASE, 'total_land_area': 0}))
+    assert status == 200
+    assert any(value is None for value in body.values())
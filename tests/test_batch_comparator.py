@@ -0,0 +1,81 @@
+"""批次比對：計算器參數、非數值欄位檢查與串流比對"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.batch_comparator import BatchComparator, CompareSummary
+from modules.cost_calculator import CostCalculator
+from modules.volume_calculator import VolumeCalculator
+
+DEFAULTS = {
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'efficiency_coef': 0.9, 'sales_coef': 1.45,
+    'unit_cost': 180000, 'demo_unit_cost': 4000, 'design_rate': 0.04, 'finance_rate': 0.03,
+    'management_rate': 0.22, 'tax_rate': 0.02, 'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _frame(n=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'case_name': [f'案{i}' for i in range(n)],
+        'total_land_area': rng.uniform(40, 200, n),
+        'personal_land_area': rng.uniform(5, 40, n),
+        'personal_building_area': rng.uniform(20, 120, n),
+        'actual_return_area': rng.uniform(20, 80, n),
+        **DEFAULTS
+    })
+
+
+class _HalfAllocation(AllocationCalculator):
+    """自訂逐筆計算器：換回坪數減半"""
+
+    def calculate_allocation(self, params, volume, cost):
+        result = super().calculate_allocation(params, volume, cost).to_dict()
+        result['return_area_ping'] /= 2
+        return result
+
+
+def test_scalar_calculators_are_honored():
+    df = _frame()
+    comparator = BatchComparator()
+    default = comparator.compare(df)
+    custom = comparator.compare(df, {'volume': VolumeCalculator(), 'cost': CostCalculator(),
+                                     'alloc': _HalfAllocation()})
+    np.testing.assert_allclose(custom['預測坪數'], default['預測坪數'] / 2, rtol=1e-12)
+
+
+def test_rejects_unknown_or_incomplete_calculators():
+    comparator = BatchComparator()
+    with pytest.raises(ValueError, match='allocation'):
+        comparator.compare(_frame(), {'allocation': AllocationCalculator()})
+    with pytest.raises(ValueError, match='cost'):
+        comparator.compare(_frame(), {'volume': VolumeCalculator(), 'alloc': AllocationCalculator()})
+
+
+def test_non_numeric_columns_reported():
+    df = _frame(5)
+    df['unit_cost'] = df['unit_cost'].astype(object)
+    df.loc[3, 'unit_cost'] = '十八萬'
+    ok, message = BatchComparator().validate(df)
+    assert not ok and 'unit_cost' in message and '十八萬' in message
+    with pytest.raises(ValueError, match='unit_cost'):
+        BatchComparator().compare(df)
+    # 數值字串與空白可轉換，不視為錯誤
+    df.loc[3, 'unit_cost'] = '180000'
+    df.loc[4, 'unit_cost'] = None
+    assert BatchComparator().validate(df) == (True, '')
+
+
+def test_iter_compare_streams_chunks(tmp_path):
+    df = _frame(120)
+    path = tmp_path / 'cases.csv'
+    df.to_csv(path, index=False)
+    comparator = BatchComparator()
+    summary = CompareSummary()
+    chunks = list(comparator.iter_compare(str(path), chunk_size=50, summary=summary))
+    assert [len(c) for c in chunks] == [50, 50, 20]
+    whole = comparator.compare(df)
+    np.testing.assert_allclose(pd.concat(chunks)['預測坪數'], whole['預測坪數'])
+    assert summary.to_dict()['MAE(坪)'] == pytest.approx(whole['絕對誤差'].abs().mean())
@@ -0,0 +1,54 @@
+"""逐月現金流量：NPV / IRR 與已知值比對、地主現金流量合計"""
+
+import numpy as np
+import pytest
+
+from modules.cash_flow import CashFlowEngine, irr, npv
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def test_npv_known_values():
+    # -1000 + 300/1.05 + 400/1.05^2 + 500/1.05^3
+    assert npv([-1000, 300, 400, 500], 0.05)[0] == pytest.approx(80.444876, abs=1e-6)
+    assert npv([-100, 110], 0.10)[0] == pytest.approx(0.0, abs=1e-12)
+    # 第 0 期不折現；每列可各自使用不同利率
+    flows = np.array([[100.0, 0.0, 0.0], [0.0, 0.0, 121.0]])
+    assert npv(flows, [0.5, 0.10]).tolist() == pytest.approx([100.0, 100.0])
+
+
+def test_irr_known_values():
+    flows = np.array([[-100.0, 110.0, 0.0], [-100.0, 0.0, 121.0]])
+    assert irr(flows).tolist() == pytest.approx([0.10, 0.10], abs=1e-10)
+    # 經典範例：-1000, 300, 400, 500 的 IRR 約 8.8963%
+    rate = irr([-1000.0, 300.0, 400.0, 500.0])[0]
+    assert rate == pytest.approx(0.0889633947, abs=1e-8)
+    assert npv([-1000.0, 300.0, 400.0, 500.0], rate)[0] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_irr_without_sign_change_is_nan():
+    result = irr(np.array([[100.0, 50.0, 25.0], [-100.0, -50.0, -25.0], [-100.0, 0.0, 400.0]]))
+    assert np.isnan(result[:2]).all()
+    assert result[2] == pytest.approx(1.0)
+
+
+def test_owner_flows_sum_to_net_benefit():
+    engine = CashFlowEngine()
+    output = engine.evaluate(BASE, loan_rate=0.0, return_flows=True)
+    scalar = engine.engine.run(BASE)
+
+    assert output['owner_flows'].sum() == pytest.approx(float(np.asarray(scalar['net_benefit']).item()))
+    assert output['interest_cost'][0] == 0.0
+    monthly = irr(output['owner_flows'])[0]
+    assert output['owner_irr'][0] == pytest.approx((1 + monthly) ** 12 - 1)
+
+
+def test_invalid_schedule_window():
+    with pytest.raises(ValueError, match='時程區間無效'):
+        CashFlowEngine().evaluate(BASE, schedule={'construction': (10, 5)})
@@ -0,0 +1,41 @@
+"""命令列 batch：以 --params 補齊缺少欄位，缺欄位時明確列出"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from modules.cli import main
+
+CASES = Path(__file__).resolve().parents[1] / 'data' / 'cases_batch.csv'
+
+DEFAULTS = {
+    'ownership_ratio': 0.25, 'demo_unit_cost': 4000, 'design_rate': 0.04, 'finance_rate': 0.03,
+    'management_rate': 0.22, 'tax_rate': 0.02, 'scenario_factor': 1.0
+}
+
+
+def test_batch_reports_missing_columns():
+    with pytest.raises(SystemExit) as exc:
+        main(['batch', str(CASES)])
+    assert 'demo_unit_cost' in str(exc.value) and 'ownership_ratio' in str(exc.value)
+
+
+def test_batch_fills_missing_columns_from_params(tmp_path, capsys):
+    params = tmp_path / 'defaults.json'
+    params.write_text(json.dumps(DEFAULTS), encoding='utf-8')
+    assert main(['batch', str(CASES), '--params', str(params)]) == 0
+    assert json.loads(capsys.readouterr().out)['案例數'] == 4
+
+
+def test_risk_command(tmp_path, capsys):
+    params = tmp_path / 'params.json'
+    params.write_text(json.dumps({**DEFAULTS, 'total_land_area': 100.0, 'personal_building_area': 80.0,
+                                  'legal_far': 2.25, 'unit_cost': 180000, 'market_price': 600000,
+                                  'efficiency_coef': 0.9, 'sales_coef': 1.45}), encoding='utf-8')
+    output = tmp_path / 'risk.csv'
+    assert main(['risk', str(params), '--draws', '2000', '--corr', 'market_price', 'unit_cost', '0.5',
+                 '-o', str(output)]) == 0
+    result = json.loads(capsys.readouterr().out)
+    assert result['n_draws'] == 2000 and 0 <= result['prob_shortfall'] <= 1
+    assert output.exists()
@@ -0,0 +1,117 @@
+"""並行安全：多執行緒共用同一組計算器、快取與管線，結果須與逐筆序列計算一致"""
+
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.cost_calculator import CostCalculator
+from modules.pipeline import IncrementalPipeline
+from modules.result_cache import ResultCache
+from modules.vectorized_engine import VectorizedEngine
+from modules.volume_calculator import VolumeCalculator
+
+N_THREADS = 16
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _cases(n=200, seed=0):
+    """樓層數與建築年份有無交錯，使各案的原容積率推估方法不同"""
+    rng = random.Random(seed)
+    cases = []
+    for i in range(n):
+        cases.append({
+            **BASE,
+            'total_land_area': rng.choice([40.0, 80.0, 150.0]),
+            'personal_building_area': rng.uniform(20, 200),
+            'num_floors': rng.choice([None, 3, 5, 12]),
+            'building_year': rng.choice([None, 1965, 1985, 2005]),
+            'market_price': rng.choice([450000, 600000, 900000]),
+            'ownership_ratio': rng.uniform(0.05, 0.5)
+        })
+    return cases
+
+
+def _serial(params):
+    volume = VolumeCalculator().calculate_volume(params)
+    cost = CostCalculator().calculate_total_costs(params, volume)
+    alloc = AllocationCalculator().calculate_allocation(params, volume, cost)
+    return {'volume': volume, 'cost': cost, 'alloc': alloc}
+
+
+def _hammer(work, cases):
+    """各執行緒以不同順序處理全部案例，以 Barrier 同時起跑放大交錯"""
+    barrier = threading.Barrier(N_THREADS)
+
+    def worker(seed):
+        order = list(range(len(cases)))
+        random.Random(seed).shuffle(order)
+        barrier.wait()
+        return [(i, work(cases[i])) for i in order]
+
+    with ThreadPoolExecutor(max_workers=N_THREADS) as pool:
+        return [pair for rows in pool.map(worker, range(N_THREADS)) for pair in rows]
+
+
+@pytest.fixture(scope='module')
+def cases():
+    return _cases()
+
+
+@pytest.fixture(scope='module')
+def expected(cases):
+    return [_serial(params) for params in cases]
+
+
+def test_shared_calculators(cases, expected):
+    volume_calc, cost_calc, alloc_calc = VolumeCalculator(), CostCalculator(), AllocationCalculator()
+
+    def work(params):
+        volume = volume_calc.calculate_volume(params)
+        cost = cost_calc.calculate_total_costs(params, volume)
+        return {'volume': volume, 'cost': cost,
+                'alloc': alloc_calc.calculate_allocation(params, volume, cost)}
+
+    for i, result in _hammer(work, cases):
+        assert result == expected[i]
+        assert result['volume'].original_far_method == expected[i]['volume'].original_far_method
+
+
+def test_shared_pipeline_and_cache(cases, expected):
+    # 快取容量小於案例數，並行讀寫的同時持續淘汰
+    cache = ResultCache(max_entries=64)
+    pipeline = IncrementalPipeline.from_calculators(
+        {'volume': VolumeCalculator(), 'cost': CostCalculator(), 'alloc': AllocationCalculator()},
+        cache=cache)
+
+    results = _hammer(pipeline.run, cases)
+    for i, result in results:
+        assert result == expected[i]
+
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == len(results) * len(pipeline.stages)
+    assert stats['entries'] <= 64
+    counts = pipeline.stats()
+    for name in ('volume', 'cost', 'alloc'):
+        assert counts[name]['computed'] + counts[name]['reused'] == len(results)
+
+
+def test_shared_engine_pipeline(cases):
+    engine = VectorizedEngine()
+    expected = [engine.run(params) for params in cases]
+    pipeline = IncrementalPipeline.from_engine(engine, cache=ResultCache(max_entries=64))
+
+    for i, result in _hammer(pipeline.run, cases):
+        merged = {**result['volume'], **result['cost'], **result['alloc']}
+        for key in ('return_area_ping', 'personal_allocated_value', 'estimated_original_far'):
+            np.testing.assert_array_equal(merged[key], expected[i][key])
@@ -0,0 +1,89 @@
+"""設計參數最佳化：限制式、網格分批保留候選與局部精修"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from modules.design_optimizer import DesignOptimizer
+from modules.vectorized_engine import VectorizedEngine
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def test_default_variables_are_design_choices():
+    result = DesignOptimizer().optimize(BASE)
+    assert set(result['best']) == {'efficiency_coef', 'sales_coef'}
+    assert 'num_floors' not in DesignOptimizer().variables
+
+
+def test_best_matches_engine_and_brute_force():
+    optimizer = DesignOptimizer()
+    result = optimizer.optimize(BASE, variables=['sales_coef', 'design_rate'])
+    engine_value = VectorizedEngine().run({**BASE, **result['best']})['return_area_ping']
+    assert result['objective_value'] == pytest.approx(float(engine_value))
+    assert result['metrics']['return_area_ping'] == pytest.approx(result['objective_value'])
+    grid = [VectorizedEngine().run({**BASE, 'sales_coef': s, 'design_rate': d})['return_area_ping']
+            for s, d in itertools.product(np.linspace(1.3, 1.7, 21), np.linspace(0.02, 0.08, 21))]
+    assert result['objective_value'] >= max(grid) - 1e-9
+
+
+def test_constraints_are_respected():
+    optimizer = DesignOptimizer()
+    constraints = {'return_area_ping': ('<=', 180.0), 'burden_ratio': ('<=', 0.3)}
+    result = optimizer.optimize(BASE, constraints=constraints)
+    assert result['metrics']['return_area_ping'] <= 180.0
+    assert result['metrics']['burden_ratio'] <= 0.3
+    assert (result['candidates_df']['地主換回坪數'] <= 180.0).all()
+
+
+def test_infeasible_returns_none():
+    result = DesignOptimizer().optimize(BASE, constraints={'return_area_ping': ('>=', 1e6)})
+    assert result['best'] is None and result['candidates_df'].empty
+
+
+def test_invalid_operator():
+    with pytest.raises(ValueError):
+        DesignOptimizer().optimize(BASE, constraints={'shortfall': ('<', 0)})
+
+
+def test_refinement_reaches_binding_constraint():
+    # 限制式於網格點之間成為有效限制：精修後應逼近上限，並優於僅網格搜尋
+    optimizer = DesignOptimizer()
+    constraints = {'return_area_ping': ('<=', 180.0)}
+    grid_only = optimizer.optimize(BASE, constraints=constraints, max_iter=0)
+    refined = optimizer.optimize(BASE, constraints=constraints)
+    assert refined['objective_value'] > grid_only['objective_value']
+    assert refined['objective_value'] == pytest.approx(180.0, abs=1e-3)
+    assert refined['evaluations'] > grid_only['evaluations'] == 25
+
+
+def test_chunked_grid_keeps_same_best():
+    optimizer = DesignOptimizer()
+    variables = ['efficiency_coef', 'sales_coef', 'design_rate']
+    whole = optimizer.optimize(BASE, variables=variables, top_k=3, max_iter=0)
+    chunked = optimizer.optimize(BASE, variables=variables, top_k=3, max_iter=0, chunk_size=7)
+    assert chunked['best'] == whole['best']
+    assert len(chunked['candidates_df']) <= 3
+
+
+def test_integer_variables_stay_integer():
+    optimizer = DesignOptimizer()
+    optimizer.variables['building_year'] = (1960, 2020, True)
+    result = optimizer.optimize(BASE, variables=['sales_coef', 'building_year'])
+    assert float(result['best']['building_year']).is_integer()
+    assert np.all(result['candidates_df']['building_year'] % 1 == 0)
+
+
+def test_keep_top():
+    x = np.arange(10, dtype=float)[:, None]
+    f = np.array([3, 9, -np.inf, 7, 1, 8, 0, 2, 6, 5], dtype=float)
+    top_x, top_f = DesignOptimizer._keep_top(x, f, 3)
+    assert sorted(top_f) == [7, 8, 9]
+    assert sorted(top_x[:, 0]) == [1, 3, 5]
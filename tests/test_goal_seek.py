@@ -0,0 +1,44 @@
+"""目標搜尋：以候選值計算目標函數、有效範圍外的封閉解不採用"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.goal_seek import GoalSeeker
+from modules.vectorized_engine import VectorizedEngine
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _shortfall_gap(params):
+    result = VectorizedEngine().run(params)
+    return float(result['personal_allocated_value'] - params['personal_building_area'] * result['effective_price'])
+
+
+def test_solve_personal_building_area():
+    result = GoalSeeker().solve(BASE, 'personal_building_area')
+    assert result['converged'] and not result['out_of_bounds']
+    assert result['value'] == pytest.approx(159.56, abs=0.01)
+    assert _shortfall_gap({**BASE, 'personal_building_area': result['value']}) == pytest.approx(0, abs=1e-3)
+
+
+@pytest.mark.parametrize('param', ['market_price', 'unit_cost', 'efficiency_coef'])
+def test_closed_form_rejects_roots_outside_bounds(param):
+    result = GoalSeeker().solve(BASE, param)
+    assert np.isnan(result['value'])
+    assert not result['converged'] and result['out_of_bounds']
+
+
+def test_closed_form_root_within_bounds():
+    df = pd.DataFrame([BASE, {**BASE, 'personal_building_area': 30.0}])
+    result = GoalSeeker().solve(df, 'ownership_ratio')
+    assert result['converged'].all()
+    for i, x in enumerate(result['value']):
+        assert 0 <= x <= 1
+        assert _shortfall_gap({**df.iloc[i].to_dict(), 'ownership_ratio': x}) == pytest.approx(0, abs=1e-2)
@@ -0,0 +1,57 @@
+"""效能量測：快取、管線與工作的事件計數器"""
+
+import pytest
+
+from modules.instrumentation import metrics
+from modules.result_cache import ResultCache
+from modules.pipeline import IncrementalPipeline
+from modules.volume_calculator import VolumeCalculator
+from modules.cost_calculator import CostCalculator
+from modules.allocation_calculator import AllocationCalculator
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_cache_counters(enabled):
+    cache = ResultCache(max_entries=1)
+    cache.get('a')
+    cache.put('a', 1)
+    cache.get('a')
+    cache.put('b', 2)
+    counters = enabled.stats()['counters']
+    assert counters['result_cache.hits'] == 1
+    assert counters['result_cache.misses'] == 1
+    assert counters['result_cache.evictions'] == 1
+    assert 'urban_renewal_events_total{name="result_cache.hits"} 1.0' in enabled.to_prometheus()
+
+
+def test_pipeline_counters(enabled):
+    pipeline = IncrementalPipeline.from_calculators(
+        {'volume': VolumeCalculator(), 'cost': CostCalculator(), 'alloc': AllocationCalculator()})
+    pipeline.run(BASE)
+    pipeline.run({**BASE, 'market_price': 700000})
+    counters = enabled.stats()['counters']
+    assert counters['pipeline.volume.computed'] == 1
+    assert counters['pipeline.volume.reused'] == 1
+    assert counters['pipeline.cost.computed'] == 2
+
+
+def test_counters_disabled():
+    metrics.reset()
+    ResultCache().get('a')
+    assert metrics.stats()['counters'] == {}
@@ -0,0 +1,100 @@
+"""背景工作：批次比對逐批寫入暫存檔、部分結果只保留最新批次、移除工作時清除暫存檔"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from modules.batch_comparator import BatchComparator
+from modules.job_manager import Job, JobManager, JobCancelled, batch_compare_job
+
+DEFAULTS = {
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _csv(n=2500, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'case_name': [f'案{i}' for i in range(n)],
+        'total_land_area': rng.uniform(30, 300, n),
+        'personal_land_area': rng.uniform(5, 30, n),
+        'personal_building_area': rng.uniform(10, 200, n),
+        'actual_return_area': rng.uniform(10, 100, n)
+    })
+    return frame, frame.to_csv(index=False).encode()
+
+
+def _wait(job, timeout=30):
+    deadline = time.time() + timeout
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    assert not job.active
+
+
+def test_partials_keep_only_latest_batches():
+    job = Job('batch')
+    job.max_partials = 2
+    for i in range(5):
+        job.report(i / 5, i)
+    assert job.partials() == [3, 4]
+    assert job.partials(4) == [4]
+    assert job.snapshot()['partials'] == 5
+
+
+def test_batch_job_streams_results_to_files():
+    frame, data = _csv()
+    job = Job('batch')
+    result = batch_compare_job(job, data, chunk_size=500, defaults=DEFAULTS, excel=True,
+                               preview_rows=800)
+
+    expected = BatchComparator().compare(frame.assign(**DEFAULTS))
+    written = pd.read_csv(result['csv'], encoding='utf-8-sig')
+    assert len(written) == len(frame)
+    assert np.allclose(written['預測坪數'], expected['預測坪數'])
+    assert result['summary']['案例數'] == len(frame)
+
+    # 部分結果只保留涵蓋最新 preview_rows 列的批次
+    previews = job.partials()
+    assert len(previews) == 2 and sum(len(p) for p in previews) == 1000
+    assert job.snapshot()['partials'] == 5
+
+    workbook = load_workbook(result['excel'], read_only=True)
+    assert workbook.sheetnames == ['誤差統計', '逐案結果']
+    assert sum(1 for _ in workbook['逐案結果'].iter_rows()) == len(frame) + 1
+    workbook.close()
+    job.discard()
+    assert not os.path.exists(os.path.dirname(result['csv']))
+
+
+def test_cancelled_job_keeps_files_until_discarded():
+    _, data = _csv()
+    job = Job('batch')
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        batch_compare_job(job, data, chunk_size=500, defaults=DEFAULTS)
+    assert job._cleanups
+    job.discard()
+    assert not job._cleanups
+
+
+def test_pruned_jobs_remove_temp_files():
+    _, data = _csv(200)
+    manager = JobManager(max_workers=1, max_finished=1)
+    first = manager.submit(batch_compare_job, data, defaults=DEFAULTS, kind='batch')
+    _wait(first)
+    path = first.result['csv']
+    assert os.path.exists(path) and first.result['excel'] is None
+    second = manager.submit(batch_compare_job, data, defaults=DEFAULTS, kind='batch')
+    _wait(second)
+    manager.submit(lambda job: None)  # 提交時移除超過保留數的已結束工作
+    assert manager.get(first.id) is None
+    assert not os.path.exists(path)
+    manager.shutdown()
+    assert not os.path.exists(second.result['csv'])
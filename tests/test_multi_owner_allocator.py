@@ -0,0 +1,64 @@
+"""多地主權利分配：單一地主與逐筆計算器一致、多地主總計與淨值相符"""
+
+import pandas as pd
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.cost_calculator import CostCalculator
+from modules.multi_owner_allocator import MultiOwnerAllocator
+from modules.volume_calculator import VolumeCalculator
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+OWNERS = pd.DataFrame({
+    'owner_id': ['甲', '乙', '丙', '丁'],
+    'land_area': [25.0, 30.0, 15.0, 10.0],
+    'building_area': [80.0, 95.0, 40.0, 20.0]
+})
+
+
+def test_single_owner_matches_allocation_calculator():
+    volume = VolumeCalculator().calculate_volume(BASE)
+    cost = CostCalculator().calculate_total_costs(BASE, volume)
+    expected = AllocationCalculator().calculate_allocation(BASE, volume, cost)
+
+    result = MultiOwnerAllocator().allocate(BASE, [{'land_area': 25.0, 'building_area': 80.0,
+                                                    'ownership_ratio': 0.25}])
+    row = result['owners_df'].iloc[0]
+    for field in ('personal_allocated_value', 'return_area_ping', 'surplus', 'shortfall',
+                  'estimated_original_value', 'personal_cost', 'net_benefit', 'roi'):
+        assert row[field] == pytest.approx(expected[field]), field
+    assert result['totals']['net_value'] == pytest.approx(expected['net_value'])
+    assert result['totals']['developer_share'] == pytest.approx(expected['developer_share'])
+    assert result['cost']['total_cost'] == pytest.approx(cost['total_cost'])
+
+
+def test_owner_totals_split_net_value_by_ratio_sum():
+    params = {k: v for k, v in BASE.items()
+              if k not in ('personal_land_area', 'personal_building_area', 'ownership_ratio')}
+    result = MultiOwnerAllocator().allocate(params, OWNERS)
+    owners, totals = result['owners_df'], result['totals']
+
+    ratios = OWNERS['land_area'] / BASE['total_land_area']
+    assert owners['ownership_ratio'].tolist() == pytest.approx(ratios.tolist())
+    assert totals['ownership_ratio_sum'] == pytest.approx(0.8)
+    assert totals['net_value'] == pytest.approx(totals['total_revenue'] - totals['total_cost'])
+    assert totals['owners_allocated_value'] == pytest.approx(totals['net_value'] * 0.8)
+    assert totals['owners_allocated_value'] + totals['developer_share'] == pytest.approx(totals['net_value'])
+    assert owners['personal_allocated_value'].tolist() == pytest.approx(
+        (totals['net_value'] * ratios).tolist())
+    assert totals['return_area_ping'] == pytest.approx(owners['return_area_ping'].sum())
+
+
+def test_rejects_empty_and_oversubscribed_tables():
+    allocator = MultiOwnerAllocator()
+    with pytest.raises(ValueError, match='不可為空'):
+        allocator.allocate(BASE, pd.DataFrame(columns=['land_area']))
+    with pytest.raises(ValueError, match='超過 1'):
+        allocator.allocate(BASE, {'land_area': [60.0, 50.0], 'building_area': [10.0, 10.0]})
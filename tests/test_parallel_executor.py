@@ -0,0 +1,62 @@
+"""多行程平行運算：分片結果須與單行程計算相同且順序不變"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.parallel_executor import ParallelExecutor
+from modules.vectorized_engine import VectorizedEngine
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _square_sum(cols, power):
+    return {'value': cols['a'] ** power + cols['b']}
+
+
+@pytest.fixture(scope='module')
+def executor():
+    with ParallelExecutor(max_workers=2, chunk_size=1000) as executor:
+        yield executor
+
+
+def test_run_engine_matches_in_process(executor):
+    rng = np.random.default_rng(0)
+    n = 4321  # 非分片大小整數倍，含不足一片的最後一段
+    df = pd.DataFrame({**BASE,
+                       'total_land_area': rng.uniform(30, 300, n),
+                       'market_price': rng.uniform(400000, 900000, n),
+                       'building_year': rng.choice([np.nan, 1970, 1995, 2010], n)})
+    engine = VectorizedEngine()
+    expected = engine.run(df)
+    results = executor.run_engine(engine, df)
+    assert set(results) == set(expected)
+    for key, values in expected.items():
+        np.testing.assert_array_equal(np.broadcast_to(values, (n,)), results[key], err_msg=key)
+
+
+def test_constant_columns_broadcast(executor):
+    # 只有一欄變動，其餘為廣播的純量欄位
+    prices = np.linspace(400000, 900000, 2500)
+    engine = VectorizedEngine()
+    results = executor.run_engine(engine, {**BASE, 'market_price': prices})
+    np.testing.assert_array_equal(results['return_area_ping'],
+                                  engine.run({**BASE, 'market_price': prices})['return_area_ping'])
+
+
+def test_map_columns_keeps_order(executor):
+    cols = {'a': np.arange(3500, dtype=float), 'b': np.full(3500, 1.0)}
+    np.testing.assert_array_equal(executor.map_columns(_square_sum, cols, 2)['value'],
+                                  np.arange(3500, dtype=float) ** 2 + 1)
+
+
+def test_small_batches_run_in_process():
+    executor = ParallelExecutor(max_workers=4, chunk_size=1000)
+    executor.map_columns(_square_sum, {'a': np.ones(10), 'b': np.ones(10)}, 1)
+    assert executor._pool is None
@@ -0,0 +1,49 @@
+"""地籍參照：覆寫僅限查得的地號、營建單價依設計樓層數查詢"""
+
+import numpy as np
+import pandas as pd
+
+from modules.parcel_store import ParcelStore, ConstructionCostTable
+
+TIERS = [
+    {'name': 'rc_low_rise', 'min_floors': 1, 'max_floors': 5, 'unit_cost': 180000},
+    {'name': 'rc_mid_rise', 'min_floors': 6, 'max_floors': 15, 'unit_cost': 200000}
+]
+
+
+def _store():
+    table = pd.DataFrame({
+        'parcel_id': ['0001', '0002'],
+        'legal_far': [2.25, 4.0],
+        'total_land_area': [100.0, 200.0],
+        'num_floors': [12.0, 3.0]
+    })
+    return ParcelStore(table, cost_table=ConstructionCostTable(TIERS))
+
+
+def test_overwrite_keeps_unmatched_rows():
+    df = pd.DataFrame({'parcel_id': ['0001', '9999'], 'legal_far': [3.0, 3.5],
+                       'total_land_area': [50.0, 60.0]})
+    out = _store().enrich(df, overwrite=True)
+    assert out['legal_far'].tolist() == [2.25, 3.5]
+    assert out['total_land_area'].tolist() == [100.0, 60.0]
+    assert out['num_floors'].iloc[0] == 12.0 and np.isnan(out['num_floors'].iloc[1])
+
+
+def test_fill_only_missing_values():
+    df = pd.DataFrame({'parcel_id': ['0001', '0002'], 'legal_far': [np.nan, 3.0]})
+    out = _store().enrich(df)
+    assert out['legal_far'].tolist() == [2.25, 3.0]
+
+
+def test_unit_cost_tier_uses_design_floors():
+    # 0001 原建物 12 層，但法定容積 2.25 ÷ 0.6 → 設計 4 層；0002 原建物 3 層，4.0 ÷ 0.6 → 設計 7 層
+    df = pd.DataFrame({'parcel_id': ['0001', '0002', '0001']})
+    df['design_floors'] = [np.nan, np.nan, 10.0]
+    out = _store().enrich(df)
+    assert out['unit_cost'].tolist() == [180000, 200000, 200000]
+
+
+def test_existing_unit_cost_is_kept():
+    df = pd.DataFrame({'parcel_id': ['0002'], 'unit_cost': [190000.0]})
+    assert _store().enrich(df)['unit_cost'].tolist() == [190000.0]
@@ -0,0 +1,66 @@
+"""增量計算管線：僅重算受參數變動影響的階段"""
+
+import numpy as np
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.cost_calculator import CostCalculator
+from modules.pipeline import IncrementalPipeline
+from modules.vectorized_engine import VectorizedEngine
+from modules.volume_calculator import VolumeCalculator
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _pipeline():
+    return IncrementalPipeline.from_calculators(
+        {'volume': VolumeCalculator(), 'cost': CostCalculator(), 'alloc': AllocationCalculator()})
+
+
+def _computed(pipeline):
+    return {name: counts['computed'] for name, counts in pipeline.stats().items()}
+
+
+@pytest.mark.parametrize('key, value, recomputed', [
+    ('ownership_ratio', 0.3, {'alloc'}),
+    ('design_rate', 0.05, {'cost', 'alloc'}),
+    ('legal_far', 3.0, {'volume', 'cost', 'alloc'}),
+    ('case_name', '其他案', set())
+])
+def test_recomputes_only_affected_stages(key, value, recomputed):
+    pipeline = _pipeline()
+    pipeline.run(BASE)
+    before = _computed(pipeline)
+    params = {**BASE, key: value}
+    results = pipeline.run(params)
+    after = _computed(pipeline)
+    assert {name for name in after if after[name] > before[name]} == recomputed
+
+    volume = VolumeCalculator().calculate_volume(params)
+    cost = CostCalculator().calculate_total_costs(params, volume)
+    assert results['alloc'] == AllocationCalculator().calculate_allocation(params, volume, cost)
+
+
+def test_affected_stages():
+    pipeline = _pipeline()
+    assert pipeline.affected_stages(['market_price']) == ['cost', 'alloc']
+    assert pipeline.first_affected_stage(['tax_rate', 'sales_coef']) == 'volume'
+    assert pipeline.first_affected_stage(['case_name']) is None
+
+
+def test_engine_pipeline_run_from():
+    engine = VectorizedEngine()
+    pipeline = IncrementalPipeline.from_engine(engine)
+    base = pipeline.run(BASE)
+    prices = np.array([500000.0, 600000.0, 700000.0])
+    cols = pipeline.prepare({**BASE, 'market_price': prices})
+    results = pipeline.run_from(cols, 'cost', base)
+    assert pipeline.stats()['volume']['computed'] == 1
+    np.testing.assert_allclose(results['alloc']['return_area_ping'],
+                               engine.run({**BASE, 'market_price': prices})['return_area_ping'])
@@ -0,0 +1,78 @@
+"""Excel 報表匯出：超過每表列數上限時接續至新工作表，接續表置於同名工作表之後"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from modules.report_exporter import ReportExporter
+
+DEFAULTS = {
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _rows(sheet):
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def _cases(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'case_name': [f'案{i}' for i in range(n)],
+        'total_land_area': rng.uniform(30, 300, n),
+        'personal_land_area': rng.uniform(5, 30, n),
+        'personal_building_area': rng.uniform(10, 200, n),
+        'actual_return_area': rng.uniform(10, 100, n)
+    }).assign(**DEFAULTS)
+
+
+@pytest.mark.parametrize('n, sheets', [(9, 1), (10, 2), (27, 3), (28, 4)])
+def test_write_rolls_over_at_max_rows(n, sheets):
+    # 每表 10 列含標題列，即 9 列資料
+    frame = pd.DataFrame({'編號': np.arange(n), '數值': np.arange(n) * 0.5})
+    buffer = io.BytesIO()
+    counts = ReportExporter(max_rows_per_sheet=10).write(buffer, {'資料': frame})
+    assert counts == {'資料': n}
+
+    workbook = load_workbook(buffer, read_only=True)
+    names = ['資料'] + [f'資料 ({i})' for i in range(2, sheets + 1)]
+    assert workbook.sheetnames == names
+    ids = []
+    for name in names:
+        rows = _rows(workbook[name])
+        assert rows[0] == ['編號', '數值'] and 1 < len(rows) <= 10
+        ids += [row[0] for row in rows[1:]]
+    assert ids == list(range(n))
+
+
+def test_rollover_across_chunks_keeps_order_and_columns():
+    chunks = [pd.DataFrame({'a': [i] * 4, 'b': range(4)}) for i in range(5)]
+    chunks[2] = chunks[2][['b', 'a']]  # 後續批次欄位順序不同時依第一批欄位對齊
+    buffer = io.BytesIO()
+    ReportExporter(max_rows_per_sheet=7).write(buffer, {'批次': iter(chunks)})
+    workbook = load_workbook(buffer, read_only=True)
+    assert workbook.sheetnames == ['批次', '批次 (2)', '批次 (3)', '批次 (4)']
+    rows = [row for name in workbook.sheetnames for row in _rows(workbook[name])[1:]]
+    assert rows == [[i, j] for i in range(5) for j in range(4)]
+
+
+def test_export_batch_groups_continuation_sheets():
+    frame = _cases(25)
+    buffer = io.BytesIO()
+    totals = ReportExporter(max_rows_per_sheet=11).export_batch(
+        (frame.iloc[i:i + 7] for i in range(0, 25, 7)), buffer)
+    assert totals['案例數'] == 25
+
+    workbook = load_workbook(buffer, read_only=True)
+    # 逐案結果與輸入參數交錯寫入，接續表仍排在各自的同名工作表之後
+    assert workbook.sheetnames == ['誤差統計', '逐案結果', '逐案結果 (2)', '逐案結果 (3)',
+                                   '輸入參數', '輸入參數 (2)', '輸入參數 (3)']
+    cases = [row[0] for name in workbook.sheetnames if name.startswith('逐案結果')
+             for row in _rows(workbook[name])[1:]]
+    assert cases == frame['case_name'].tolist()
@@ -0,0 +1,44 @@
+"""結果快取：LRU 淘汰、正規化鍵與模型版本"""
+
+import numpy as np
+
+from modules.result_cache import ResultCache, make_key
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # a 成為最近使用
+    cache.put('c', 3)  # 淘汰最久未使用的 b
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    assert stats['hits'] == 3 and stats['misses'] == 1
+
+
+def test_get_or_compute_computes_once():
+    cache = ResultCache()
+    calls = []
+    compute = lambda: calls.append(1) or 'value'
+    params = {'market_price': 600000, 'unit_cost': 180000}
+    assert cache.get_or_compute(params, compute) == 'value'
+    assert cache.get_or_compute(dict(reversed(list(params.items()))), compute) == 'value'
+    assert len(calls) == 1
+    cache.get_or_compute(params, compute, namespace='sensitivity')
+    assert len(calls) == 2
+
+
+def test_key_normalizes_numbers():
+    a = make_key({'legal_far': 2, 'levels': np.array([-0.1, 0.1]), 'flag': np.bool_(True)})
+    b = make_key({'legal_far': 2.0, 'levels': [-0.1, 0.1], 'flag': True})
+    assert a == b
+    assert make_key({'legal_far': 2.0}) != make_key({'legal_far': 2.25})
+
+
+def test_model_version_in_key():
+    params = {'market_price': 600000}
+    old, new = ResultCache(model_version='1.0'), ResultCache(model_version='1.1')
+    assert old.make_key(params) != new.make_key(params)
+    assert make_key(params, model_version='1.0') == old.make_key(params)
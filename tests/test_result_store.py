@@ -0,0 +1,156 @@
+"""持久化結果儲存：整批鍵雜湊、整批查詢、淘汰與壓縮整理"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.result_store import ResultStore
+from modules.vectorized_engine import VectorizedEngine
+
+DEFAULTS = {
+    'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990, 'efficiency_coef': 0.9,
+    'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000, 'design_rate': 0.04,
+    'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02, 'market_price': 600000,
+    'scenario_factor': 1.0
+}
+
+
+def _frame(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'case_name': [f'案{i}' for i in range(n)],
+        'total_land_area': rng.uniform(30, 300, n),
+        'personal_land_area': rng.uniform(5, 30, n),
+        'personal_building_area': rng.uniform(10, 200, n),
+        'legal_far': rng.uniform(1.5, 8.0, n),
+        'actual_return_area': rng.uniform(10, 100, n)
+    }).assign(**DEFAULTS)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(tmp_path / 'results.sqlite')
+    yield store
+    store.close()
+
+
+def test_row_keys_ignore_non_inputs(store):
+    df = _frame()
+    keys = store.row_keys(df)
+    assert keys.shape == (len(df), 2) and keys.dtype == np.int64
+    assert len(np.unique(keys[:, 0])) == len(df)
+    renamed = df.assign(case_name='x', actual_return_area=0.0)
+    assert (store.row_keys(renamed) == keys).all()
+    # 缺少的欄位引擎另有預設值，與缺值分別雜湊
+    dropped = store.row_keys(df.drop(columns='efficiency_coef'))
+    assert (dropped == store.row_keys(df.drop(columns='efficiency_coef'))).all()
+    assert not (dropped[:, 0] == store.row_keys(df.assign(efficiency_coef=np.nan))[:, 0]).any()
+
+
+def test_row_keys_change_with_inputs_engine_and_version(store, tmp_path):
+    df = _frame()
+    keys = store.row_keys(df)
+    changed = df.copy()
+    changed.loc[3, 'legal_far'] += 1e-9
+    new = store.row_keys(changed)
+    assert (new[:, 0] != keys[:, 0]).tolist() == [i == 3 for i in range(len(df))]
+
+    engine = VectorizedEngine()
+    engine.disaster_bonus_multiplier = 1.6
+    assert not (store.row_keys(df, engine)[:, 0] == keys[:, 0]).any()
+    other = ResultStore(tmp_path / 'other.sqlite', model_version='0.0-test')
+    assert not (other.row_keys(df)[:, 0] == keys[:, 0]).any()
+    other.close()
+
+
+def test_bulk_lookup_hit_and_miss_masks(store):
+    df = _frame()
+    engine = VectorizedEngine()
+    keys = store.row_keys(df)
+    expected = engine.run(df)
+
+    cached, found = store.lookup_rows(keys)
+    assert cached == {} and not found.any()
+
+    half = np.arange(0, len(df), 2)
+    store.store_rows(keys[half], {k: np.asarray(v)[half] for k, v in expected.items()})
+    cached, found = store.lookup_rows(keys)
+    assert found.tolist() == [i % 2 == 0 for i in range(len(df))]
+    assert np.allclose(cached['return_area_ping'][found], expected['return_area_ping'][found])
+    assert cached['legal_adopted'].dtype == bool
+    assert (cached['legal_adopted'][found] == expected['legal_adopted'][found]).all()
+
+    # 部分命中時只計算其餘案例，結果與直接計算相同
+    results = store.run_engine(engine, df)
+    for name, values in expected.items():
+        assert np.allclose(results[name], values, equal_nan=True), name
+    assert store.lookup_rows(keys)[1].all()
+
+
+def test_run_engine_persists_across_instances(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    df = _frame()
+    first = ResultStore(path)
+    first.run_engine(VectorizedEngine(), df)
+    first.close()
+
+    second = ResultStore(path)
+    results = second.run_engine(VectorizedEngine(), df)
+    assert second.stats()['hits'] == len(df) and second.stats()['misses'] == 0
+    assert np.allclose(results['return_area_ping'], VectorizedEngine().run(df)['return_area_ping'])
+    second.close()
+
+
+def test_get_put_and_get_or_compute(store):
+    params = {'market_price': 600000, 'unit_cost': 180000}
+    calls = []
+    compute = lambda: calls.append(1) or {'value': 42}
+    assert store.get_or_compute(params, compute) == {'value': 42}
+    assert store.get_or_compute(dict(reversed(params.items())), compute) == {'value': 42}
+    assert len(calls) == 1 and len(store) == 1
+    assert store.get(store.make_key(params, 'sensitivity'), 'missing') == 'missing'
+    stats = store.stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    store = ResultStore(tmp_path / 'results.sqlite', max_bytes=30_000)
+    keys = [store.make_key({'i': i}) for i in range(5)]
+    for i, key in enumerate(keys[:3]):
+        store.put(key, np.full(1000, i, dtype=float))  # 每筆約 8 KB
+    assert store.get(keys[0]) is not None  # 使第 0 筆成為最近使用
+    store.put(keys[3], np.zeros(1000))
+    store.put(keys[4], np.zeros(1000))
+
+    assert store.stats()['evictions'] > 0
+    assert store.stats()['bytes'] <= 30_000
+    assert store.get(keys[1]) is None
+    assert store.get(keys[4]) is not None
+    remaining = len(store)
+    assert store.evict(0) == remaining
+    assert len(store) == 0 and store.stats()['bytes'] == 0
+    store.close()
+
+
+def test_compact_merges_blocks_and_drops_stale_versions(tmp_path):
+    path = tmp_path / 'results.sqlite'
+    old = ResultStore(path, model_version='0.0-old')
+    old.put(old.make_key({'a': 1}), 'stale')
+    old.close()
+
+    store = ResultStore(path, block_rows=1000)
+    df = _frame(300)
+    engine = VectorizedEngine()
+    for start in range(0, 300, 50):
+        store.run_engine(engine, df.iloc[start:start + 50])
+    store.run_engine(engine, df.iloc[:50])  # 全部命中，不新增區塊
+    assert store.stats()['row_blocks'] == 6
+
+    report = store.compact()
+    assert report['stale_removed'] == 1
+    assert (report['blocks_before'], report['blocks_after']) == (6, 1)
+    assert len(store) == 0
+    cached, found = store.lookup_rows(store.row_keys(df))
+    assert found.all()
+    assert np.allclose(cached['return_area_ping'], engine.run(df)['return_area_ping'])
+    store.close()
@@ -0,0 +1,77 @@
+"""結果型別：字典相容、延遲組成的文字欄位與不可變性"""
+
+import dataclasses
+import pickle
+from collections.abc import Mapping
+
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.cost_calculator import CostCalculator
+from modules.results import AllocationResult, CostResult, VolumeResult
+from modules.volume_calculator import VolumeCalculator
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+@pytest.fixture(scope='module')
+def results():
+    volume = VolumeCalculator().calculate_volume(BASE)
+    cost = CostCalculator().calculate_total_costs(BASE, volume)
+    alloc = AllocationCalculator().calculate_allocation(BASE, volume, cost)
+    return volume, cost, alloc
+
+
+def test_result_types(results):
+    volume, cost, alloc = results
+    assert isinstance(volume, VolumeResult) and isinstance(cost, CostResult)
+    assert isinstance(alloc, AllocationResult)
+    assert all(isinstance(r, Mapping) for r in results)
+
+
+def test_mapping_compatibility(results):
+    volume, _, alloc = results
+    assert volume['max_volume_ping'] == volume.max_volume_ping
+    assert 'original_far_method' in volume and 'roi_analysis' in alloc
+    assert volume.get('missing', 'default') == 'default'
+    with pytest.raises(KeyError):
+        volume['missing']
+    as_dict = dict(volume)
+    assert list(as_dict) == list(volume.keys()) and len(as_dict) == len(volume)
+    assert as_dict == volume.to_dict()
+    assert {**alloc}['return_area_ping'] == alloc.return_area_ping
+
+
+def test_derived_text_fields(results):
+    volume, _, alloc = results
+    # 權狀面積法 320%、樓層估算法 5層×60%、年代修正法 1990 年 → 中位數
+    assert volume.original_far_method.startswith('多重驗證法(中位數): 權狀面積法(320.0%)')
+    assert '樓層估算法(5層×60%=300.0%)' in volume.original_far_method
+    assert volume.adopted_scheme == ('法定容積' if volume.legal_adopted else '防災2.0獎勵容積')
+    breakdown = volume.volume_breakdown
+    assert breakdown['stage2_total_floor_ping'] == pytest.approx(volume.total_floor_area)
+    assert breakdown['stage3_saleable_ping'] == pytest.approx(volume.saleable_volume_ping)
+    assert alloc.roi_analysis == {'estimated_original_value': alloc.estimated_original_value,
+                                  'personal_cost': alloc.personal_cost,
+                                  'net_benefit': alloc.net_benefit, 'roi': alloc.roi}
+
+
+def test_immutable_and_compact(results):
+    volume, cost, _ = results
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        volume.max_volume_ping = 0
+    with pytest.raises((AttributeError, TypeError)):
+        cost.extra = 1
+    assert not hasattr(volume, '__dict__')
+
+
+def test_pickle_round_trip(results):
+    for result in results:
+        restored = pickle.loads(pickle.dumps(result))
+        assert restored == result and type(restored) is type(result)
@@ -0,0 +1,83 @@
+"""敏感度分析：批次擾動與逐筆計算一致"""
+
+import numpy as np
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.cost_calculator import CostCalculator
+from modules.sensitivity_analyzer import SensitivityAnalyzer
+from modules.volume_calculator import VolumeCalculator
+
+BASE = {
+    'total_land_area': 100.0, 'personal_land_area': 25.0, 'personal_building_area': 80.0,
+    'legal_far': 2.25, 'ownership_ratio': 0.25, 'num_floors': 5, 'building_year': 1990,
+    'efficiency_coef': 0.9, 'sales_coef': 1.45, 'unit_cost': 180000, 'demo_unit_cost': 4000,
+    'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+    'market_price': 600000, 'scenario_factor': 1.0
+}
+
+
+def _scalar(params, metric):
+    volume = VolumeCalculator().calculate_volume(params)
+    cost = CostCalculator().calculate_total_costs(params, volume)
+    alloc = AllocationCalculator().calculate_allocation(params, volume, cost)
+    return {**volume, **cost, **alloc}[metric]
+
+
+def test_batched_perturbations_match_scalar_loop():
+    analyzer = SensitivityAnalyzer()
+    levels = np.linspace(-0.3, 0.3, 7)
+    keys = [key for key, _ in analyzer.factors] + ['num_floors', 'ownership_ratio']
+    outputs = analyzer.evaluate(BASE, keys, levels)
+    for metric in ('return_area_ping', 'total_cost', 'shortfall'):
+        for i, key in enumerate(keys):
+            expected = [_scalar({**BASE, key: BASE[key] * (1 + level)}, metric) for level in levels]
+            np.testing.assert_allclose(outputs[metric][i], expected, rtol=1e-10, err_msg=f'{key} {metric}')
+
+
+def test_tornado_and_summary():
+    analyzer = SensitivityAnalyzer()
+    result = analyzer.analyze(BASE, factors=['market_price', 'design_rate', 'tax_rate'],
+                              levels=[-0.2, 0.0, 0.2])
+    tornado = result['tornado_df'][result['tornado_df']['指標'] == '換回面積'].set_index('參數')
+    base = _scalar(BASE, 'return_area_ping')
+    assert tornado['基準值'].tolist() == pytest.approx([base] * 3)
+    row = tornado.loc['market_price']
+    assert row['低值'] == pytest.approx(_scalar({**BASE, 'market_price': 480000}, 'return_area_ping'))
+    assert row['高值'] == pytest.approx(_scalar({**BASE, 'market_price': 720000}, 'return_area_ping'))
+    # 各指標內依影響範圍由大到小排序
+    assert list(tornado['影響範圍']) == sorted(tornado['影響範圍'], reverse=True)
+    assert len(result['summary_df']) == 3
+    assert result['spider_df'].shape[0] == 3 * 3 * len(analyzer.metrics)
+
+
+def test_combine_equals_single_run():
+    analyzer = SensitivityAnalyzer()
+    factors = ['market_price', 'unit_cost', 'legal_far']
+    whole = analyzer.analyze(BASE, factors=factors)
+    parts = analyzer.combine([analyzer.analyze(BASE, factors=[f]) for f in factors])
+    np.testing.assert_allclose(
+        whole['tornado_df'].sort_values(['指標', '參數'])['影響範圍'],
+        parts['tornado_df'].sort_values(['指標', '參數'])['影響範圍'])
+
+
+def test_sobol_matches_analytic_indices_of_linear_model():
+    # 總開發成本對設計、管理、稅捐費率為線性：Y = c + Σ a_i X_i，X_i ~ U(下限, 上限) 互相獨立
+    # 一階指數 = 總效應指數 = a_i² 寬度_i² / Σ a_j² 寬度_j²，輸出變異數 = Σ a_i² 寬度_i² / 12
+    bounds = {'design_rate': (0.02, 0.08), 'management_rate': (0.15, 0.30), 'tax_rate': (0.01, 0.05)}
+    analyzer = SensitivityAnalyzer()
+    slopes = np.array([_scalar({**BASE, key: BASE[key] + 0.01}, 'total_cost') - _scalar(BASE, 'total_cost')
+                       for key in bounds]) / 0.01
+    weights = (slopes * np.array([high - low for low, high in bounds.values()])) ** 2
+    expected = dict(zip([analyzer.param_names[key] for key in bounds], weights / weights.sum()))
+
+    result = analyzer.sobol(BASE, factors=list(bounds), bounds=bounds, n_samples=2 ** 14, n_bootstrap=50)
+    assert result['variance']['總開發成本'] == pytest.approx(weights.sum() / 12, rel=0.01)
+    # 實施者分配價值 = (總收入 − 總開發成本) ×（1 − 持分比例），指數與總開發成本相同
+    for metric in ('總開發成本', '實施者分配價值'):
+        table = result['indices_df'].set_index('指標').loc[metric].set_index('參數')
+        for name, value in expected.items():
+            assert table.loc[name, '一階指數'] == pytest.approx(value, abs=0.01), (metric, name)
+            assert table.loc[name, '總效應指數'] == pytest.approx(value, abs=0.01), (metric, name)
+            assert table.loc[name, '一階下限'] <= value <= table.loc[name, '一階上限']
+            assert abs(table.loc[name, '交互作用']) < 0.005
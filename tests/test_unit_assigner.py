@@ -0,0 +1,57 @@
+"""選配模組：NumPy 最短擴增路徑求解器與窮舉最佳解比對"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from modules.unit_assigner import _shortest_augmenting_path
+
+
+def _brute_force(cost: np.ndarray, cash: np.ndarray = None) -> float:
+    """窮舉全部指派的最小總成本（-1 表示現金找補）"""
+    n, m = cost.shape
+    options = list(range(m)) + ([-1] if cash is not None else [])
+    best = np.inf
+    for choice in itertools.product(options, repeat=n):
+        units = [j for j in choice if j >= 0]
+        if len(units) != len(set(units)):
+            continue
+        total = sum(cash[i] if j < 0 else cost[i, j] for i, j in enumerate(choice))
+        best = min(best, total)
+    return best
+
+
+def _total(cost: np.ndarray, cash: np.ndarray, unit_of_owner: np.ndarray) -> float:
+    return sum(cash[i] if j < 0 else cost[i, j] for i, j in enumerate(unit_of_owner))
+
+
+def test_cash_columns_minimal_case():
+    cost = np.array([[3.0], [3.0]])
+    cash = np.array([16.0, 19.0])
+    unit_of_owner = _shortest_augmenting_path(cost, cash)
+    assert _total(cost, cash, unit_of_owner) == 19.0
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 5), rng.integers(1, 5)
+    cost = rng.integers(0, 30, (n, m)).astype(float)
+    cost[rng.random((n, m)) < 0.15] = np.inf
+    cash = rng.integers(0, 30, n).astype(float)
+    unit_of_owner = _shortest_augmenting_path(cost, cash)
+    assigned = unit_of_owner[unit_of_owner >= 0]
+    assert len(assigned) == len(set(assigned))
+    assert _total(cost, cash, unit_of_owner) == pytest.approx(_brute_force(cost, cash))
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_matches_brute_force_without_cash(seed):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(1, 5)
+    m = rng.integers(n, 6)
+    cost = rng.normal(0, 10, (n, m))
+    unit_of_owner = _shortest_augmenting_path(cost)
+    assert sorted(set(unit_of_owner)) == sorted(unit_of_owner) and (unit_of_owner >= 0).all()
+    assert cost[np.arange(n), unit_of_owner].sum() == pytest.approx(_brute_force(cost))
@@ -0,0 +1,96 @@
+"""向量化引擎與逐筆計算器一致性：含 NaN（CSV 空白欄位）與 0 的選填參數"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.allocation_calculator import AllocationCalculator
+from modules.batch_comparator import BatchComparator
+from modules.cost_calculator import CostCalculator
+from modules.vectorized_engine import VectorizedEngine
+from modules.volume_calculator import VolumeCalculator
+
+
+def _frame(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def sometimes(values, blank=0.15, zero=0.1):
+        values = values.astype(float)
+        u = rng.random(n)
+        values[u < blank] = np.nan
+        values[(u >= blank) & (u < blank + zero)] = 0
+        return values
+
+    total_land_area = rng.uniform(30, 300, n)
+    return pd.DataFrame({
+        'case_name': [f'案{i}' for i in range(n)],
+        'total_land_area': total_land_area,
+        'personal_land_area': sometimes(total_land_area * rng.uniform(0.05, 0.5, n), zero=0.05),
+        'personal_building_area': sometimes(rng.uniform(10, 200, n), blank=0.0, zero=0.05),
+        'legal_far': rng.uniform(1.5, 5.0, n),
+        'num_floors': sometimes(rng.integers(1, 15, n)),
+        'building_year': sometimes(rng.integers(1955, 2020, n)),
+        'efficiency_coef': sometimes(rng.uniform(0.85, 0.95, n), blank=0.02, zero=0.02),
+        'sales_coef': rng.uniform(1.3, 1.7, n),
+        'ownership_ratio': rng.uniform(0.05, 0.6, n),
+        'unit_cost': rng.uniform(150000, 250000, n),
+        'demo_unit_cost': rng.uniform(2000, 8000, n),
+        'design_rate': 0.04, 'finance_rate': 0.03, 'management_rate': 0.22, 'tax_rate': 0.02,
+        'market_price': rng.uniform(400000, 1000000, n),
+        'scenario_factor': rng.choice([0.9, 1.0, 1.1], n),
+        'actual_return_area': rng.uniform(10, 100, n)
+    })
+
+
+def _scalar(params):
+    volume = VolumeCalculator().calculate_volume(params)
+    cost = CostCalculator().calculate_total_costs(params, volume)
+    alloc = AllocationCalculator().calculate_allocation(params, volume, cost)
+    return {**volume.to_dict(), **cost.to_dict(), **alloc.to_dict()}
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return _frame()
+
+
+def test_engine_matches_scalar_calculators(frame):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        results = VectorizedEngine().run(frame)
+    for i, params in enumerate(frame.to_dict(orient='records')):
+        expected = _scalar(params)
+        for key, values in results.items():
+            if key in expected and not isinstance(expected[key], (str, dict, tuple)):
+                np.testing.assert_allclose(values[i], expected[key], rtol=1e-12, atol=1e-9,
+                                           err_msg=f'第 {i} 筆 {key}')
+
+
+def test_batch_comparator_matches_scalar_calculators(frame):
+    result = BatchComparator().compare(frame)
+    expected = [_scalar(p)['return_area_ping'] for p in frame.to_dict(orient='records')]
+    np.testing.assert_allclose(result['預測坪數'], expected, rtol=1e-12)
+
+
+@pytest.mark.parametrize('value', [np.nan, 0])
+def test_missing_building_year_uses_standard_coverage(value):
+    params = {'total_land_area': 100.0, 'legal_far': 1.0, 'personal_land_area': 25.0,
+              'personal_building_area': 0.0, 'num_floors': 5, 'building_year': value}
+    volume = VolumeCalculator().calculate_volume(params)
+    assert volume['estimated_original_far'] == pytest.approx(5 * 0.6)
+    assert [e[0] for e in volume['far_estimates']] == ['floors']
+    engine = VectorizedEngine()
+    far = engine.estimate_original_far(engine.to_columns(params))
+    assert float(far) == pytest.approx(5 * 0.6)
+
+
+def test_zero_efficiency_coef_is_guarded():
+    params = {'total_land_area': 100.0, 'legal_far': 2.0, 'efficiency_coef': 0.0}
+    engine = VectorizedEngine()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        volume = engine.calculate_volume(engine.to_columns(params))
+    assert float(volume['total_floor_area']) == 0
+    assert VolumeCalculator().calculate_volume(params)['total_floor_area'] == 0